@@ -0,0 +1,38 @@
+"""SmilePy dental analysis tools.
+
+The public classes are re-exported lazily, so ``import smilepy`` stays cheap and OpenCV is
+only loaded once an image analysis class is actually used.
+"""
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    "TeethAnalyzer": "teethanalyzer",
+    "AnalysisContext": "teethanalyzer",
+    "OralHealthCheck": "oral_healthcheck",
+    "PatientRecord": "patientrecord",
+    "PatientRegistry": "patient_registry",
+    "PatientStore": "patient_store",
+    "HistoryArchive": "history_archive",
+    "DietTeethCare": "diet_teethcare",
+    "CheckupMedicineReminder": "checkup_medicine",
+    "ReminderScheduler": "reminder_scheduler",
+    "ResultCache": "result_cache",
+    "QualityGate": "image_quality",
+    "ImageQualityError": "image_quality",
+    "Verdict": "analysis_results",
+    "DetectorResult": "analysis_results",
+    "HealthReport": "analysis_results",
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'smilepy' has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
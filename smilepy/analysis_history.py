@@ -0,0 +1,174 @@
+import os
+import threading
+from datetime import datetime
+import numpy as np
+from .analysis_results import DetectorResult, HealthReport, TeethAnalysis, Verdict
+
+MAX_THRESHOLDS = 4  # Most thresholds a detector is judged against (see teethanalyzer.DETECTOR_THRESHOLDS)
+COUNT_DETECTORS = ("cavities", "plaque", "alignment")  # Detectors whose scores are integer counts
+SPILL_CHUNK_ROWS = 4096  # Rows read from the spill file at a time while iterating
+
+def _number(value):
+    """Python int for integral floats, float otherwise (thresholds were ints before they were stored)."""
+    return int(value) if value.is_integer() else value
+
+class ReportCodec:
+    """Stores DetectorResult and HealthReport entries as fixed-width rows with one slot per detector."""
+    def __init__(self, detectors):
+        self.detectors = tuple(detectors)
+        self._index = {name: i for i, name in enumerate(self.detectors)}
+        count = len(self.detectors)
+        self.dtype = np.dtype([("timestamp", "f8"), ("report", "?"), ("scores", "f8", count),
+                               ("verdicts", "i1", count), ("thresholds", "f8", (count, MAX_THRESHOLDS))])
+
+    def encode(self, rows, index, result):
+        results = result.results if isinstance(result, HealthReport) else (result,)
+        rows["report"][index] = isinstance(result, HealthReport)
+        rows["scores"][index] = np.nan
+        rows["verdicts"][index] = -1  # Detector not in this entry
+        rows["thresholds"][index] = np.nan
+        for item in results:
+            slot = self._index[item.detector]
+            rows["scores"][index, slot] = item.score
+            rows["verdicts"][index, slot] = item.verdict
+            rows["thresholds"][index, slot, :len(item.thresholds)] = item.thresholds
+
+    def decode(self, row):
+        results = []
+        for slot in np.flatnonzero(row["verdicts"] >= 0):
+            detector, score = self.detectors[slot], float(row["scores"][slot])
+            thresholds = tuple(_number(float(value)) for value in row["thresholds"][slot] if not np.isnan(value))
+            results.append(DetectorResult(detector, int(score) if detector in COUNT_DETECTORS else score, thresholds,
+                                          Verdict(int(row["verdicts"][slot]))))
+        return HealthReport(results) if row["report"] else results[0]
+
+class TeethAnalysisCodec:
+    """Stores patientrecord's TeethAnalysis entries as fixed-width rows."""
+    dtype = np.dtype([("timestamp", "f8"), ("cavity_count", "i8"), ("avg_brightness", "f8"),
+                      ("cavity_verdict", "i1"), ("whiteness_verdict", "i1")])
+
+    def encode(self, rows, index, analysis):
+        rows["cavity_count"][index] = analysis.cavity_count
+        rows["avg_brightness"][index] = analysis.avg_brightness
+        rows["cavity_verdict"][index] = analysis.cavity_verdict
+        rows["whiteness_verdict"][index] = analysis.whiteness_verdict
+
+    def decode(self, row):
+        return TeethAnalysis(int(row["cavity_count"]), float(row["avg_brightness"]),
+                             Verdict(int(row["cavity_verdict"])), Verdict(int(row["whiteness_verdict"])))
+
+class AnalysisHistory:
+    """Bounded (timestamp, result) history for long-running analyzers.
+
+    The most recent `capacity` entries live in a preallocated ring buffer of codec.dtype rows.
+    When it is full, the oldest quarter is appended to spill_path in one write, or dropped if
+    there is no spill_path. Iterating yields every entry, spilled ones first, oldest to newest;
+    the spill file holds raw rows, so it is only meant to be read back with the same codec.
+    """
+    def __init__(self, codec, capacity=1024, spill_path=None):
+        self.codec = codec
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.dropped = 0  # Entries discarded for lack of a spill file
+        self._rows = np.zeros(capacity, dtype=codec.dtype)
+        self._start = 0  # Ring index of the oldest entry in memory
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, result):
+        with self._lock:
+            if self.capacity == 0:
+                row = np.zeros(1, dtype=self.codec.dtype)
+                row["timestamp"] = timestamp.timestamp()
+                self.codec.encode(row, 0, result)
+                self._spill(row)
+                return
+            if self._count == self.capacity:
+                self._evict(max(1, self.capacity // 4))
+            index = (self._start + self._count) % self.capacity
+            self._rows["timestamp"][index] = timestamp.timestamp()
+            self.codec.encode(self._rows, index, result)
+            self._count += 1
+
+    def _ordered(self):
+        """The in-memory rows, oldest first."""
+        return np.take(self._rows, np.arange(self._start, self._start + self._count) % max(self.capacity, 1))
+
+    def _evict(self, count):
+        self._spill(self._ordered()[:count])
+        self._start = (self._start + count) % self.capacity
+        self._count -= count
+
+    def _spill(self, rows):
+        if self.spill_path is None:
+            self.dropped += len(rows)
+            return
+        with open(self.spill_path, "ab") as spill:
+            rows.tofile(spill)
+
+    @property
+    def spilled(self):
+        """Number of entries in the spill file."""
+        if self.spill_path is None or not os.path.exists(self.spill_path):
+            return 0
+        return os.path.getsize(self.spill_path) // self.codec.dtype.itemsize
+
+    def _spilled_chunks(self):
+        for offset in range(0, self.spilled, SPILL_CHUNK_ROWS):
+            yield np.fromfile(self.spill_path, self.codec.dtype, SPILL_CHUNK_ROWS, offset=offset * self.codec.dtype.itemsize)
+
+    def _spilled_rows(self):
+        for chunk in self._spilled_chunks():
+            yield from chunk
+
+    def _entry(self, row):
+        return datetime.fromtimestamp(float(row["timestamp"])), self.codec.decode(row)
+
+    def __iter__(self):
+        with self._lock:
+            recent = self._ordered()  # Snapshot, so appends while iterating do not shift the ring
+        for row in self._spilled_rows():
+            yield self._entry(row)
+        for row in recent:
+            yield self._entry(row)
+
+    def export(self, path):
+        """Writes every entry to path as raw codec.dtype rows (the spill file format), oldest first."""
+        with self._lock:
+            recent = self._ordered()
+        with open(path, "wb") as export:
+            for chunk in self._spilled_chunks():
+                chunk.tofile(export)
+            recent.tofile(export)
+
+    def read_rows(self, path, start=None, end=None):
+        """Memory-mapped rows of an export or spill file with start <= timestamp < end (datetimes, both optional).
+
+        Rows are in append order, so the range is found by binary search; decode them with entries().
+        """
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, self.codec.dtype)
+        rows = np.memmap(path, self.codec.dtype, "r")
+        first = 0 if start is None else np.searchsorted(rows["timestamp"], start.timestamp(), "left")
+        last = len(rows) if end is None else np.searchsorted(rows["timestamp"], end.timestamp(), "left")
+        return rows[first:last]
+
+    def entries(self, rows):
+        """(timestamp, result) entries of rows returned by read_rows."""
+        return [self._entry(row) for row in rows]
+
+    def __len__(self):
+        return self.spilled + self._count
+
+    def recent(self, count=None):
+        """The last `count` (default: all) in-memory entries, oldest first."""
+        with self._lock:
+            rows = self._ordered()
+        return [self._entry(row) for row in (rows[-count:] if count else rows)]
+
+    def clear(self):
+        """Forgets every entry, including the spilled ones."""
+        with self._lock:
+            self._start = self._count = self.dropped = 0
+            if self.spill_path is not None and os.path.exists(self.spill_path):
+                os.remove(self.spill_path)
@@ -0,0 +1,133 @@
+import math
+from enum import IntEnum
+
+class Verdict(IntEnum):
+    """Severity of a detector finding; higher means worse, so verdicts compare numerically."""
+    NORMAL = 0
+    LOW = 1
+    MODERATE = 2
+    HIGH = 3
+
+# Detector name -> verdict -> report sentence; {score} is filled in at render time
+MESSAGES = {
+    "cavities": {
+        Verdict.NORMAL: "Found {score} potential cavities. No significant cavities detected.",
+        Verdict.MODERATE: "Found {score} potential cavities. Schedule a checkup.",
+        Verdict.HIGH: "Found {score} potential cavities. Immediate dental consultation recommended.",
+    },
+    "whiteness": {
+        Verdict.NORMAL: "Excellent",
+        Verdict.LOW: "Good",
+        Verdict.MODERATE: "Average - Consider whitening",
+        Verdict.HIGH: "Below average - Professional cleaning recommended.",
+    },
+    "plaque": {
+        Verdict.NORMAL: "Low plaque levels. Maintain hygiene.",
+        Verdict.HIGH: "High plaque buildup detected!",
+    },
+    "alignment": {
+        Verdict.NORMAL: "Teeth alignment is normal.",
+        Verdict.HIGH: "Teeth misalignment detected. Consider orthodontic consultation.",
+    },
+    "gum_inflammation": {
+        Verdict.NORMAL: "Gum health appears normal.",
+        Verdict.MODERATE: "Mild inflammation. Improve oral hygiene.",
+        Verdict.HIGH: "Significant inflammation detected. Consult dentist.",
+    },
+    "enamel": {
+        Verdict.NORMAL: "Enamel strength is good!",
+        Verdict.HIGH: "Weak enamel detected. Reduce acidic foods.",
+    },
+    "sensitivity": {
+        Verdict.NORMAL: "Tooth sensitivity is within normal range.",
+        Verdict.HIGH: "High sensitivity risk detected!",
+    },
+}
+
+class DetectorResult:
+    """One detector's numeric score, the thresholds it was judged against and the resulting verdict."""
+    __slots__ = ("detector", "score", "thresholds", "verdict")
+
+    def __init__(self, detector, score, thresholds, verdict):
+        self.detector = detector
+        self.score = score
+        self.thresholds = thresholds  # Tuple of threshold values, in DETECTOR_THRESHOLDS order
+        self.verdict = verdict
+
+    def render(self):
+        """Renders the report sentence for this result."""
+        return MESSAGES[self.detector][self.verdict].format(score=self.score)
+
+    def to_dict(self):
+        """JSON-serializable form of the result."""
+        score = None if isinstance(self.score, float) and math.isnan(self.score) else self.score  # NaN is not valid JSON
+        return {"detector": self.detector, "score": score, "thresholds": list(self.thresholds),
+                "verdict": self.verdict.name.lower(), "text": self.render()}
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return f"DetectorResult({self.detector!r}, score={self.score!r}, verdict={self.verdict.name})"
+
+class HealthReport:
+    """Results of a full teeth health analysis, rendered as text only on demand."""
+    __slots__ = ("results",)
+
+    def __init__(self, results):
+        self.results = tuple(results)
+
+    def __getitem__(self, detector):
+        for result in self.results:
+            if result.detector == detector:
+                return result
+        raise KeyError(detector)
+
+    @property
+    def verdict(self):
+        """Worst verdict across all detectors."""
+        return max((result.verdict for result in self.results), default=Verdict.NORMAL)
+
+    def render(self):
+        """Renders the multi-line report text."""
+        return "Teeth Health Report:\n- " + "\n- ".join(result.render() for result in self.results)
+
+    def to_dict(self):
+        """JSON-serializable form of the report."""
+        return {result.detector: result.to_dict() for result in self.results}
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return f"HealthReport({', '.join(repr(result) for result in self.results)})"
+
+class TeethAnalysis:
+    """Result of patientrecord's quick analysis: dark-pixel cavity count and average brightness."""
+    __slots__ = ("cavity_count", "avg_brightness", "cavity_verdict", "whiteness_verdict")
+
+    def __init__(self, cavity_count, avg_brightness, cavity_verdict, whiteness_verdict):
+        self.cavity_count = cavity_count
+        self.avg_brightness = avg_brightness
+        self.cavity_verdict = cavity_verdict
+        self.whiteness_verdict = whiteness_verdict
+
+    def render(self):
+        """Renders the multi-line report text."""
+        report = "Teeth Analysis Report:\n"
+        report += f"- Detected {self.cavity_count} possible cavity regions.\n"
+        report += "- Immediate dental consultation recommended.\n" if self.cavity_verdict == Verdict.HIGH else "- No major cavities detected.\n"
+        if self.whiteness_verdict == Verdict.HIGH:
+            report += "- Teeth appear yellowish. Whitening recommended.\n"
+        elif self.whiteness_verdict == Verdict.MODERATE:
+            report += "- Teeth in moderate condition. Keep brushing regularly.\n"
+        else:
+            report += "- Teeth are in great condition!\n"
+        return report
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return (f"TeethAnalysis(cavity_count={self.cavity_count!r}, avg_brightness={self.avg_brightness!r}, "
+                f"cavity_verdict={self.cavity_verdict.name}, whiteness_verdict={self.whiteness_verdict.name})")
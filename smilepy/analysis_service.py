@@ -0,0 +1,264 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from email.parser import BytesParser
+from email.policy import HTTP
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+from .image_io import decode_image
+from .image_quality import ImageQualityError, QualityGate
+from .oral_healthcheck import OralHealthCheck
+from .teethanalyzer import TeethAnalyzer, REPORT_DETECTORS, SCORE_METHODS
+
+ORAL_IMAGE_CHECKS = ("check_plaque_levels", "detect_tooth_decay", "detect_tongue_health")
+MAX_HEADER_BYTES = 16 * 1024
+
+_analyzer = None  # Per worker process, built once by _init_worker
+_checker = None
+_quality = None
+
+def _init_worker(quality_gate=False, working_pixels=None):
+    global _analyzer, _checker, _quality
+    _analyzer, _checker = TeethAnalyzer(working_pixels=working_pixels), OralHealthCheck()
+    _quality = QualityGate() if quality_gate else None
+
+def analyze_upload(data, detectors, checks):
+    """Decodes uploaded image bytes and runs the selected detectors and oral checks (runs in a worker)."""
+    try:
+        image = decode_image(data)
+    except ValueError:
+        raise ValueError("Upload is not a decodable image")
+    if _quality is not None:
+        _quality.check(image)  # Once for both the detectors and the oral checks
+    context = _analyzer._context(image)
+    results = {name: _analyzer.assess(context, name).to_dict() for name in detectors}
+    oral = {name: getattr(_checker, name)(image) for name in checks}
+    return {"width": image.shape[1], "height": image.shape[0], "results": results, "checks": oral}
+
+class HTTPError(Exception):
+    """An error answered with the given status and a JSON {"error": message, **details} body."""
+    def __init__(self, status, message, headers=None, details=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+        self.details = details or {}
+
+def _image_from_multipart(content_type, body):
+    """First file part (or the part named "image") of a multipart/form-data body."""
+    message = BytesParser(policy=HTTP).parsebytes(b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body)
+    if not message.is_multipart():
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed multipart body")
+    parts = [part for part in message.iter_parts() if part.get_filename() or part.get_param("name", header="content-disposition") == "image"]
+    if not parts:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "No image part in multipart body")
+    return parts[0].get_payload(decode=True)
+
+def _selection(query, key, default, allowed):
+    """Comma-separated names from the query string, validated against allowed."""
+    names = [name for value in query.get(key, []) for name in value.split(",") if name]
+    if not names:
+        return list(default)
+    unknown = sorted(set(names) - set(allowed))
+    if unknown:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unknown {key}: {', '.join(unknown)}")
+    return names
+
+class AnalysisService:
+    """Localhost HTTP front end that runs analyses on a bounded process pool.
+
+    POST /analyze with raw image bytes or multipart/form-data; ?detectors= and ?checks= pick what
+    runs. At most max_pending jobs may be queued or running, beyond that requests get 429. A job
+    that exceeds timeout is answered with 504, and queued jobs of clients that disconnect or time
+    out are cancelled before they reach a worker.
+    """
+    def __init__(self, workers=None, max_pending=None, timeout=30.0, max_body=32 * 1024 * 1024, quality_gate=False,
+                 working_pixels=None):
+        self.workers = workers or os.cpu_count()
+        self.quality_gate = quality_gate  # Answer unusable images with 422 before running any detector
+        self.working_pixels = working_pixels  # Analyze a pyramid level of about this many pixels
+        self.max_pending = max_pending or 2 * self.workers
+        self.timeout = timeout
+        self.max_body = max_body
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor = None
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=8080):
+        self._executor = self._new_executor()
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server
+
+    def _new_executor(self):
+        # Spawned, not forked: the pool starts its workers lazily inside a request handler, and forked
+        # workers would inherit the listening socket and that client's connection, so it never saw EOF
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker, initargs=(self.quality_gate, self.working_pixels))
+
+    def _broken(self, executor):
+        """Replaces a pool that lost a worker (e.g. to the OOM killer); answered with 503 so the client retries."""
+        if self._executor is executor:  # Concurrent jobs of the same pool rebuild it only once
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+        return HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Analysis worker died; retry", {"Retry-After": "1"})
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def serve_forever(self, host="127.0.0.1", port=8080):
+        server = await self.start(host, port)
+        try:
+            await server.serve_forever()
+        finally:
+            await self.close()
+
+    def stats(self):
+        return {"workers": self.workers, "pending": self.pending, "max_pending": self.max_pending,
+                "completed": self.completed, "rejected": self.rejected}
+
+    async def _handle(self, reader, writer):
+        """Serves one request per connection (responses carry Connection: close)."""
+        try:
+            try:
+                method, target, headers = await self._read_head(reader)
+                status, payload = await self._route(method, target, headers, reader)
+                extra = {}
+            except HTTPError as e:
+                status, payload, extra = e.status, {"error": str(e), **e.details}, e.headers
+            if status is not None:
+                await self._respond(writer, status, payload, extra)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_head(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request head too large")
+        if len(head) > MAX_HEADER_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request head too large")
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        return method.upper(), target, headers
+
+    async def _route(self, method, target, headers, reader):
+        url = urlsplit(target)
+        if url.path == "/health":
+            if method != "GET":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET", {"Allow": "GET"})
+            return HTTPStatus.OK, {"status": "ok", **self.stats()}
+        if url.path != "/analyze":
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {url.path}")
+        if method != "POST":
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST", {"Allow": "POST"})
+        query = parse_qs(url.query)
+        detectors = _selection(query, "detectors", REPORT_DETECTORS, SCORE_METHODS)
+        checks = _selection(query, "checks", (), ORAL_IMAGE_CHECKS)
+        body = await self._read_body(headers, reader)  # Read even when refusing, so the client gets the response, not a reset
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPError(HTTPStatus.TOO_MANY_REQUESTS, "Analysis queue is full", {"Retry-After": "1"})
+        content_type = headers.get("content-type", "")
+        data = _image_from_multipart(content_type, body) if content_type.startswith("multipart/") else body
+        if not data:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Empty upload")
+        return await self._run(reader, data, detectors, checks)
+
+    async def _read_body(self, headers, reader):
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "Chunked uploads are not supported; send Content-Length")
+        try:
+            length = int(headers.get("content-length", ""))
+        except ValueError:
+            raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "Content-Length required")
+        if length > self.max_body:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Upload exceeds {self.max_body} bytes")
+        return await reader.readexactly(length)
+
+    async def _run(self, reader, data, detectors, checks):
+        """Submits the job and waits for it, the timeout, or the client hanging up, whichever comes first."""
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            future = executor.submit(analyze_upload, data, detectors, checks)
+        except BrokenProcessPool:
+            raise self._broken(executor)
+        self.pending += 1  # The done callback takes it back off, whatever the outcome
+        future.add_done_callback(lambda done: loop.call_soon_threadsafe(self._finished, done.cancelled()))
+        job = asyncio.wrap_future(future)
+        hangup = asyncio.ensure_future(reader.read(1))  # Nothing more is expected, so any return means EOF
+        try:
+            done, _ = await asyncio.wait({job, hangup}, timeout=self.timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            hangup.cancel()
+        if job not in done:
+            job.cancel()  # Drops the job if it is still queued; a job already on a worker runs to completion
+            if hangup in done:
+                return None, None
+            raise HTTPError(HTTPStatus.GATEWAY_TIMEOUT, f"Analysis did not finish within {self.timeout:g} s")
+        try:
+            return HTTPStatus.OK, job.result()
+        except BrokenProcessPool:
+            raise self._broken(executor)
+        except ImageQualityError as e:
+            raise HTTPError(HTTPStatus.UNPROCESSABLE_ENTITY, str(e), details={"rejected": list(e.reasons)})
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+        except Exception as e:
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(e).__name__}: {e}")
+
+    def _finished(self, cancelled):
+        self.pending -= 1
+        self.completed += not cancelled
+
+    async def _respond(self, writer, status, payload, headers):
+        body = json.dumps(payload).encode("utf-8")
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}", "Content-Type: application/json",
+                 f"Content-Length: {len(body)}", "Connection: close"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve teeth analysis over HTTP on localhost.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--max-pending", type=int, help="Queued plus running jobs before answering 429 (default: 2 x workers)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds before a job is answered with 504")
+    parser.add_argument("--max-body", type=int, default=32 * 1024 * 1024, help="Largest accepted upload in bytes")
+    parser.add_argument("--quality-gate", action="store_true", help="Answer blurry, badly exposed or tiny images with 422")
+    parser.add_argument("--working-pixels", type=int, help="Analyze a pyramid level of about this many pixels")
+    args = parser.parse_args(argv)
+
+    service = AnalysisService(args.workers, args.max_pending, args.timeout, args.max_body, args.quality_gate,
+                              args.working_pixels)
+    print(f"Serving on http://{args.host}:{args.port} with {service.workers} workers", file=sys.stderr)
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from .image_quality import ImageQualityError, QualityGate
+from .teethanalyzer import TeethAnalyzer, REPORT_DETECTORS, SCORE_METHODS
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+
+class ManifestError:
+    """A manifest line that names no image; it becomes an error record in its place instead of stopping the batch."""
+    __slots__ = ("location", "message")
+
+    def __init__(self, location, message):
+        self.location = location  # "<manifest>:<line>"
+        self.message = message
+
+    def __repr__(self):
+        return self.location
+
+def _jsonl_path(line):
+    """The "path" of one JSONL manifest line; raises ValueError when it has none."""
+    try:
+        entry = json.loads(line)
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {e}") from None
+    if not isinstance(entry, dict) or not isinstance(entry.get("path"), str) or not entry["path"].strip():
+        raise ValueError('Expected an object with a "path" string')
+    return entry["path"].strip()
+
+def _csv_path(row, column):
+    """The path cell of one CSV manifest row; raises ValueError when it is missing or empty."""
+    path = row[column].strip() if column < len(row) else ""
+    if not path:
+        raise ValueError(f"No path in column {column + 1}")
+    return path
+
+def _csv_header_column(row):
+    """Index of the path column if the first CSV row is a header, or None when that row is already data.
+
+    A header names a "path" column (in any case, surrounding spaces ignored); a first row without
+    one is still taken as a header, read by its first column, unless that cell names an image file.
+    """
+    names = [cell.strip().lower() for cell in row]
+    if "path" in names:
+        return names.index("path")
+    return None if names[0].endswith(IMAGE_EXTENSIONS) else 0
+
+def _csv_lines(reader):
+    """(line number, _csv_path, arguments) for every non-blank data row, skipping the header if there is one."""
+    column = None
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        if column is None:
+            column = _csv_header_column(row)
+            if column is not None:
+                continue
+            column = 0
+        yield reader.line_num, _csv_path, (row, column)
+
+def _read_manifest(manifest_path):
+    """Yields image paths from a CSV (``path`` column or first column) or JSONL (``path`` key) manifest.
+
+    A line that names no image yields a ManifestError instead, so it fails only its own entry.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, newline="", encoding="utf-8-sig") as manifest:  # -sig drops the BOM spreadsheets write
+        if manifest_path.lower().endswith(".jsonl"):
+            lines = ((number, _jsonl_path, (line,)) for number, line in enumerate(manifest, 1) if line.strip())
+        else:
+            lines = _csv_lines(csv.reader(manifest))
+        for number, parse, args in lines:
+            try:
+                path = parse(*args)
+            except ValueError as e:
+                yield ManifestError(f"{manifest_path}:{number}", str(e))
+            else:
+                yield os.path.join(base_dir, path)
+
+def collect_images(source):
+    """Lists image paths from a directory, a glob pattern or a CSV/JSONL manifest (see _read_manifest)."""
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if name.lower().endswith(IMAGE_EXTENSIONS))
+    if os.path.isfile(source) and source.lower().endswith((".csv", ".jsonl")):
+        return list(_read_manifest(source))
+    return sorted(glob.glob(source, recursive=True))
+
+_analyzers = {}  # (quality_gate, working_pixels) -> TeethAnalyzer, built once per worker process
+
+def _analyzer(quality_gate, working_pixels):
+    """The process's TeethAnalyzer for these settings; it keeps no history, the records carry the results."""
+    key = (quality_gate, working_pixels)
+    if key not in _analyzers:
+        _analyzers[key] = TeethAnalyzer(quality=QualityGate() if quality_gate else None, working_pixels=working_pixels,
+                                        history_size=0)
+    return _analyzers[key]
+
+def analyze_image(path, detectors=None, quality_gate=False, working_pixels=None):
+    """Runs the selected detectors on one image (a path or image_io.SharedFrame) and returns a JSON-serializable record."""
+    if isinstance(path, ManifestError):
+        return {"path": path.location, "error": path.message}
+    analyzer = _analyzer(quality_gate, working_pixels)
+    source = _source(path)
+    try:
+        context = analyzer._context(path)
+        results = {name: analyzer.assess(context, name).to_dict() for name in detectors or REPORT_DETECTORS}
+        return {"path": source, "results": results}
+    except ImageQualityError as e:
+        return {"path": source, "error": str(e), "rejected": list(e.reasons)}
+    except Exception as e:
+        return {"path": source, "error": str(e)}
+
+def _source(path):
+    """How a record names its input."""
+    return path.location if isinstance(path, ManifestError) else path if isinstance(path, str) else repr(path)
+
+def _analyze_task(task):
+    """Unpacks a (path, detectors, quality_gate, working_pixels) task."""
+    return analyze_image(*task)
+
+def _analyze_chunk(tasks):
+    """Runs a chunk of tasks in a worker process."""
+    return [analyze_image(*task) for task in tasks]
+
+def _chunks(tasks, size):
+    chunk = []
+    for task in tasks:
+        chunk.append(task)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def run_batch(paths, workers=None, chunksize=1, ordered=True, detectors=None, quality_gate=False, working_pixels=None):
+    """Analyzes images over a process pool, yielding records in input or completion order.
+
+    Paths are decoded by the workers; already decoded frames can be passed as image_io.SharedFrame
+    handles so workers read them from shared memory instead of receiving pickled pixels. At most
+    two chunks per worker are in flight. If a worker process dies, those chunks become error
+    records and the rest of the batch goes to a fresh pool.
+    """
+    tasks = ((path, detectors, quality_gate, working_pixels) for path in paths)
+    if workers == 1:
+        yield from map(_analyze_task, tasks)
+        return
+    workers = workers or os.cpu_count()
+    chunks = _chunks(tasks, chunksize)
+    pending = deque()  # (future, chunk, pool it was submitted to), in input order
+    pool = ProcessPoolExecutor(workers)
+    try:
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                try:
+                    pending.append((pool.submit(_analyze_chunk, chunk), chunk, pool))
+                except BrokenProcessPool:  # Broke since the last result; retry the chunk on a fresh pool
+                    pool.shutdown(wait=False)
+                    pool = ProcessPoolExecutor(workers)
+                    pending.append((pool.submit(_analyze_chunk, chunk), chunk, pool))
+            if not pending:
+                return
+            entry = pending[0]
+            if not ordered:
+                done = wait([future for future, _, _ in pending], return_when=FIRST_COMPLETED).done
+                entry = next(entry for entry in pending if entry[0] in done)
+            pending.remove(entry)
+            future, chunk, owner = entry
+            try:
+                records = future.result()
+            except BrokenProcessPool as e:
+                records = [{"path": _source(task[0]), "error": f"Worker process died: {e}"} for task in chunk]
+                if owner is pool:
+                    pool.shutdown(wait=False)
+                    pool = ProcessPoolExecutor(workers)
+            yield from records
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch teeth analysis over many images.")
+    parser.add_argument("source", help="Image directory, glob pattern, or CSV/JSONL manifest")
+    parser.add_argument("-o", "--output", help="JSONL results file (default: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("-c", "--chunksize", type=int, default=8, help="Images sent to a worker at a time")
+    parser.add_argument("--unordered", action="store_true", help="Emit results as they complete")
+    parser.add_argument("--detectors", nargs="+", choices=sorted(SCORE_METHODS), default=list(REPORT_DETECTORS),
+                        help="Detectors to run on each image")
+    parser.add_argument("--quality-gate", action="store_true", help="Reject blurry, badly exposed or tiny images unanalyzed")
+    parser.add_argument("--working-pixels", type=int, help="Analyze a pyramid level of about this many pixels")
+    args = parser.parse_args(argv)
+
+    paths = collect_images(args.source)
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    failed = rejected = 0
+    try:
+        for record in run_batch(paths, args.workers, args.chunksize, not args.unordered, args.detectors, args.quality_gate,
+                                args.working_pixels):
+            failed += "error" in record
+            rejected += "rejected" in record
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"Analyzed {len(paths)} images ({failed} failed, {rejected} of them rejected by the quality gate).", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
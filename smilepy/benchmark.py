@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+from .batch_analysis import run_batch
+from .oral_healthcheck import OralHealthCheck
+from .teethanalyzer import TeethAnalyzer
+
+RESOLUTIONS = {
+    "vga": (640, 480),
+    "hd": (1280, 720),
+    "5mp": (2592, 1944),
+    "12mp": (4000, 3000),
+}
+
+TEETH_DETECTORS = ["detect_cavities", "measure_teeth_whiteness", "detect_plaque", "check_teeth_alignment",
+                   "detect_gum_inflammation", "analyze_enamel_strength", "detect_tooth_sensitivity"]
+ORAL_CHECKS = ["check_plaque_levels", "detect_tooth_decay", "detect_tongue_health"]
+
+def synthetic_dental_image(width, height, seed=0):
+    """Draws a reproducible mouth-like BGR image: pink gums, a row of off-white teeth, dark spots and noise."""
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), (90, 90, 170), dtype=np.uint8)  # Gum pink
+    teeth, tooth_width = 10, width // 12
+    for i in range(teeth):
+        center = (int(width * (i + 1) / (teeth + 1)), height // 2 + int(rng.integers(-height // 40, height // 40 + 1)))
+        axes = (tooth_width // 2, height // 5)
+        shade = int(rng.integers(170, 235))
+        cv2.ellipse(image, center, axes, 0, 0, 360, (shade - 10, shade, shade), -1)
+    for _ in range(max(5, width * height // 40000)):  # Dark spots of cavity-like size
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        cv2.circle(image, center, int(rng.integers(4, 14)), (40, 40, 50), -1)
+    noise = rng.normal(0, 8, image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+def time_call(function, repeat=5, warmup=1):
+    """Wall-clock seconds of repeated calls: min, median and mean."""
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return {"min": min(samples), "median": statistics.median(samples), "mean": statistics.fmean(samples), "repeat": repeat}
+
+def bench_resolution(name, size, repeat, work_dir):
+    """Times every detector and the full report on one synthetic image size."""
+    width, height = size
+    image = synthetic_dental_image(width, height)
+    path = os.path.join(work_dir, f"{name}.jpg")
+    cv2.imwrite(path, image)
+    analyzer, checker = TeethAnalyzer(), OralHealthCheck()
+    results = {}
+    for detector in TEETH_DETECTORS:
+        results[f"{name}/teeth/{detector}"] = time_call(lambda: getattr(analyzer, detector)(image), repeat)
+    results[f"{name}/teeth/analyze_teeth_health"] = time_call(lambda: analyzer.analyze_teeth_health(image), repeat)
+    results[f"{name}/teeth/analyze_teeth_health_from_jpeg"] = time_call(lambda: analyzer.analyze_teeth_health(path), repeat)
+    for check in ORAL_CHECKS:
+        results[f"{name}/oral/{check}"] = time_call(lambda: getattr(checker, check)(path), repeat)
+    analyzer.analysis_history.clear()
+    return results
+
+def bench_batch(images, workers, chunksize, work_dir):
+    """Images per second of batch_analysis.run_batch over copies of a synthetic HD image."""
+    path = os.path.join(work_dir, "batch.jpg")
+    cv2.imwrite(path, synthetic_dental_image(*RESOLUTIONS["hd"], seed=1))
+    paths = [path] * images
+    start = time.perf_counter()
+    for _ in run_batch(paths, workers=workers, chunksize=chunksize):
+        pass
+    elapsed = time.perf_counter() - start
+    return {"min": elapsed, "median": elapsed, "mean": elapsed, "repeat": 1, "images_per_second": images / elapsed}
+
+def environment():
+    """Versions and hardware the numbers were taken on."""
+    return {"python": platform.python_version(), "opencv": cv2.__version__, "numpy": np.__version__,
+            "platform": platform.platform(), "cpu_count": os.cpu_count(), "opencv_threads": cv2.getNumThreads()}
+
+def compare(current, baseline, tolerance):
+    """Lists benchmarks whose median got slower than baseline by more than tolerance (a fraction)."""
+    regressions = []
+    for key, stats in current["results"].items():
+        before = baseline["results"].get(key)
+        if before and stats["median"] > before["median"] * (1 + tolerance):
+            regressions.append({"benchmark": key, "baseline": before["median"], "current": stats["median"],
+                                "change": stats["median"] / before["median"] - 1})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the SmilePy detectors on synthetic dental images.")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--sizes", nargs="+", choices=list(RESOLUTIONS), default=list(RESOLUTIONS))
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--batch-images", type=int, default=64, help="Images per batch throughput run (0 to skip)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()], help="Batch worker counts")
+    parser.add_argument("--chunksize", type=int, default=4)
+    parser.add_argument("--compare", metavar="BASELINE", help="Baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown before flagging (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name in args.sizes:
+            results.update(bench_resolution(name, RESOLUTIONS[name], args.repeat, work_dir))
+            print(f"Finished {name}", file=sys.stderr)
+        if args.batch_images:
+            for workers in args.workers:
+                results[f"batch/hd/workers_{workers}"] = bench_batch(args.batch_images, workers, args.chunksize, work_dir)
+    report = {"environment": environment(), "results": results}
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2)
+
+    for key, stats in results.items():
+        extra = f"  {stats['images_per_second']:.1f} img/s" if "images_per_second" in stats else ""
+        print(f"{key:60s} {stats['median'] * 1000:10.2f} ms{extra}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['benchmark']}: {regression['baseline'] * 1000:.2f} ms -> "
+                  f"{regression['current'] * 1000:.2f} ms (+{regression['change']:.0%})")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
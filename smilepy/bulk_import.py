@@ -0,0 +1,147 @@
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime
+from .checkup_medicine import CheckupMedicineReminder
+from .oral_healthcheck import OralHealthCheck
+
+# Questionnaire field -> OralHealthCheck method that evaluates it
+QUESTIONNAIRE_CHECKS = {
+    "bad_breath": "detect_bad_breath",
+    "sensitivity": "check_sensitivity",
+    "mouth_ulcers": "check_mouth_ulcers",
+    "gum_bleeding": "check_gum_bleeding",
+    "jaw_pain": "check_jaw_pain",
+    "infections": "check_for_infections",
+}
+
+def iter_records(path):
+    """Streams records from a CSV file with a header row (as dicts) or a JSONL file (as raw lines).
+
+    JSONL lines are parsed by BulkImporter.evaluate, so a malformed line is reported against its
+    line number instead of stopping the import; blank lines are yielded too, to keep the numbering.
+    """
+    with open(path, newline="", encoding="utf-8") as source:
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(source):
+                yield {key: value for key, value in row.items() if value not in (None, "")}
+        else:
+            yield from source
+
+def _parse(record):
+    """A record dict from a dict or a JSONL line; raises ValueError for anything else."""
+    if isinstance(record, str):
+        try:
+            record = json.loads(record)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Malformed JSON: {e}")
+    if not isinstance(record, dict):
+        raise ValueError("Record is not a JSON object")
+    return record
+
+def _text(record, field):
+    """A required string field, stripped."""
+    value = record[field]
+    if not isinstance(value, str):
+        raise ValueError(f"Field {field} must be a string, not {type(value).__name__}")
+    return value.strip()
+
+def _yes_no(record, field):
+    """A questionnaire answer: yes/no text, a boolean or a list of reported symptoms. None would make
+    OralHealthCheck prompt for it, so it is rejected like any other type."""
+    value = record[field]
+    if not isinstance(value, (str, bool, list)):
+        raise ValueError(f"Field {field} must be yes/no, a boolean or a list of symptoms, not {type(value).__name__}")
+    return value
+
+def _count(record, field):
+    """A required whole-number field given as a number or numeric text."""
+    value = record[field]
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"Field {field} must be a number, not {type(value).__name__}")
+    try:
+        return int(value)  # Truncates numbers like the interactive check; text must be a whole number
+    except OverflowError:
+        raise ValueError(f"Field {field} is not a finite number")
+
+class BulkImporter:
+    """Evaluates appointment, medication and questionnaire records without any interactive prompts."""
+    def __init__(self, reminder_system=None, health_checker=None, batch_size=1000):
+        self.reminder_system = reminder_system or CheckupMedicineReminder()
+        self.health_checker = health_checker or OralHealthCheck()
+        self.batch_size = batch_size
+        self._pending_appointments = []
+
+    def _flush(self):
+        """Adds buffered appointments to the scheduler with one sort."""
+        if self._pending_appointments:
+            self.reminder_system.scheduler.add_appointments(self._pending_appointments)
+            self._pending_appointments = []
+
+    def _appointment(self, record):
+        date_time = datetime.strptime(_text(record, "date"), "%Y-%m-%d %H:%M")
+        self._pending_appointments.append((date_time, record.get("patient")))
+        if len(self._pending_appointments) >= self.batch_size:
+            self._flush()
+        return {"appointment": date_time.strftime("%Y-%m-%d %H:%M")}
+
+    def _medication(self, record):
+        name, time_of_day = _text(record, "medicine"), _text(record, "time")
+        self.reminder_system.scheduler.add_medication(name, time_of_day, record.get("patient"))
+        return {"medication": name, "time": time_of_day}
+
+    def _questionnaire(self, record):
+        # Every answer is validated first, so the checks never see None and never fall back to input()
+        answers = {field: _text(record, field) if field == "sensitivity" else _yes_no(record, field)
+                   for field in QUESTIONNAIRE_CHECKS if field in record}
+        results = {field: getattr(self.health_checker, QUESTIONNAIRE_CHECKS[field])(answer) for field, answer in answers.items()}
+        if "missed_doses" in record:
+            results["missed_doses"] = self.reminder_system.detect_irregular_medication_usage(_count(record, "missed_doses"))
+        return results
+
+    def evaluate(self, records):
+        """Yields one result dict per input record; invalid records report an error instead of stopping the import."""
+        handlers = {"appointment": self._appointment, "medication": self._medication,
+                    "questionnaire": self._questionnaire}
+        for line, record in enumerate(records, 1):
+            if isinstance(record, str) and not record.strip():
+                continue  # Blank JSONL line
+            result = {"line": line, "kind": None, "patient": None}
+            try:
+                record = _parse(record)
+                kind = result["kind"] = record.get("kind", "questionnaire")
+                result["patient"] = record.get("patient")
+                if not isinstance(kind, str) or kind not in handlers:
+                    raise ValueError(f"Unknown record kind: {kind}")
+                result["results"] = handlers[kind](record)
+            except KeyError as e:
+                result["error"] = f"Missing field: {e.args[0]}"
+            except ValueError as e:
+                result["error"] = str(e)
+            yield result
+        self._flush()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import of appointments, medication schedules and questionnaires.")
+    parser.add_argument("source", help="CSV or JSONL file; each record has a 'kind' of appointment, medication or questionnaire")
+    parser.add_argument("-o", "--output", help="JSONL results file (default: stdout)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Appointments added to the scheduler at a time")
+    args = parser.parse_args(argv)
+
+    importer = BulkImporter(batch_size=args.batch_size)
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    total = failed = 0
+    try:
+        for result in importer.evaluate(iter_records(args.source)):
+            total += 1
+            failed += "error" in result
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"Processed {total} records ({failed} failed).", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+from .reminder_scheduler import ReminderScheduler
+
+class CheckupMedicineReminder:
+    def __init__(self, scheduler=None):
+        self.scheduler = scheduler or ReminderScheduler()
+
+    @property
+    def reminders(self):
+        """All reminders, appointments first in date order."""
+        return self.scheduler.all_reminders()
+
+    def _say(self, message, interactive):
+        """Prints the message in menu mode and returns it either way."""
+        if interactive:
+            print(message)
+        return message
+
+    def schedule_appointment_reminder(self, date_str=None, patient=None):
+        """Schedule a dental appointment reminder; prompts when date_str is not given."""
+        interactive = date_str is None
+        if interactive:
+            date_str = input("Enter appointment date & time (YYYY-MM-DD HH:MM): ")
+        try:
+            date_time = datetime.strptime(date_str.strip(), "%Y-%m-%d %H:%M")
+        except ValueError:
+            return self._say("⚠ Invalid format! Use YYYY-MM-DD HH:MM.", interactive)
+        self.scheduler.add_appointment(date_time, patient)
+        return self._say(f"✅ Reminder set: Dental appointment on {date_time.strftime('%Y-%m-%d %H:%M')}.", interactive)
+
+    def add_medication_reminder(self, medicine_name=None, time_of_day=None, patient=None):
+        """Set a reminder for taking medicine; prompts for any value not given."""
+        interactive = medicine_name is None or time_of_day is None
+        if medicine_name is None:
+            medicine_name = input("Enter medicine name: ")
+        if time_of_day is None:
+            time_of_day = input("Enter time to take medicine (HH:MM): ")
+        medicine_name, time_of_day = medicine_name.strip(), time_of_day.strip()
+        try:
+            self.scheduler.add_medication(medicine_name, time_of_day, patient)
+        except ValueError:
+            return self._say("⚠ Invalid time format! Use HH:MM.", interactive)
+        return self._say(f"✅ Reminder set: Take {medicine_name} at {time_of_day}.", interactive)
+
+    def show_upcoming_reminders(self):
+        """Display all upcoming reminders."""
+        upcoming = self.scheduler.upcoming()
+        if upcoming:
+            for r in upcoming:
+                print(f"🔔 Upcoming Appointment: {r['date'].strftime('%Y-%m-%d %H:%M')}")
+        else:
+            print("✅ No upcoming appointments.")
+
+    def suggest_next_dental_checkup(self, last_checkup=None):
+        """Suggest the next dental checkup date (6 months later); prompts when last_checkup is not given."""
+        interactive = last_checkup is None
+        if interactive:
+            last_checkup = input("Enter last checkup date (YYYY-MM-DD): ")
+        try:
+            last_checkup_date = datetime.strptime(last_checkup.strip(), "%Y-%m-%d")
+        except ValueError:
+            return self._say("⚠ Invalid date format! Use YYYY-MM-DD.", interactive)
+        suggested_date = last_checkup_date + timedelta(days=180)
+        return self._say(f"📅 Suggested next checkup on {suggested_date.strftime('%Y-%m-%d')}.", interactive)
+
+    def track_missed_appointments(self):
+        """Check for missed appointments."""
+        missed = self.scheduler.count_missed()
+        print(f"⚠ You have missed {missed} appointments." if missed else "✅ No missed appointments.")
+
+    def adjust_medication_timing(self, medicine_name=None, last_taken_time_str=None):
+        """Suggest new medicine time if a dose is missed; prompts for any value not given."""
+        interactive = medicine_name is None or last_taken_time_str is None
+        if medicine_name is None:
+            medicine_name = input("Enter medicine name: ")
+        if last_taken_time_str is None:
+            last_taken_time_str = input("Enter last taken time (HH:MM): ")
+        try:
+            last_taken_time = datetime.strptime(last_taken_time_str.strip(), "%H:%M")
+        except ValueError:
+            return self._say("⚠ Invalid time format! Use HH:MM.", interactive)
+        new_time = last_taken_time + timedelta(hours=4)
+        return self._say(f"⏰ Suggested new time for {medicine_name.strip()}: {new_time.strftime('%H:%M')}.", interactive)
+
+    def detect_irregular_medication_usage(self, missed_doses=None):
+        """Detect irregular medication usage; prompts when missed_doses is not given."""
+        interactive = missed_doses is None
+        if interactive:
+            missed_doses = input("How many doses did you miss in the past week? ")
+        if int(missed_doses) > 3:
+            return self._say("⚠ Warning! Your medication adherence is poor.", interactive)
+        return self._say("✅ Your medication schedule is consistent.", interactive)
+
+    def auto_reschedule_appointment(self, old_date_str=None):
+        """Auto-reschedule a missed appointment to next week; prompts when old_date_str is not given."""
+        interactive = old_date_str is None
+        if interactive:
+            old_date_str = input("Enter missed appointment date (YYYY-MM-DD): ")
+        try:
+            old_date = datetime.strptime(old_date_str.strip(), "%Y-%m-%d")
+        except ValueError:
+            return self._say("⚠ Invalid date format! Use YYYY-MM-DD.", interactive)
+        new_date = old_date + timedelta(days=7)
+        return self._say(f"📅 New appointment set for {new_date.strftime('%Y-%m-%d')}.", interactive)
+
+    def recommend_teeth_cleaning_schedule(self):
+        """Suggests a professional teeth cleaning schedule."""
+        print("✅ Recommended: Professional teeth cleaning every 6 months.")
+
+def main():
+    reminder_system = CheckupMedicineReminder()
+
+    while True:
+        print("\n🔔 AI-Based Checkup & Medicine Reminder")
+        print("1. Schedule Appointment Reminder")
+        print("2. Add Medication Reminder")
+        print("3. Show Upcoming Reminders")
+        print("4. Suggest Next Dental Checkup")
+        print("5. Track Missed Appointments")
+        print("6. Adjust Medication Timing")
+        print("7. Detect Irregular Medication Usage")
+        print("8. Auto-Reschedule Missed Appointment")
+        print("9. Recommend Teeth Cleaning Schedule")
+        print("10. Exit")
+
+        choice = input("Enter your choice (1-10): ").strip()
+
+        if choice == "1":
+            reminder_system.schedule_appointment_reminder()
+        elif choice == "2":
+            reminder_system.add_medication_reminder()
+        elif choice == "3":
+            reminder_system.show_upcoming_reminders()
+        elif choice == "4":
+            reminder_system.suggest_next_dental_checkup()
+        elif choice == "5":
+            reminder_system.track_missed_appointments()
+        elif choice == "6":
+            reminder_system.adjust_medication_timing()
+        elif choice == "7":
+            reminder_system.detect_irregular_medication_usage()
+        elif choice == "8":
+            reminder_system.auto_reschedule_appointment()
+        elif choice == "9":
+            reminder_system.recommend_teeth_cleaning_schedule()
+        elif choice == "10":
+            print("👋 Exiting Reminder System. Stay healthy! 😊")
+            break
+        else:
+            print("⚠ Invalid choice! Enter a number between 1-10.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import importlib
+import json
+import sys
+
+# Command -> (module, help). Modules are imported only when their command runs, so the light
+# commands never load OpenCV or NumPy. The module's main(argv) parses the remaining arguments.
+COMMANDS = {
+    "analyze": (None, "Analyze one image and print the health report"),
+    "batch": ("batch_analysis", "Analyze many images over a process pool"),
+    "serve": ("analysis_service", "Serve analyses over HTTP on localhost"),
+    "import": ("bulk_import", "Bulk import appointments, medications and questionnaires"),
+    "benchmark": ("benchmark", "Benchmark the detectors on synthetic images"),
+    "check": ("oral_healthcheck", "Interactive oral health questionnaire"),
+    "reminders": (None, "Checkup and medication reminders (interactive without options)"),
+    "diet": (None, "Diet advice for teeth"),
+}
+
+def _analyze(argv):
+    from .teethanalyzer import TeethAnalyzer, REPORT_DETECTORS, SCORE_METHODS
+    parser = argparse.ArgumentParser(prog="smilepy analyze", description=COMMANDS["analyze"][1])
+    parser.add_argument("image", help="Image file")
+    parser.add_argument("--detectors", nargs="+", choices=sorted(SCORE_METHODS), default=list(REPORT_DETECTORS))
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of the text report")
+    parser.add_argument("--threads", type=int, help="Run the detectors concurrently on this many threads")
+    parser.add_argument("--working-pixels", type=int, help="Analyze a pyramid level of about this many pixels")
+    args = parser.parse_args(argv)
+    analyzer = TeethAnalyzer(detector_threads=args.threads, working_pixels=args.working_pixels)
+    try:
+        results = analyzer.assess_many(args.image, args.detectors)
+    finally:
+        analyzer.close()
+    if args.json:
+        print(json.dumps({result.detector: result.to_dict() for result in results}, indent=2))
+    else:
+        print("\n".join(str(result) for result in results))
+    return 0
+
+def _reminders(argv):
+    from . import checkup_medicine
+    parser = argparse.ArgumentParser(prog="smilepy reminders", description=COMMANDS["reminders"][1])
+    parser.add_argument("--next-checkup", metavar="LAST_CHECKUP", help="Suggest the checkup after YYYY-MM-DD")
+    parser.add_argument("--missed-doses", type=int, help="Check adherence given doses missed this week")
+    parser.add_argument("--reschedule", metavar="MISSED_DATE", help="Move a missed YYYY-MM-DD appointment a week on")
+    args = parser.parse_args(argv)
+    if args.next_checkup is None and args.missed_doses is None and args.reschedule is None:
+        checkup_medicine.main()
+        return 0
+    reminders = checkup_medicine.CheckupMedicineReminder()
+    if args.next_checkup is not None:
+        print(reminders.suggest_next_dental_checkup(args.next_checkup))
+    if args.missed_doses is not None:
+        print(reminders.detect_irregular_medication_usage(args.missed_doses))
+    if args.reschedule is not None:
+        print(reminders.auto_reschedule_appointment(args.reschedule))
+    return 0
+
+def _diet(argv):
+    from .diet_teethcare import DietTeethCare
+    parser = argparse.ArgumentParser(prog="smilepy diet", description=COMMANDS["diet"][1])
+    parser.add_argument("--sugar", type=float, metavar="GRAMS", help="Rate a day's sugar intake")
+    parser.add_argument("--meals", nargs="+", help="Flag meals to cut down on")
+    parser.add_argument("--concern", help="Foods for a concern such as calcium or gum_health")
+    args = parser.parse_args(argv)
+    diet = DietTeethCare()
+    if args.sugar is not None:
+        print(diet.evaluate_sugar_intake(args.sugar))
+    if args.meals:
+        print(diet.detect_unhealthy_diet_patterns(args.meals))
+    if args.concern:
+        suggestions = diet.get_food_suggestions(args.concern)
+        print(suggestions if isinstance(suggestions, str) else ", ".join(suggestions))
+    if args.sugar is None and not args.meals and not args.concern:
+        print("Tooth-friendly snacks: " + ", ".join(diet.recommend_tooth_friendly_snacks()))
+    return 0
+
+_HANDLERS = {"analyze": _analyze, "reminders": _reminders, "diet": _diet}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = argparse.ArgumentParser(prog="smilepy", description="SmilePy dental analysis tools.",
+                                     epilog="Run 'smilepy <command> -h' for a command's options.")
+    parser.add_argument("command", choices=list(COMMANDS), metavar="command",
+                        help="; ".join(f"{name}: {text}" for name, (_, text) in COMMANDS.items()))
+    args = parser.parse_args(argv[:1])  # Everything after the command belongs to the command
+    rest = argv[1:]
+    if args.command in _HANDLERS:
+        return _HANDLERS[args.command](rest)
+    module = importlib.import_module(f".{COMMANDS[args.command][0]}", __package__)
+    if args.command == "check":  # Menu-driven, takes no arguments
+        module.main()
+        return 0
+    return module.main(rest)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import numpy as np
+from .checkup_medicine import CheckupMedicineReminder
+from .diet_teethcare import DietTeethCare
+from .oral_healthcheck import OralHealthCheck
+
+YES_NO_COLUMNS = {
+    "bad_breath": "detect_bad_breath",
+    "mouth_ulcers": "check_mouth_ulcers",
+    "gum_bleeding": "check_gum_bleeding",
+    "jaw_pain": "check_jaw_pain",
+    "infections": "check_for_infections",
+}
+
+SENSITIVITY_TRIGGERS = ("none", "hot", "cold", "sweet")  # Code = index
+SUGAR_LIMITS = np.array([20, 50])  # Low below 20 g, moderate below 50 g, high otherwise
+MISSED_DOSE_LIMIT = 3
+
+def _build_messages():
+    """Message for every result code, taken from the per-patient methods so both paths always agree."""
+    checker, diet, reminders = OralHealthCheck(), DietTeethCare(), CheckupMedicineReminder()
+    messages = {column: (getattr(checker, method)(False), getattr(checker, method)(True))
+                for column, method in YES_NO_COLUMNS.items()}
+    messages["sensitivity"] = tuple(checker.check_sensitivity(trigger) for trigger in SENSITIVITY_TRIGGERS)
+    messages["sugar"] = tuple(diet.evaluate_sugar_intake(grams) for grams in (0, *SUGAR_LIMITS))
+    messages["missed_doses"] = tuple(reminders.detect_irregular_medication_usage(doses)
+                                     for doses in (0, MISSED_DOSE_LIMIT + 1))
+    return messages
+
+COHORT_MESSAGES = _build_messages()
+
+def _map_distinct(values, convert, dtype):
+    """Applies convert() once per distinct string and broadcasts the results back over the column."""
+    unique, inverse = np.unique(values, return_inverse=True)
+    return np.array([convert(str(value)) for value in unique], dtype=dtype)[inverse.ravel()]
+
+def _is_yes(value):
+    """One answer of an object column: text must read "yes", None and NaN (missing) are no, anything else by truth."""
+    if isinstance(value, (str, bytes)):
+        return (value.decode() if isinstance(value, bytes) else value).strip().lower() == "yes"
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return False
+    return bool(value)
+
+def yes_no_flags(values):
+    """Boolean array from a bool array or an array of yes/no strings (case and whitespace insensitive).
+
+    Object columns (Python lists with None, pandas columns) are scored element by element, so their
+    strings get the same yes/no reading as a string column.
+    """
+    values = np.asarray(values)
+    if values.dtype == bool:
+        return values
+    if values.dtype.kind in "US":
+        return _map_distinct(values, lambda value: value.strip().lower() == "yes", bool)
+    if values.dtype.kind == "O":
+        return np.fromiter(map(_is_yes, values.ravel()), bool, values.size).reshape(values.shape)
+    return values.astype(bool)
+
+def encode_triggers(triggers):
+    """Sensitivity trigger codes (index into SENSITIVITY_TRIGGERS) from strings; unknown triggers map to 0."""
+    triggers = np.asarray(triggers)
+    if triggers.dtype.kind in "iu":
+        return np.where((triggers >= 0) & (triggers < len(SENSITIVITY_TRIGGERS)), triggers, 0).astype(np.uint8)
+    if triggers.dtype.kind == "O":
+        triggers = triggers.astype(str)  # np.unique cannot sort a mix of None and strings
+    codes = {trigger: code for code, trigger in enumerate(SENSITIVITY_TRIGGERS)}
+    return _map_distinct(triggers, lambda value: codes.get(value.strip().lower(), 0), np.uint8)
+
+def score_cohort(**columns):
+    """Scores whole columns at once, returning one uint8 result-code array per given column.
+
+    Accepts any of the YES_NO_COLUMNS, sensitivity (trigger strings or codes), sugar
+    (daily grams) and missed_doses (per week). Codes index into COHORT_MESSAGES.
+    """
+    codes = {}
+    for column, values in columns.items():
+        if column in YES_NO_COLUMNS:
+            codes[column] = yes_no_flags(values).astype(np.uint8)
+        elif column == "sensitivity":
+            codes[column] = encode_triggers(values)
+        elif column == "sugar":
+            codes[column] = np.searchsorted(SUGAR_LIMITS, np.asarray(values, dtype=np.float64), side="right").astype(np.uint8)
+        elif column == "missed_doses":
+            doses = np.trunc(np.asarray(values, dtype=np.float64)).astype(np.int64)  # int() truncation, like the scalar check
+            codes[column] = (doses > MISSED_DOSE_LIMIT).astype(np.uint8)
+        else:
+            raise ValueError(f"Unknown cohort column: {column}")
+    return codes
+
+def decode(column, codes):
+    """Maps result codes back to the per-patient messages."""
+    return np.asarray(COHORT_MESSAGES[column], dtype=object)[codes]
+
+def summarize(codes):
+    """Number of patients per result code, for each column."""
+    return {column: np.bincount(values, minlength=len(COHORT_MESSAGES[column])).tolist()
+            for column, values in codes.items()}
@@ -0,0 +1,54 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+
+def to_day(value):
+    """Day ordinal from a 'YYYY-MM-DD' string, date or datetime."""
+    if isinstance(value, date):  # Also covers datetime
+        return value.toordinal()
+    return datetime.strptime(value, "%Y-%m-%d").toordinal()
+
+class UserDietLog:
+    """One user's meals in date-sorted compact columns with running totals for O(log n) window queries."""
+    __slots__ = ("days", "categories", "meals", "_unhealthy_totals")
+
+    def __init__(self):
+        self.days = array("i")  # Day ordinals, non-decreasing
+        self.categories = array("H")  # Bit mask of food categories per meal
+        self.meals = []  # Original meal text, kept for get_diet_history
+        self._unhealthy_totals = array("i", [0])  # _unhealthy_totals[i] = unhealthy meals among the first i
+
+    def __len__(self):
+        return len(self.days)
+
+    def add(self, day, meal, category, unhealthy):
+        """Logs one meal; O(1) for the usual in-order case, re-totals only the tail for back-dated meals."""
+        index = len(self.days)
+        if self.days and day < self.days[-1]:
+            index = bisect_right(self.days, day)
+        self.days.insert(index, day)
+        self.categories.insert(index, category)
+        self.meals.insert(index, meal)
+        if index == len(self.days) - 1:
+            self._unhealthy_totals.append(self._unhealthy_totals[-1] + bool(unhealthy))
+        else:
+            self._unhealthy_totals.insert(index + 1, 0)
+            self._unhealthy_totals[index + 1] = self._unhealthy_totals[index] + bool(unhealthy)
+            for i in range(index + 2, len(self._unhealthy_totals)):
+                self._unhealthy_totals[i] += bool(unhealthy)
+
+    def window(self, first_day, last_day):
+        """Index range [lo, hi) of meals logged from first_day through last_day; empty when last_day < first_day."""
+        lo = bisect_left(self.days, first_day)
+        return lo, max(lo, bisect_right(self.days, last_day))
+
+    def counts(self, first_day, last_day):
+        """(total meals, unhealthy meals) logged from first_day through last_day."""
+        lo, hi = self.window(first_day, last_day)
+        return hi - lo, self._unhealthy_totals[hi] - self._unhealthy_totals[lo]
+
+    def entries(self, first_day=None, last_day=None):
+        """Meals as {"date", "meal"} dicts, optionally limited to a day range."""
+        lo = 0 if first_day is None else bisect_left(self.days, first_day)
+        hi = len(self.days) if last_day is None else bisect_right(self.days, last_day)
+        return [{"date": date.fromordinal(self.days[i]).isoformat(), "meal": self.meals[i]} for i in range(lo, hi)]
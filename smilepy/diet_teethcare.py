@@ -1,4 +1,6 @@
-from datetime import datetime
+from datetime import date, datetime
+from .diet_log import UserDietLog, to_day
+from .food_classifier import FoodClassifier
 
 class DietTeethCare:
     def __init__(self):
@@ -15,7 +17,9 @@ class DietTeethCare:
             "avoid": ["Sugary Snacks", "Soda", "Acidic Foods", "Sticky Candy"],
             "sugar_intake": ["Limit sugar intake to less than 20g per day"],
         }
-        self.user_diet_log = {}
+        self.user_diet_log = {}  # user_id -> diet_log.UserDietLog
+        self.food_classifier = FoodClassifier(self.food_recommendations)
+        self._avoid_bit = 1 << self.food_classifier.categories.index("avoid")
     
     def get_food_suggestions(self, concern):
         """Returns food recommendations based on concern."""
@@ -42,32 +46,48 @@ class DietTeethCare:
     
     def detect_unhealthy_diet_patterns(self, food_list):
         """Detects unhealthy eating habits."""
-        unhealthy_items = [food for food in food_list if food in self.food_recommendations["avoid"]]
+        unhealthy_items = [food for food in food_list if "avoid" in self.food_classifier.categories_of(food)]
         return f"Warning! Reduce: {', '.join(unhealthy_items)}." if unhealthy_items else "Your diet looks healthy!"
     
+    def _classify_meal(self, meal):
+        """Returns (category bit mask, is_unhealthy) for a logged meal."""
+        mask = self.food_classifier.category_mask(meal)
+        return mask, bool(mask & self._avoid_bit)
+
+    def categorize_meals(self, meals):
+        """Counts how many of the given free-text meals fall into each food category."""
+        return dict(self.food_classifier.classify_batch(meals))
+
     def log_user_meal(self, user_id, meal, date=None):
         """Logs user's food intake."""
-        date = date or datetime.now().strftime('%Y-%m-%d')
-        self.user_diet_log.setdefault(user_id, []).append({"date": date, "meal": meal})
+        day = to_day(date) if date else datetime.now().toordinal()
+        self.user_diet_log.setdefault(user_id, UserDietLog()).add(day, meal, *self._classify_meal(meal))
         return "Meal logged successfully."
     
     def get_diet_history(self, user_id):
         """Retrieves past diet history."""
-        return self.user_diet_log.get(user_id, "No records found.")
+        log = self.user_diet_log.get(user_id)
+        return log.entries() if log else "No records found."
+
+    def _window_counts(self, user_id, days, as_of):
+        """(meals, unhealthy meals) logged in the `days` days ending on as_of (default: today)."""
+        log = self.user_diet_log.get(user_id)
+        if not log:
+            return 0, 0
+        last_day = to_day(as_of) if as_of else date.today().toordinal()
+        return log.counts(last_day - days + 1, last_day)
     
-    def generate_weekly_diet_report(self, user_id):
-        """Analyzes past food intake and provides a diet score."""
-        meals = self.user_diet_log.get(user_id, [])
-        healthy_count = sum(1 for meal in meals if "avoid" not in meal["meal"])
-        score = (healthy_count / max(len(meals), 1)) * 100
-        return f"Weekly Diet Score: {score:.2f}% - Keep up the good work!" if meals else "No data available."
+    def generate_weekly_diet_report(self, user_id, as_of=None):
+        """Analyzes the past week's food intake and provides a diet score."""
+        total, unhealthy = self._window_counts(user_id, 7, as_of)
+        score = ((total - unhealthy) / max(total, 1)) * 100
+        return f"Weekly Diet Score: {score:.2f}% - Keep up the good work!" if total else "No data available."
     
     def recommend_tooth_friendly_snacks(self):
         """Suggests teeth-friendly snack options."""
         return ["Cheese", "Nuts", "Yogurt", "Carrots", "Apples", "Sugar-free gum"]
     
-    def predict_teeth_health_trend(self, user_id):
-        """Predicts dental health trends based on diet habits."""
-        meals = self.user_diet_log.get(user_id, [])
-        unhealthy_count = sum(1 for meal in meals if "avoid" in meal["meal"])
+    def predict_teeth_health_trend(self, user_id, days=7, as_of=None):
+        """Predicts dental health trends based on the last `days` days of diet habits."""
+        _, unhealthy_count = self._window_counts(user_id, days, as_of)
         return "Warning! Your diet may lead to cavities soon." if unhealthy_count > 5 else "Your diet supports good dental health!"
@@ -0,0 +1,109 @@
+import re
+from collections import Counter, deque
+
+# Extra spellings for the foods in DietTeethCare.food_recommendations; matched as whole words
+DEFAULT_SYNONYMS = {
+    "Milk": ["dairy", "milkshake"],
+    "Cheese": ["cheddar", "mozzarella", "paneer", "parmesan"],
+    "Yogurt": ["yoghurt", "curd"],
+    "Almonds": ["almond"],
+    "Salmon": ["sardines", "tuna"],
+    "Egg Yolks": ["egg", "eggs", "egg yolk"],
+    "Mushrooms": ["mushroom"],
+    "Fish": ["cod", "mackerel"],
+    "Lean Meat": ["chicken", "turkey"],
+    "Nuts": ["nut", "walnuts", "cashews", "peanuts"],
+    "Apples": ["apple"],
+    "Carrots": ["carrot"],
+    "Green Tea": ["matcha"],
+    "Sugary Snacks": ["candy", "cookie", "cookies", "cake", "donut", "doughnut", "chocolate", "pastry", "ice cream"],
+    "Soda": ["cola", "soft drink", "soft drinks", "fizzy drink", "energy drink", "sodas"],
+    "Acidic Foods": ["lemon", "lime", "vinegar", "pickles", "citrus"],
+    "Sticky Candy": ["toffee", "caramel", "gummy", "gummies", "taffy"],
+}
+
+# Food categories whose entries are descriptions rather than foods, so they are matched by name instead
+NAMED_CATEGORIES = {"green_tea": ["Green Tea"], "water": ["Water"]}
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+def normalize(text):
+    """Lower-cases text and collapses punctuation/whitespace, padded so every word is space-delimited."""
+    return " " + _NON_WORD.sub(" ", text.lower()).strip() + " "
+
+class AhoCorasick:
+    """Multi-pattern matcher: one linear scan of the text finds every occurrence of every pattern."""
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for pattern, value in patterns:
+            state = 0
+            for char in pattern:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state].append(value)
+        queue = deque(self._goto[0].values())  # Depth-1 states fail back to the root
+        while queue:  # Breadth-first, so every fail target is finished before it is used
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, text):
+        """Yields the value of every pattern occurrence in text."""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            yield from output[state]
+
+class FoodClassifier:
+    """Maps free-text meal descriptions to food_recommendations categories, built once from that table."""
+    def __init__(self, food_recommendations, synonyms=None):
+        synonyms = DEFAULT_SYNONYMS if synonyms is None else synonyms
+        patterns = {}
+        for category, entries in food_recommendations.items():
+            if all(normalize(entry).strip().replace(" ", "_") in food_recommendations for entry in entries):
+                continue  # Composite goals like "strong_teeth" list other categories, not foods
+            foods = NAMED_CATEGORIES.get(category) or [entry for entry in entries if len(entry.split()) <= 3]
+            for food in foods:
+                for term in [food, *synonyms.get(food, [])]:
+                    patterns.setdefault(normalize(term), set()).add(category)
+        self.categories = sorted(set().union(*patterns.values()))
+        self._matcher = AhoCorasick((pattern, frozenset(categories)) for pattern, categories in patterns.items())
+
+    def classify(self, meal):
+        """Counts of each category mentioned in one meal description."""
+        counts = Counter()
+        for categories in self._matcher.find(normalize(meal)):
+            counts.update(categories)
+        return counts
+
+    def categories_of(self, meal):
+        """Set of categories mentioned in one meal description."""
+        return set().union(*self._matcher.find(normalize(meal)))
+
+    def classify_batch(self, meals):
+        """Number of meals mentioning each category, scanning each text once."""
+        counts = Counter()
+        for meal in meals:
+            counts.update(self.categories_of(meal))
+        return counts
+
+    def category_mask(self, meal):
+        """Bit mask of the categories in a meal; bit i is self.categories[i]."""
+        mask = 0
+        for category in self.categories_of(meal):
+            mask |= 1 << self.categories.index(category)
+        return mask
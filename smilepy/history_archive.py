@@ -0,0 +1,164 @@
+import numpy as np
+from .analysis_results import TeethAnalysis, Verdict
+
+ARCHIVE_MAGIC = b"SMPYHST1"
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("row_count", "<i8"), ("patient_count", "<i8"), ("rows_offset", "<i8"),
+                         ("patients_offset", "<i8"), ("index_offset", "<i8"), ("strings_offset", "<i8"),
+                         ("strings_length", "<i8")])  # 64 bytes, so the rows that follow stay 8-byte aligned
+# One history record; day counts days since 1970-01-01 and patient indexes the patient table
+ROW_DTYPE = np.dtype([("cavity_count", "<i8"), ("avg_brightness", "<f8"), ("patient", "<u4"), ("day", "<i4"),
+                      ("cavity_verdict", "i1"), ("whiteness_verdict", "i1")], align=True)
+# One patient: their rows are rows[first_row:first_row + row_count]; the name lives in the string table
+PATIENT_DTYPE = np.dtype([("first_row", "<i8"), ("row_count", "<i8"), ("name_offset", "<i8"),
+                          ("name_length", "<i4"), ("age", "<i4")])
+NO_AGE = -1
+_VERDICTS = tuple(Verdict)  # Verdict by value, cheaper than calling Verdict() per row
+
+def _day(date):
+    """Days since 1970-01-01 of a YYYY-MM-DD date (a numpy datetime64 also works)."""
+    return int(np.datetime64(date, "D").astype("<i8"))
+
+def _patients(patients):
+    for patient in patients:
+        yield patient if isinstance(patient, tuple) else (patient.user_name, patient.age, patient.get_history())
+
+def _rows(patient, records):
+    rows = np.zeros(len(records), ROW_DTYPE)
+    if records:
+        dates, analyses = zip(*records)
+        rows["patient"] = patient
+        rows["day"] = np.array(dates, "datetime64[D]").astype("<i8")
+        rows["cavity_count"] = [analysis.cavity_count for analysis in analyses]
+        rows["avg_brightness"] = [analysis.avg_brightness for analysis in analyses]
+        rows["cavity_verdict"] = [analysis.cavity_verdict for analysis in analyses]
+        rows["whiteness_verdict"] = [analysis.whiteness_verdict for analysis in analyses]
+    return rows
+
+def write_archive(path, patients):
+    """Writes patient histories to a binary archive; returns the number of records written.
+
+    patients are PatientRecords or (name, age, records) tuples, e.g. PatientStore.histories(), where
+    records are (YYYY-MM-DD, TeethAnalysis) pairs. Patients are written one at a time, and each
+    patient's records are stored in date order. Report text is not stored; it renders from the fields.
+    """
+    table, names, row_count = [], [], 0
+    with open(path, "wb") as archive:
+        archive.write(bytes(HEADER_DTYPE.itemsize))  # Filled in once the section sizes are known
+        for patient, (name, age, records) in enumerate(_patients(patients)):
+            records = sorted(records, key=lambda record: record[0])
+            _rows(patient, records).tofile(archive)
+            names.append(name.encode())
+            table.append((row_count, len(records), 0, len(names[-1]), NO_AGE if age is None else age))
+            row_count += len(records)
+        patients = np.array(table, PATIENT_DTYPE)
+        patients["name_offset"] = np.cumsum([0] + [len(name) for name in names[:-1]]) if names else 0
+        index = np.array(sorted(range(len(names)), key=names.__getitem__), "<i4")  # Patients in name byte order
+        strings = b"".join(names)
+        header = np.zeros(1, HEADER_DTYPE)
+        header["magic"] = ARCHIVE_MAGIC
+        header["row_count"], header["patient_count"] = row_count, len(names)
+        header["rows_offset"] = HEADER_DTYPE.itemsize
+        header["patients_offset"] = HEADER_DTYPE.itemsize + row_count * ROW_DTYPE.itemsize
+        header["index_offset"] = header["patients_offset"] + patients.nbytes
+        header["strings_offset"] = header["index_offset"] + index.nbytes
+        header["strings_length"] = len(strings)
+        patients.tofile(archive)
+        index.tofile(archive)
+        archive.write(strings)
+        archive.seek(0)
+        header.tofile(archive)
+    return row_count
+
+def decode_rows(rows):
+    """(YYYY-MM-DD, TeethAnalysis) records of archive rows, the shape PatientRecord.get_history returns."""
+    dates = (rows["day"].astype("datetime64[D]")).astype(str).tolist()
+    return [(date, TeethAnalysis(cavity_count, avg_brightness, _VERDICTS[cavity_verdict], _VERDICTS[whiteness_verdict]))
+            for date, cavity_count, avg_brightness, cavity_verdict, whiteness_verdict in
+            zip(dates, rows["cavity_count"].tolist(), rows["avg_brightness"].tolist(),
+                rows["cavity_verdict"].tolist(), rows["whiteness_verdict"].tolist())]
+
+class HistoryArchive:
+    """Read-only, memory-mapped view of an archive written by write_archive.
+
+    Opening reads only the header. A patient is found by binary search over the name index and their
+    rows are one contiguous slice, narrowed to a date range with searchsorted, so slicing one patient
+    out of a multi-GB archive touches a few pages. Row slices are zero-copy views of the file.
+    """
+    def __init__(self, path):
+        self.path = path
+        header = np.fromfile(path, HEADER_DTYPE, 1)
+        if len(header) == 0 or header[0]["magic"] != ARCHIVE_MAGIC:
+            raise ValueError(f"Not a SmilePy history archive: {path}")
+        header = header[0]
+        self._map = np.memmap(path, np.uint8, "r")
+        self.rows = self._section(header["rows_offset"], ROW_DTYPE, header["row_count"])
+        self.patients = self._section(header["patients_offset"], PATIENT_DTYPE, header["patient_count"])
+        self._index = self._section(header["index_offset"], np.dtype("<i4"), header["patient_count"])
+        self._strings = self._map[header["strings_offset"]:header["strings_offset"] + header["strings_length"]]
+
+    def _section(self, offset, dtype, count):
+        return self._map[offset:offset + count * dtype.itemsize].view(dtype)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _name_bytes(self, patient):
+        entry = self.patients[patient]
+        return self._strings[entry["name_offset"]:entry["name_offset"] + entry["name_length"]].tobytes()
+
+    def patient(self, patient):
+        """(name, age) of the patient at an index of the patient table."""
+        age = int(self.patients[patient]["age"])
+        return self._name_bytes(patient).decode(), None if age == NO_AGE else age
+
+    def names(self):
+        """Every patient name, in archive order."""
+        return [self._name_bytes(patient).decode() for patient in range(len(self.patients))]
+
+    def find(self, name):
+        """Index of the patient with this name in the patient table; raises KeyError if absent."""
+        key, low, high = name.encode(), 0, len(self._index)
+        while low < high:
+            middle = (low + high) // 2
+            if self._name_bytes(self._index[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(self._index) or self._name_bytes(self._index[low]) != key:
+            raise KeyError(name)
+        return int(self._index[low])
+
+    def select(self, name=None, start=None, end=None):
+        """Rows of one patient (or all patients) with start <= date <= end (YYYY-MM-DD, both optional).
+
+        With a name the result is a view of the file; across all patients the day column is scanned
+        and the matching rows are copied.
+        """
+        if name is None:
+            days = self.rows["day"]
+            mask = np.ones(len(days), bool)
+            if start is not None:
+                mask &= days >= _day(start)
+            if end is not None:
+                mask &= days <= _day(end)
+            return self.rows[mask]
+        entry = self.patients[self.find(name)]
+        rows = self.rows[entry["first_row"]:entry["first_row"] + entry["row_count"]]
+        first = 0 if start is None else np.searchsorted(rows["day"], _day(start), "left")
+        last = len(rows) if end is None else np.searchsorted(rows["day"], _day(end), "right")
+        return rows[first:last]
+
+    def history(self, name, start=None, end=None):
+        """(YYYY-MM-DD, TeethAnalysis) records of one patient, like PatientRecord.get_history."""
+        return decode_rows(self.select(name, start, end))
+
+def import_archive(path, store=None):
+    """Loads every patient of an archive as a PatientRecord, persisted to store if one is given."""
+    from .patientrecord import PatientRecord
+    archive = HistoryArchive(path)
+    records = []
+    for patient, entry in enumerate(archive.patients):
+        record = PatientRecord(*archive.patient(patient), store=store)
+        record.add_analyses(decode_rows(archive.rows[entry["first_row"]:entry["first_row"] + entry["row_count"]]))
+        records.append(record)
+    return records
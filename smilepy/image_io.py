@@ -0,0 +1,97 @@
+import os
+from mmap import mmap
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+from .instrumentation import timed
+
+ENCODED_TYPES = (bytes, bytearray, memoryview, mmap)  # Encoded image buffers decoded in place
+
+class SharedFrame:
+    """Picklable handle to a decoded image in multiprocessing.shared_memory.
+
+    The creating process copies the frame in once with SharedFrame.create(); pool workers that
+    receive the handle map the same memory, so only the name, shape and dtype are pickled.
+    """
+    __slots__ = ("name", "shape", "dtype", "_shm", "_owner")
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype).str
+        self._shm = None
+        self._owner = False
+
+    @classmethod
+    def create(cls, image):
+        """Copies image into a new shared memory block; the creator must unlink() it when done."""
+        shm = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+        frame = cls(shm.name, image.shape, image.dtype)
+        frame._shm, frame._owner = shm, True
+        frame.array[...] = image
+        return frame
+
+    @property
+    def array(self):
+        """The frame as an ndarray view of the shared memory, attaching on first use."""
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(name=self.name)  # Pool workers share the creator's resource tracker
+        return np.ndarray(self.shape, self.dtype, buffer=self._shm.buf)
+
+    def close(self):
+        """Detaches this process; arrays returned by .array must no longer be in use."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+    def unlink(self):
+        """Closes and frees the shared memory block (creator only)."""
+        shm = self._shm or shared_memory.SharedMemory(name=self.name)
+        self._shm = None
+        shm.close()
+        shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.unlink() if self._owner else self.close()
+
+    def __getstate__(self):
+        return self.name, self.shape, self.dtype
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __repr__(self):
+        return f"SharedFrame({self.name!r}, {self.shape}, {self.dtype!r})"
+
+def read_encoded(source):
+    """Encoded bytes of an image file, so one read can be decoded several ways; other sources are returned as they are."""
+    if not isinstance(source, (str, os.PathLike)):
+        return source
+    try:
+        with open(source, "rb") as encoded:
+            return encoded.read()
+    except OSError:
+        raise ValueError("Failed to load image") from None
+
+def decode_image(source, flags=cv2.IMREAD_COLOR):
+    """Decoded image from a path, an encoded buffer (bytes, bytearray, memoryview, mmap), a SharedFrame or an ndarray.
+
+    Buffers are wrapped with np.frombuffer and handed to cv2.imdecode without being copied;
+    SharedFrame and ndarray inputs are returned as they are, whatever flags says.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, SharedFrame):
+        return source.array
+    if isinstance(source, ENCODED_TYPES):
+        image = timed("decode", cv2.imdecode, np.frombuffer(source, np.uint8), flags)
+    elif isinstance(source, (str, os.PathLike)):
+        image = timed("decode", cv2.imread, os.fspath(source), flags)
+    else:
+        raise TypeError("Invalid input type. Expected file path, encoded image buffer, SharedFrame or numpy array.")
+    if image is None:
+        raise ValueError("Failed to load image")
+    return image
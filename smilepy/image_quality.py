@@ -0,0 +1,77 @@
+import cv2
+import numpy as np
+from .instrumentation import timed
+
+DEFAULT_QUALITY_THRESHOLDS = {
+    "min_width": 320,
+    "min_height": 240,
+    "working_width": 512,  # Sharpness and exposure are measured on a copy downsampled to this width
+    "min_sharpness": 15.0,  # Laplacian variance at working_width; a 2048 px photo blurred with sigma 4 scores ~8
+    "dark_level": 24,
+    "bright_level": 232,
+    "max_dark_fraction": 0.5,
+    "max_bright_fraction": 0.5,
+}
+
+# Reason code -> explanation shown to the user
+REASONS = {
+    "too_small": "Image resolution is below the minimum for analysis.",
+    "blurry": "Image is too blurry; retake it with the camera focused on the teeth.",
+    "underexposed": "Image is too dark; retake it with more light.",
+    "overexposed": "Image is overexposed; retake it with less light or no flash.",
+}
+
+class ImageQualityError(ValueError):
+    """Raised when an image fails the quality gate; reasons holds the REASONS codes it failed."""
+    def __init__(self, reasons, measurements):
+        self.reasons = tuple(reasons)
+        self.measurements = measurements
+        super().__init__("Image rejected: " + " ".join(REASONS[reason] for reason in self.reasons))
+
+    def __reduce__(self):  # Keeps reasons when the error crosses a process pool
+        return type(self), (self.reasons, self.measurements)
+
+class QualityGate:
+    """Cheap pre-flight checks run on a decoded image before the detectors see it."""
+    def __init__(self, thresholds=None):
+        self.thresholds = {**DEFAULT_QUALITY_THRESHOLDS, **(thresholds or {})}
+
+    def measure(self, image):
+        """Resolution, Laplacian-variance sharpness and clipped dark/bright pixel fractions of an image."""
+        t = self.thresholds
+        height, width = image.shape[:2]
+        small = image
+        if width > t["working_width"]:
+            size = (t["working_width"], max(1, round(height * t["working_width"] / width)))
+            small = timed("quality_resize", cv2.resize, image, size, None, 0, 0, cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        counts = np.bincount(gray.ravel(), minlength=256)
+        return {
+            "width": width,
+            "height": height,
+            "sharpness": float(timed("laplacian", cv2.Laplacian, gray, cv2.CV_32F).var()),
+            "dark_fraction": float(counts[:t["dark_level"] + 1].sum() / gray.size),
+            "bright_fraction": float(counts[t["bright_level"]:].sum() / gray.size),
+        }
+
+    def reasons(self, measurements):
+        """REASONS codes for every check the measurements fail (empty when the image is usable)."""
+        t, m = self.thresholds, measurements
+        failed = []
+        if m["width"] < t["min_width"] or m["height"] < t["min_height"]:
+            failed.append("too_small")
+        if m["sharpness"] < t["min_sharpness"]:
+            failed.append("blurry")
+        if m["dark_fraction"] > t["max_dark_fraction"]:
+            failed.append("underexposed")
+        if m["bright_fraction"] > t["max_bright_fraction"]:
+            failed.append("overexposed")
+        return failed
+
+    def check(self, image):
+        """Returns the measurements of a usable image; raises ImageQualityError otherwise."""
+        measurements = timed("quality", self.measure, image)
+        failed = self.reasons(measurements)
+        if failed:
+            raise ImageQualityError(failed, measurements)
+        return measurements
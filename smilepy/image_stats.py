@@ -0,0 +1,61 @@
+import math
+import cv2
+import numpy as np
+
+_LEVELS = np.arange(256, dtype=np.int64)
+_FLOAT32_EXACT = 1 << 24  # calcHist returns float32 counts, exact only below 2**24
+
+class GrayHistogram:
+    """256-bin histogram of an 8-bit image; threshold counts, masked means and moments derived from it exactly."""
+    def __init__(self, image):
+        rows_per_band = max(1, (_FLOAT32_EXACT - 1) // max(1, image.shape[1]))
+        counts = np.zeros(256, dtype=np.int64)
+        for top in range(0, image.shape[0], rows_per_band):  # One band unless the image exceeds 16.7 MP
+            band = image[top:top + rows_per_band]
+            counts += cv2.calcHist([band], [0], None, [256], [0, 256]).ravel().astype(np.int64)
+        self._set_counts(counts)
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Histogram from 256 bin counts, e.g. the sum of several strips' counts."""
+        histogram = cls.__new__(cls)
+        histogram._set_counts(np.asarray(counts, dtype=np.int64))
+        return histogram
+
+    def _set_counts(self, counts):
+        self.counts = counts
+        self.total = int(counts.sum())
+        self._cumulative = np.cumsum(counts)
+        self._cumulative_sum = np.cumsum(counts * _LEVELS)
+
+    def count_at_most(self, threshold):
+        """Pixels <= threshold, i.e. the 255 pixels of cv2.threshold(..., THRESH_BINARY_INV)."""
+        threshold = int(threshold)
+        if threshold < 0:
+            return 0
+        return int(self._cumulative[min(threshold, 255)])
+
+    def count_above(self, threshold):
+        """Pixels > threshold, i.e. the 255 pixels of cv2.threshold(..., THRESH_BINARY)."""
+        return self.total - self.count_at_most(threshold)
+
+    def mean_above(self, threshold):
+        """Mean of the pixels > threshold; NaN when there are none, like np.mean of an empty selection."""
+        count = self.count_above(threshold)
+        if count == 0:
+            return math.nan
+        below = int(self._cumulative_sum[int(threshold)]) if int(threshold) >= 0 else 0
+        return (int(self._cumulative_sum[-1]) - below) / count
+
+    def mean(self):
+        """Mean of all pixels."""
+        return int(self._cumulative_sum[-1]) / self.total
+
+    def var(self):
+        """Population variance of all pixels, matching np.var."""
+        mean = self.mean()
+        return float(np.dot(self.counts, (_LEVELS - mean) ** 2)) / self.total
+
+    def std(self):
+        """Population standard deviation of all pixels, matching np.std."""
+        return math.sqrt(self.var())
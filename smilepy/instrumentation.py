@@ -0,0 +1,138 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+BYTES_BUCKETS = (1 << 10, 1 << 14, 1 << 17, 1 << 20, 1 << 22, 1 << 24, 1 << 26, 1 << 28)
+
+_enabled = False  # Checked on every stage; a plain global keeps the disabled path to one lookup
+_local = threading.local()  # Bytes allocated by nested stages, so a detector is charged for its stages
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense (le buckets, sum and count)."""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def prometheus_lines(self, name, labels):
+        """Text exposition lines for this histogram."""
+        lines, cumulative = [], 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+class Instrumentation:
+    """Collects wall time and output bytes per pipeline stage and per detector."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds = {}  # (kind, name) -> Histogram
+        self.bytes = {}
+        self.callbacks = []
+
+    def record(self, kind, name, seconds, nbytes):
+        """Adds one observation and forwards it to every callback as (kind, name, seconds, nbytes)."""
+        with self._lock:
+            key = (kind, name)
+            if key not in self.seconds:
+                self.seconds[key] = Histogram(SECONDS_BUCKETS)
+                self.bytes[key] = Histogram(BYTES_BUCKETS)
+            self.seconds[key].observe(seconds)
+            self.bytes[key].observe(nbytes)
+        for callback in self.callbacks:
+            callback(kind, name, seconds, nbytes)
+
+    def reset(self):
+        """Drops all collected observations."""
+        with self._lock:
+            self.seconds.clear()
+            self.bytes.clear()
+
+    def summary(self):
+        """Observation count, total seconds and total bytes per (kind, name)."""
+        with self._lock:
+            return {f"{kind}:{name}": {"count": h.count, "seconds": h.sum, "bytes": self.bytes[(kind, name)].sum}
+                    for (kind, name), h in self.seconds.items()}
+
+    def export_prometheus(self, prefix="smilepy"):
+        """Renders all histograms in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for metric, histograms, help_text in (("seconds", self.seconds, "Wall time"),
+                                                  ("bytes", self.bytes, "Bytes of output arrays allocated")):
+                for kind in sorted({kind for kind, _ in histograms}):
+                    name = f"{prefix}_{kind}_{metric}"
+                    lines.append(f"# HELP {name} {help_text} per {kind}.")
+                    lines.append(f"# TYPE {name} histogram")
+                    for (entry_kind, entry), histogram in sorted(histograms.items()):
+                        if entry_kind == kind:
+                            lines.extend(histogram.prometheus_lines(name, f'{kind}="{entry}"'))
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Instrumentation()
+
+def enable():
+    """Turns instrumentation on for the whole process."""
+    global _enabled
+    _enabled = True
+
+def disable():
+    """Turns instrumentation off; timed() then just calls through."""
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    return _enabled
+
+def _nbytes(result):
+    """Bytes held by the arrays a stage returned (arrays, or tuples/lists of them like findContours)."""
+    if hasattr(result, "nbytes"):
+        return result.nbytes
+    if isinstance(result, (tuple, list)):
+        return sum(_nbytes(item) for item in result)
+    return 0
+
+def timed(name, function, *args, kind="stage"):
+    """Calls function(*args), recording its wall time and allocated bytes (its output plus nested stages) when enabled."""
+    if not _enabled:
+        return function(*args)
+    outer = getattr(_local, "allocated", 0)
+    _local.allocated = 0
+    start = time.perf_counter()
+    try:
+        result = function(*args)
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = _local.allocated
+        _local.allocated = outer
+    nbytes = nested + _nbytes(result)
+    _local.allocated = outer + nbytes
+    REGISTRY.record(kind, name, elapsed, nbytes)
+    return result
+
+@contextmanager
+def instrumented(callback=None):
+    """Enables instrumentation for a block, optionally streaming observations to callback; yields the registry."""
+    was_enabled = _enabled
+    if callback:
+        REGISTRY.callbacks.append(callback)
+    enable()
+    try:
+        yield REGISTRY
+    finally:
+        if not was_enabled:
+            disable()
+        if callback:
+            REGISTRY.callbacks.remove(callback)
@@ -0,0 +1,151 @@
+from datetime import datetime
+from .instrumentation import timed
+
+DEFAULT_THRESHOLDS = {
+    "plaque_canny_low": 100,
+    "plaque_canny_high": 200,
+    "plaque_high": 50,
+    "plaque_moderate": 20,
+    "decay_brightness": 100,
+    "tongue_brightness": 100,
+}
+
+class OralHealthCheck:
+    def __init__(self, thresholds=None, cache=None, quality=None):
+        self.checkup_history = []
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self.cache = cache  # Optional result_cache.ResultCache
+        self.quality = quality  # Optional image_quality.QualityGate run on every image check
+
+    def _cached(self, check_name, image, threshold_names, compute):
+        """Runs compute() through the result cache, keyed by image content and the check's thresholds."""
+        if self.cache is None:
+            return compute()
+        from .result_cache import image_digest
+        params = {name: self.thresholds[name] for name in threshold_names}
+        return self.cache.get_or_compute(image_digest(image), check_name, params, compute)
+
+    def _read_gray(self, image_input):
+        """Reads a grayscale image from a path, encoded buffer, SharedFrame or image array."""
+        import cv2  # Deferred so the questionnaire checks never pay for OpenCV
+        from .image_io import decode_image
+        image = decode_image(image_input, cv2.IMREAD_GRAYSCALE)
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        if self.quality is not None:
+            self.quality.check(image)
+        return image
+
+    def check_plaque_levels(self, image_path):
+        """Analyze plaque levels from an image using edge detection."""
+        t = self.thresholds
+        image = self._read_gray(image_path)
+        def compute():
+            import cv2
+            edges = timed("canny", cv2.Canny, image, t["plaque_canny_low"], t["plaque_canny_high"])
+            plaque_level = edges.sum() / 100000  # Rough intensity estimation
+            return f"Plaque Level: {'High' if plaque_level > t['plaque_high'] else 'Moderate' if plaque_level > t['plaque_moderate'] else 'Low'}"
+        return self._cached("check_plaque_levels", image, ("plaque_canny_low", "plaque_canny_high", "plaque_high", "plaque_moderate"), compute)
+
+    def _answer(self, answer, prompt):
+        """Normalizes a yes/no answer (str, bool or list of reported symptoms), prompting when it is None."""
+        if answer is None:
+            answer = input(prompt)
+        if isinstance(answer, str):
+            return answer.strip().lower() == "yes"
+        return bool(answer)
+
+    def detect_bad_breath(self, answer=None):
+        """Detect bad breath based on symptoms."""
+        symptoms = self._answer(answer, "Do you have dry mouth or a bad taste? (yes/no): ")
+        return "Possible bad breath due to dry mouth." if symptoms else "No significant signs of bad breath."
+
+    def check_sensitivity(self, trigger=None):
+        """Assess teeth sensitivity based on user input."""
+        if trigger is None:
+            trigger = input("What triggers sensitivity? (hot/cold/sweet/none): ")
+        user_feedback = trigger.strip().lower()
+        return f"Teeth sensitivity detected for {user_feedback}." if user_feedback in ["hot", "cold", "sweet"] else "No sensitivity detected."
+
+    def detect_tooth_decay(self, image_path):
+        """Analyze an image for early signs of tooth decay."""
+        image = self._read_gray(image_path)
+        def compute():
+            decay_score = image.mean()  # Higher mean = healthier teeth
+            return "Possible early-stage tooth decay detected." if decay_score < self.thresholds["decay_brightness"] else "Teeth appear healthy."
+        return self._cached("detect_tooth_decay", image, ("decay_brightness",), compute)
+
+    def check_mouth_ulcers(self, answer=None):
+        """Detect mouth ulcers based on symptoms."""
+        symptoms = self._answer(answer, "Do you have painful sores or red spots in your mouth? (yes/no): ")
+        return "Mouth ulcers detected. Consider oral gel treatment." if symptoms else "No signs of mouth ulcers."
+
+    def check_gum_bleeding(self, answer=None):
+        """Analyze gum bleeding based on user symptoms."""
+        symptoms = self._answer(answer, "Do you see blood while brushing? (yes/no): ")
+        return "Gum bleeding detected. Possible early gum disease." if symptoms else "No gum bleeding detected."
+
+    def check_jaw_pain(self, answer=None):
+        """Analyze jaw pain based on user input."""
+        symptoms = self._answer(answer, "Do you have difficulty chewing? (yes/no): ")
+        return "Jaw pain detected. Possible TMJ disorder." if symptoms else "No significant jaw pain detected."
+
+    def detect_tongue_health(self, image_path):
+        """Check tongue health based on image brightness."""
+        image = self._read_gray(image_path)
+        def compute():
+            brightness = image.mean()  # Darker areas could indicate issues
+            return "Healthy tongue detected." if brightness > self.thresholds["tongue_brightness"] else "Possible tongue health issues detected."
+        return self._cached("detect_tongue_health", image, ("tongue_brightness",), compute)
+
+    def check_for_infections(self, answer=None):
+        """Detect oral infections based on symptoms."""
+        symptoms = self._answer(answer, "Do you have swelling or pus in your mouth? (yes/no): ")
+        return "Possible oral infection detected. Consult a dentist." if symptoms else "No signs of oral infections."
+
+def main():
+    health_checker = OralHealthCheck()
+
+    while True:
+        print("\nOral Health Checker")
+        print("1. Check Plaque Levels (Requires Image)")
+        print("2. Detect Bad Breath")
+        print("3. Check Teeth Sensitivity")
+        print("4. Detect Tooth Decay (Requires Image)")
+        print("5. Check for Mouth Ulcers")
+        print("6. Check for Gum Bleeding")
+        print("7. Check Jaw Pain")
+        print("8. Detect Tongue Health (Requires Image)")
+        print("9. Check for Oral Infections")
+        print("10. Exit")
+
+        choice = input("Enter your choice (1-10): ").strip()
+
+        if choice == "1":
+            image_path = input("Enter image path for plaque analysis: ").strip()
+            print(health_checker.check_plaque_levels(image_path))
+        elif choice == "2":
+            print(health_checker.detect_bad_breath())
+        elif choice == "3":
+            print(health_checker.check_sensitivity())
+        elif choice == "4":
+            image_path = input("Enter image path for tooth decay analysis: ").strip()
+            print(health_checker.detect_tooth_decay(image_path))
+        elif choice == "5":
+            print(health_checker.check_mouth_ulcers())
+        elif choice == "6":
+            print(health_checker.check_gum_bleeding())
+        elif choice == "7":
+            print(health_checker.check_jaw_pain())
+        elif choice == "8":
+            image_path = input("Enter image path for tongue health analysis: ").strip()
+            print(health_checker.detect_tongue_health(image_path))
+        elif choice == "9":
+            print(health_checker.check_for_infections())
+        elif choice == "10":
+            print("Exiting Oral Health Checker. Stay healthy! 😊")
+            break
+        else:
+            print("Invalid choice! Please enter a number between 1-10.")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,161 @@
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from .checkup_medicine import CheckupMedicineReminder
+from .diet_teethcare import DietTeethCare
+from .patientrecord import PatientRecord, TeethAnalyzer
+
+class _Patient:
+    """A registered patient's record plus the tickets that order calls on it."""
+    __slots__ = ("record", "issued", "done", "turn")
+
+    def __init__(self, record, lock):
+        self.record = record
+        self.issued = 0  # Tickets handed out
+        self.done = 0  # Ticket whose turn it is
+        self.turn = threading.Condition(lock)
+
+class _Shard:
+    """One lock stripe: its patients, diet logs and reminders are only touched while holding lock."""
+    __slots__ = ("lock", "patients", "diet", "reminders")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.patients = {}  # Name -> _Patient
+        self.diet = DietTeethCare()
+        self.reminders = CheckupMedicineReminder()
+
+class PatientRegistry:
+    """Thread-safe registry of many PatientRecords, spread over lock-striped shards.
+
+    A patient always maps to the same shard, so calls for patients in different shards never wait
+    on each other. Within a patient, every call takes a ticket when it starts and applies its
+    changes only when that ticket comes up, so calls take effect in the order they were made,
+    even when their image analyses overlap. Analyses run outside any lock on one shared
+    analyzer that keeps no history; OpenCV releases the GIL, so they spread over the cores.
+    """
+    def __init__(self, shards=16, store=None, feature_analyzer=None, trend_thresholds=None, working_pixels=None):
+        self.store = store  # Optional patient_store.PatientStore shared by every patient
+        self.analyzer = TeethAnalyzer(working_pixels, history_size=0)  # Shared; records keep the history
+        self.feature_analyzer = feature_analyzer  # Optional teethanalyzer.TeethAnalyzer, also shared
+        self.trend_thresholds = trend_thresholds
+        self._shards = [_Shard() for _ in range(shards)]
+
+    def _shard(self, name):
+        return self._shards[hash(name) % len(self._shards)]
+
+    def _new_patient(self, shard, name, age):
+        record = PatientRecord(name, age, self.store, self.feature_analyzer, self.trend_thresholds, analyzer=self.analyzer)
+        shard.patients[name] = patient = _Patient(record, shard.lock)
+        return patient
+
+    def register(self, name, age=None):
+        """Adds a patient, or updates the age of a registered one; other calls register unknown names with no age."""
+        shard = self._shard(name)
+        with shard.lock:
+            patient = shard.patients.get(name)
+            if patient is None:
+                self._new_patient(shard, name, age)
+            elif age is not None:
+                patient.record.age = age
+                if self.store:
+                    self.store.set_age(patient.record.patient_id, age)
+
+    def _ticket(self, name):
+        shard = self._shard(name)
+        with shard.lock:
+            patient = shard.patients.get(name) or self._new_patient(shard, name, None)
+            ticket = patient.issued
+            patient.issued += 1
+        return shard, patient, ticket
+
+    @contextmanager
+    def _turn(self, patient, ticket):
+        """Holds the shard lock from this ticket's turn until the block exits, then passes the turn on."""
+        with patient.turn:
+            patient.turn.wait_for(lambda: patient.done == ticket)
+            try:
+                yield
+            finally:
+                patient.done += 1
+                patient.turn.notify_all()
+
+    @contextmanager
+    def patient(self, name):
+        """Exclusive, in-order access to a patient's PatientRecord for a block.
+
+        The shard stays locked for the block, so keep it short and do not call the registry from it.
+        """
+        shard, patient, ticket = self._ticket(name)
+        with self._turn(patient, ticket):
+            yield patient.record
+
+    def analyze(self, name, image_input):
+        """Analyzes an image for a patient and records the result (and features); returns the TeethAnalysis."""
+        shard, patient, ticket = self._ticket(name)
+        date = datetime.now().strftime("%Y-%m-%d")
+        try:
+            if self.feature_analyzer:
+                from .image_io import read_encoded
+                image_input = read_encoded(image_input)  # Read once; each analyzer decodes it as it does on its own
+            features = self.feature_analyzer.features(image_input) if self.feature_analyzer else None
+            analysis = self.analyzer.assess_teeth(image_input)
+        except BaseException:
+            with self._turn(patient, ticket):  # Give up the turn so later calls are not stuck behind this one
+                raise
+        with self._turn(patient, ticket):
+            if features is not None:
+                patient.record.add_features(date, features)
+            patient.record.add_analyses([(date, analysis)])
+        return analysis
+
+    def history(self, name, start=None, end=None):
+        """A patient's (date, TeethAnalysis) records, seeing every call made before this one."""
+        with self.patient(name) as record:
+            return record.get_history(start, end)
+
+    def trend_alerts(self, name):
+        """A patient's current TrendAlerts."""
+        with self.patient(name) as record:
+            return record.get_trend_alerts()
+
+    def log_meal(self, name, meal, date=None):
+        """Logs a meal in the patient's diet log."""
+        shard, patient, ticket = self._ticket(name)
+        with self._turn(patient, ticket):
+            return shard.diet.log_user_meal(name, meal, date)
+
+    def diet_report(self, name, as_of=None):
+        """The patient's weekly diet score and diet-based health trend."""
+        shard, patient, ticket = self._ticket(name)
+        with self._turn(patient, ticket):
+            return shard.diet.generate_weekly_diet_report(name, as_of), shard.diet.predict_teeth_health_trend(name, as_of=as_of)
+
+    def schedule_appointment(self, name, date_str):
+        """Schedules an appointment reminder (YYYY-MM-DD HH:MM) for the patient."""
+        shard, patient, ticket = self._ticket(name)
+        with self._turn(patient, ticket):
+            return shard.reminders.schedule_appointment_reminder(date_str, name)
+
+    def add_medication_reminder(self, name, medicine_name, time_of_day):
+        """Sets a daily medication reminder (HH:MM) for the patient."""
+        shard, patient, ticket = self._ticket(name)
+        with self._turn(patient, ticket):
+            return shard.reminders.add_medication_reminder(medicine_name, time_of_day, name)
+
+    def reminders(self, name):
+        """The patient's reminders, appointments first in date order."""
+        shard, patient, ticket = self._ticket(name)
+        with self._turn(patient, ticket):
+            return [reminder for reminder in shard.reminders.reminders if reminder["patient"] == name]
+
+    def names(self):
+        """Every registered patient name."""
+        names = []
+        for shard in self._shards:
+            with shard.lock:
+                names.extend(shard.patients)
+        return names
+
+    def __len__(self):
+        return sum(len(shard.patients) for shard in self._shards)
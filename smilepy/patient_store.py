@@ -0,0 +1,219 @@
+import re
+import sqlite3
+import threading
+from .analysis_results import TeethAnalysis, Verdict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    id INTEGER PRIMARY KEY,
+    patient_key TEXT UNIQUE,
+    name TEXT NOT NULL,
+    age INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS patients_unkeyed_name ON patients (name) WHERE patient_key IS NULL;
+CREATE TABLE IF NOT EXISTS teeth_history (
+    id INTEGER PRIMARY KEY,
+    patient_id INTEGER NOT NULL REFERENCES patients(id),
+    date TEXT NOT NULL,
+    cavity_count INTEGER NOT NULL,
+    avg_brightness REAL NOT NULL,
+    cavity_verdict INTEGER NOT NULL,
+    whiteness_verdict INTEGER NOT NULL,
+    report TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS teeth_history_patient_date ON teeth_history (patient_id, date);
+CREATE TABLE IF NOT EXISTS visit_features (
+    id INTEGER PRIMARY KEY,
+    patient_id INTEGER NOT NULL REFERENCES patients(id),
+    date TEXT NOT NULL,
+    cavities REAL,
+    whiteness REAL,
+    plaque_fraction REAL,
+    alignment REAL,
+    gum_inflammation REAL,
+    enamel REAL
+);
+CREATE INDEX IF NOT EXISTS visit_features_patient_date ON visit_features (patient_id, date);
+CREATE TABLE IF NOT EXISTS feature_trends (
+    patient_id INTEGER PRIMARY KEY REFERENCES patients(id),
+    state BLOB NOT NULL
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS teeth_history_fts USING fts5(report, content='teeth_history', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS teeth_history_ai AFTER INSERT ON teeth_history BEGIN
+    INSERT INTO teeth_history_fts (rowid, report) VALUES (new.id, new.report);
+END;
+CREATE TRIGGER IF NOT EXISTS teeth_history_ad AFTER DELETE ON teeth_history BEGIN
+    INSERT INTO teeth_history_fts (teeth_history_fts, rowid, report) VALUES ('delete', old.id, old.report);
+END;
+"""
+
+_COLUMNS = "date, cavity_count, avg_brightness, cavity_verdict, whiteness_verdict"
+
+def _row_to_record(row):
+    """Turns a (date, cavity_count, avg_brightness, cavity_verdict, whiteness_verdict) row into a history record."""
+    date, cavity_count, avg_brightness, cavity_verdict, whiteness_verdict = row
+    return date, TeethAnalysis(cavity_count, avg_brightness, Verdict(cavity_verdict), Verdict(whiteness_verdict))
+
+def _fts_phrase(keyword):
+    """FTS5 query every report containing the lowercased keyword matches, or None when no word of it is sure to be whole.
+
+    Only ASCII keywords qualify. Their first word may start in the middle of a word of the report,
+    so it is left out unless a separator precedes it, and the last word is matched as a prefix.
+    """
+    if not keyword.isascii():
+        return None
+    words = re.findall(r"[a-z0-9]+", keyword)
+    if keyword[:1].isalnum():
+        words = words[1:]
+    return '"' + " ".join(words) + '"*' if words else None
+
+class PatientStore:
+    """Persistent SQLite (WAL) store for patient teeth histories, indexed by patient and date with FTS5 search."""
+    def __init__(self, path="smilepy.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; fsync on checkpoint only
+        self.conn.executescript(SCHEMA)
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:  # SQLite built without FTS5
+            self.has_fts = False
+        self.conn.commit()
+
+    def close(self):
+        """Closes the database connection."""
+        self.conn.close()
+
+    def patient_id(self, user_name, age=None, patient_key=None):
+        """Returns the id of a patient, registering them on first use.
+
+        A patient_key (e.g. a medical record number) identifies the patient, so two people may share a
+        name. Without one the name does, among patients registered without a key, and an age that
+        contradicts the registered one raises ValueError instead of merging two people's histories.
+        """
+        with self._lock, self.conn:
+            if patient_key is None:
+                row = self.conn.execute("SELECT id, age FROM patients WHERE patient_key IS NULL AND name = ?",
+                                        (user_name,)).fetchone()
+            else:
+                row = self.conn.execute("SELECT id, age FROM patients WHERE patient_key = ?", (patient_key,)).fetchone()
+            if row is None:
+                return self.conn.execute("INSERT INTO patients (patient_key, name, age) VALUES (?, ?, ?)",
+                                         (patient_key, user_name, age)).lastrowid
+            patient_id, registered_age = row
+            if age is not None and age != registered_age:
+                if patient_key is None and registered_age is not None:
+                    raise ValueError(f"Patient {user_name!r} is registered with age {registered_age}, not {age}; "
+                                     "pass a patient_key to tell patients with the same name apart, or use set_age")
+                self.conn.execute("UPDATE patients SET age = ? WHERE id = ?", (age, patient_id))
+            return patient_id
+
+    def set_age(self, patient_id, age):
+        """Updates a registered patient's age."""
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE patients SET age = ? WHERE id = ?", (age, patient_id))
+
+    def add_analyses(self, patient_id, records):
+        """Inserts many (date, TeethAnalysis) records in a single transaction."""
+        rows = [(patient_id, date, int(a.cavity_count), float(a.avg_brightness), int(a.cavity_verdict),
+                 int(a.whiteness_verdict), a.render()) for date, a in records]
+        with self._lock, self.conn:
+            self.conn.executemany(f"INSERT INTO teeth_history (patient_id, {_COLUMNS}, report) "
+                                  "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def add_analysis(self, patient_id, date, analysis):
+        """Inserts one history record."""
+        self.add_analyses(patient_id, [(date, analysis)])
+
+    def _query(self, sql, params):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def history(self, patient_id, start=None, end=None):
+        """Returns (date, TeethAnalysis) records in date order, optionally limited to start <= date <= end."""
+        sql = f"SELECT {_COLUMNS} FROM teeth_history WHERE patient_id = ?"
+        params = [patient_id]
+        if start is not None:
+            sql += " AND date >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND date <= ?"
+            params.append(end)
+        return [_row_to_record(row) for row in self._query(sql + " ORDER BY date, id", params)]
+
+    def histories(self):
+        """Yields (name, age, records) for every patient, e.g. for history_archive.write_archive."""
+        for patient_id, name, age in self._query("SELECT id, name, age FROM patients ORDER BY id", ()):
+            yield name, age, self.history(patient_id)
+
+    def last(self, patient_id):
+        """Returns the record with the latest date (the last added of that date), or None."""
+        rows = self._query(f"SELECT {_COLUMNS} FROM teeth_history WHERE patient_id = ? "
+                           "ORDER BY date DESC, id DESC LIMIT 1", (patient_id,))
+        return _row_to_record(rows[0]) if rows else None
+
+    def has_verdict(self, patient_id, column, minimum):
+        """True if any record's cavity_verdict or whiteness_verdict is at least minimum."""
+        if column not in ("cavity_verdict", "whiteness_verdict"):
+            raise ValueError(f"Unknown verdict column: {column}")
+        rows = self._query(f"SELECT EXISTS (SELECT 1 FROM teeth_history WHERE patient_id = ? AND {column} >= ?)",
+                           (patient_id, int(minimum)))
+        return bool(rows[0][0])
+
+    def search(self, patient_id, keyword):
+        """Records whose report contains the keyword, ignoring case, exactly as PatientRecord searches in memory.
+
+        FTS5 (or LIKE) only narrows the patient's records down; the same substring test decides.
+        """
+        keyword = keyword.lower()
+        sql = f"SELECT {_COLUMNS}, report FROM teeth_history WHERE patient_id = ?"
+        params = [patient_id]
+        phrase = _fts_phrase(keyword) if self.has_fts else None
+        if phrase:
+            sql += " AND id IN (SELECT rowid FROM teeth_history_fts WHERE teeth_history_fts MATCH ?)"
+            params.append(phrase)
+        elif keyword.isascii():  # LIKE ignores the case of ASCII letters only
+            sql += " AND report LIKE ? ESCAPE '\\'"
+            params.append("%" + re.sub(r"([\\%_])", r"\\\1", keyword) + "%")
+        rows = self._query(sql + " ORDER BY date, id", params)
+        return [_row_to_record(row[:-1]) for row in rows if keyword in row[-1].lower()]
+
+    def feature_trends(self, patient_id):
+        """Packed patient_trends.FeatureTrends state of a patient, or None before their first features."""
+        rows = self._query("SELECT state FROM feature_trends WHERE patient_id = ?", (patient_id,))
+        return rows[0][0] if rows else None
+
+    def add_features(self, patient_id, date, features, trends):
+        """Inserts one visit's feature vector and replaces the patient's packed trend state, in one transaction."""
+        from .patient_trends import FEATURE_NAMES  # Deferred with NumPy, which patient_trends needs
+        row = (patient_id, date) + tuple(features.get(name) for name in FEATURE_NAMES)
+        with self._lock, self.conn:
+            self.conn.execute(f"INSERT INTO visit_features (patient_id, date, {', '.join(FEATURE_NAMES)}) "
+                              f"VALUES (?, ?{', ?' * len(FEATURE_NAMES)})", row)
+            self.conn.execute("INSERT OR REPLACE INTO feature_trends (patient_id, state) VALUES (?, ?)", (patient_id, trends))
+
+    def feature_history(self, patient_id, start=None, end=None):
+        """(date, {feature: value}) records in date order, optionally limited to start <= date <= end."""
+        from .patient_trends import FEATURE_NAMES
+        sql = f"SELECT date, {', '.join(FEATURE_NAMES)} FROM visit_features WHERE patient_id = ?"
+        params = [patient_id]
+        if start is not None:
+            sql += " AND date >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND date <= ?"
+            params.append(end)
+        return [(row[0], dict(zip(FEATURE_NAMES, row[1:]))) for row in self._query(sql + " ORDER BY date, id", params)]
+
+    def clear(self, patient_id):
+        """Deletes all history records, feature vectors and trend state of a patient."""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM teeth_history WHERE patient_id = ?", (patient_id,))
+            self.conn.execute("DELETE FROM visit_features WHERE patient_id = ?", (patient_id,))
+            self.conn.execute("DELETE FROM feature_trends WHERE patient_id = ?", (patient_id,))
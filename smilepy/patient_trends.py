@@ -0,0 +1,153 @@
+import math
+import numpy as np
+
+# Feature -> (TeethAnalyzer detector it is measured by, direction in which it gets worse)
+FEATURES = {
+    "cavities": ("cavities", 1),  # Cavity contour count
+    "whiteness": ("whiteness", -1),  # Mean CLAHE intensity of the teeth pixels
+    "plaque_fraction": ("plaque", 1),  # Plaque pixels over analyzed pixels, so it does not depend on resolution
+    "alignment": ("alignment", 1),  # Canny edge count
+    "gum_inflammation": ("gum_inflammation", 1),  # Red pixel fraction
+    "enamel": ("enamel", -1),  # CLAHE variance
+}
+FEATURE_NAMES = tuple(FEATURES)
+
+FEATURE_LABELS = {
+    "cavities": "Cavity count",
+    "whiteness": "Whiteness",
+    "plaque_fraction": "Plaque coverage",
+    "alignment": "Alignment edge count",
+    "gum_inflammation": "Gum redness",
+    "enamel": "Enamel variance",
+}
+
+DEFAULT_TREND_THRESHOLDS = {
+    "alpha": 0.3,  # EWMA weight of the newest visit
+    "decay": 0.8,  # Weight older visits keep in the trend regression at each new visit (about 5 visits of memory)
+    "min_visits": 3,  # Visits a feature needs before it raises alerts
+    "horizon_days": 90,  # Trend slopes are judged by the change they project over this many days
+    "regression_z": 2.0,  # A visit this many EWMA standard deviations worse than the EWMA is a regression
+    # Feature -> smallest worsening worth an alert (per horizon_days for trends, from the EWMA for regressions)
+    "cavities": 1,
+    "whiteness": 10,
+    "plaque_fraction": 0.02,
+    "alignment": 1000,
+    "gum_inflammation": 0.02,
+    "enamel": 100,
+}
+
+_WORSE = np.array([direction for _, direction in FEATURES.values()], dtype=np.float64)
+# Per-feature running statistics, in the order FeatureTrends.to_bytes packs them after first_day
+STATE_FIELDS = ("visits", "weight", "mean_day", "mean", "co_moment", "day_moment", "ewma", "ew_var",
+                "last_deviation", "last_z")
+
+class TrendAlert:
+    """A feature getting worse: a sustained trend, or a regression at the latest visit."""
+    __slots__ = ("feature", "kind", "change", "horizon_days")
+
+    def __init__(self, feature, kind, change, horizon_days=None):
+        self.feature = feature
+        self.kind = kind  # "trend" or "regression"
+        self.change = change  # Projected change over horizon_days for trends, latest visit minus EWMA for regressions
+        self.horizon_days = horizon_days
+
+    def render(self):
+        """Renders the alert sentence."""
+        label = FEATURE_LABELS[self.feature]
+        if self.kind == "trend":
+            return f"{label} is getting worse: {self.change:+.3g} over {self.horizon_days} days at the current rate."
+        return f"{label} is worse than usual at this visit: {self.change:+.3g} from the recent average."
+
+    def to_dict(self):
+        """JSON-serializable form of the alert."""
+        return {"feature": self.feature, "kind": self.kind, "change": self.change,
+                "horizon_days": self.horizon_days, "text": self.render()}
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return f"TrendAlert({self.feature!r}, {self.kind!r}, change={self.change!r})"
+
+class FeatureTrends:
+    """Running statistics of one patient's feature vectors, updated in O(1) per visit.
+
+    For each feature it keeps an EWMA with its exponentially weighted variance, and an
+    exponentially weighted least-squares fit of the feature against the visit day (Welford-style
+    co-moments, older visits down-weighted by decay). Alerts are read off these numbers, so
+    nothing is recomputed over the history. Missing (None or NaN) features are skipped. Visits are
+    meant to arrive in date order; a back-dated visit is folded in as if it were the latest.
+    """
+    __slots__ = ("first_day",) + STATE_FIELDS
+
+    def __init__(self, state=None):
+        """Fresh statistics, or the ones packed by to_bytes."""
+        if state is None:
+            self.first_day = math.nan
+            for field in STATE_FIELDS:
+                setattr(self, field, np.zeros(len(FEATURE_NAMES)))
+            self.last_z = np.full(len(FEATURE_NAMES), math.nan)
+            return
+        values = np.frombuffer(state, "<f8")
+        self.first_day = float(values[0])
+        for i, field in enumerate(STATE_FIELDS):
+            setattr(self, field, values[1 + i * len(FEATURE_NAMES):1 + (i + 1) * len(FEATURE_NAMES)].copy())
+
+    def to_bytes(self):
+        """Fixed-size packed state, e.g. for PatientStore."""
+        return np.concatenate([[self.first_day]] + [getattr(self, field) for field in STATE_FIELDS]).astype("<f8").tobytes()
+
+    def update(self, day, features, thresholds=None):
+        """Folds in one visit: day is a day ordinal, features maps FEATURE_NAMES to numbers."""
+        t = {**DEFAULT_TREND_THRESHOLDS, **(thresholds or {})}
+        alpha, decay = t["alpha"], t["decay"]
+        x = np.array([math.nan if features.get(name) is None else features[name] for name in FEATURE_NAMES], dtype=np.float64)
+        present = ~np.isnan(x)
+        if math.isnan(self.first_day):
+            self.first_day = day
+        offset = day - self.first_day  # Small day offsets keep the regression sums well conditioned
+        seen = present & (self.visits > 0)
+        deviation = _WORSE * (x - self.ewma)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.last_deviation = np.where(seen, deviation, math.nan)
+            self.last_z = np.where(seen, deviation / np.sqrt(self.ew_var), math.nan)  # Judged before the visit moves the EWMA
+        diff = x - self.ewma
+        increment = alpha * diff
+        self.ew_var = np.where(seen, (1 - alpha) * (self.ew_var + diff * increment), np.where(present, 0.0, self.ew_var))
+        self.ewma = np.where(seen, self.ewma + increment, np.where(present, x, self.ewma))
+        weight = decay * self.weight + 1
+        day_step = offset - self.mean_day
+        mean_day = self.mean_day + day_step / weight
+        mean = self.mean + (x - self.mean) / weight
+        self.co_moment = np.where(present, decay * self.co_moment + day_step * (x - mean), self.co_moment)
+        self.day_moment = np.where(present, decay * self.day_moment + day_step * (offset - mean_day), self.day_moment)
+        self.mean_day = np.where(present, mean_day, self.mean_day)
+        self.mean = np.where(present, mean, self.mean)
+        self.weight = np.where(present, weight, self.weight)
+        self.visits = self.visits + present
+
+    def slopes(self):
+        """Fitted change per day of each feature (NaN until two visits on different days)."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.day_moment > 0, self.co_moment / self.day_moment, math.nan)
+
+    def summary(self):
+        """Feature -> {"visits", "ewma", "slope_per_day"}."""
+        slopes = self.slopes()
+        return {name: {"visits": int(self.visits[i]), "ewma": float(self.ewma[i]), "slope_per_day": float(slopes[i])}
+                for i, name in enumerate(FEATURE_NAMES)}
+
+    def alerts(self, thresholds=None):
+        """TrendAlerts for the features that are getting worse, judged against DEFAULT_TREND_THRESHOLDS."""
+        t = {**DEFAULT_TREND_THRESHOLDS, **(thresholds or {})}
+        slopes = self.slopes()
+        alerts = []
+        for i, name in enumerate(FEATURE_NAMES):
+            if self.visits[i] < t["min_visits"]:
+                continue
+            change = slopes[i] * t["horizon_days"]
+            if _WORSE[i] * change >= t[name]:
+                alerts.append(TrendAlert(name, "trend", float(change), t["horizon_days"]))
+            if self.last_z[i] >= t["regression_z"] and self.last_deviation[i] >= t[name]:
+                alerts.append(TrendAlert(name, "regression", float(_WORSE[i] * self.last_deviation[i])))
+        return alerts
@@ -0,0 +1,211 @@
+import threading
+from datetime import datetime
+from .analysis_results import TeethAnalysis, Verdict
+from .diet_log import to_day
+
+CAVITY_PIXELS = 500  # Dark pixel count above which assess_teeth reports cavities
+
+class TeethAnalyzer:
+    def __init__(self, working_pixels=None, history_size=1024, history_path=None):
+        self.history_size = history_size
+        self.history_path = history_path
+        self._history = None  # Built on first use, so history-only use of PatientRecord never loads NumPy
+        self._history_lock = threading.Lock()
+        self.working_pixels = working_pixels  # Analyze a pyrDown level of about this many pixels
+
+    @property
+    def analysis_history(self):
+        """The analysis_history.AnalysisHistory of past results."""
+        with self._history_lock:
+            if self._history is None:
+                from .analysis_history import AnalysisHistory, TeethAnalysisCodec
+                self._history = AnalysisHistory(TeethAnalysisCodec(), self.history_size, self.history_path)
+            return self._history
+    
+    def _read_image(self, image_input):
+        """Reads a grayscale image from a path, encoded buffer, SharedFrame or image array."""
+        import cv2  # Deferred so history-only use of PatientRecord never loads OpenCV
+        from .image_io import decode_image
+        image = decode_image(image_input, cv2.IMREAD_GRAYSCALE)
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    
+    def _preprocess_image(self, image):
+        """Enhances contrast for better feature extraction."""
+        import cv2
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        return clahe.apply(image)
+    
+    def assess_teeth(self, image_path):
+        """Analyzes cavities and whiteness, returning the typed TeethAnalysis record."""
+        from .image_stats import GrayHistogram
+        image = self._read_image(image_path)
+        cavity_pixels = CAVITY_PIXELS
+        if self.working_pixels:
+            from .pyramid import REFERENCE_PIXELS, pyramid_level
+            image = pyramid_level(image, self.working_pixels)
+            cavity_pixels = CAVITY_PIXELS * image.size / REFERENCE_PIXELS  # A pixel count, so it scales with area
+        histogram = GrayHistogram(self._preprocess_image(image))
+        avg_brightness = histogram.mean()
+        cavity_count = histogram.count_at_most(150)  # Pixels a THRESH_BINARY_INV at 150 would mark
+        cavity_verdict = Verdict.HIGH if cavity_count > cavity_pixels else Verdict.NORMAL
+        whiteness_verdict = Verdict.HIGH if avg_brightness < 120 else Verdict.MODERATE if avg_brightness < 180 else Verdict.NORMAL
+        analysis = TeethAnalysis(cavity_count, avg_brightness, cavity_verdict, whiteness_verdict)
+        self.analysis_history.append(datetime.now(), analysis)
+        return analysis
+
+    def analyze_teeth(self, image_path):
+        """Analyzes cavities, whiteness, and plaque levels in real-time."""
+        return str(self.assess_teeth(image_path))
+    
+    def get_analysis_history(self):
+        """Returns past analysis reports."""
+        return self.analysis_history
+
+def _add_in_date_order(history, records):
+    """Adds (date, ...) records to a date-ordered list; records of one date keep the order they were added in.
+
+    This is the order PatientStore returns, so both backends agree on get_history and get_last_analysis.
+    """
+    start = len(history)
+    history.extend(records)
+    if any(history[i - 1][0] > history[i][0] for i in range(max(start, 1), len(history))):
+        history.sort(key=lambda record: record[0])  # Stable, so same-date records stay in insertion order
+
+class PatientRecord:
+    def __init__(self, user_name, age, store=None, feature_analyzer=None, trend_thresholds=None, analyzer=None,
+                 patient_key=None):
+        """Stores personal teeth health history, in memory or in a patient_store.PatientStore."""
+        self.user_name = user_name
+        self.age = age
+        self.patient_key = patient_key  # Identifies the patient in the store, e.g. a medical record number (default: the name)
+        self.teeth_history = []
+        self.teeth_analyzer = analyzer or TeethAnalyzer(history_size=0)  # The record keeps the history itself
+        self.feature_analyzer = feature_analyzer  # Optional teethanalyzer.TeethAnalyzer; visits then also track trends
+        self.trend_thresholds = trend_thresholds  # Overrides of patient_trends.DEFAULT_TREND_THRESHOLDS
+        self.feature_history = []
+        self.feature_trends = None  # patient_trends.FeatureTrends, from the first visit with features on
+        self.store = store
+        self.patient_id = store.patient_id(user_name, age, patient_key) if store else None
+    
+    def analyze_teeth_now(self, image_path):
+        """Performs instant teeth analysis and stores results."""
+        date = datetime.now().strftime("%Y-%m-%d")
+        if self.feature_analyzer:
+            from .image_io import read_encoded
+            image_path = read_encoded(image_path)  # Read once; each analyzer decodes it as it does on its own
+            self.add_features(date, self.feature_analyzer.features(image_path))
+        analysis = self.teeth_analyzer.assess_teeth(image_path)
+        self.add_analyses([(date, analysis)])
+        return str(analysis)
+
+    def add_features(self, date, features):
+        """Records one visit's feature vector (see patient_trends.FEATURES) and returns the TrendAlerts it raises.
+
+        Only the running statistics are updated, so the cost does not grow with the history.
+        """
+        trends = self.get_trends()
+        trends.update(to_day(date), features, self.trend_thresholds)
+        if self.store:
+            self.store.add_features(self.patient_id, date, features, trends.to_bytes())
+        else:
+            _add_in_date_order(self.feature_history, [(date, features)])
+        return trends.alerts(self.trend_thresholds)
+
+    def add_analyses(self, records):
+        """Adds many (date, TeethAnalysis) records at once, e.g. when importing past visits."""
+        if self.store:
+            self.store.add_analyses(self.patient_id, records)
+        else:
+            _add_in_date_order(self.teeth_history, records)
+
+    def get_feature_history(self, start=None, end=None):
+        """Returns (date, features) records, optionally limited to start <= date <= end (YYYY-MM-DD)."""
+        if self.store:
+            return self.store.feature_history(self.patient_id, start, end)
+        return [record for record in self.feature_history
+                if (start is None or record[0] >= start) and (end is None or record[0] <= end)]
+
+    def get_trends(self):
+        """The patient's patient_trends.FeatureTrends running statistics."""
+        from .patient_trends import FeatureTrends
+        if self.store:
+            return FeatureTrends(self.store.feature_trends(self.patient_id))
+        if self.feature_trends is None:
+            self.feature_trends = FeatureTrends()
+        return self.feature_trends
+
+    def get_trend_alerts(self):
+        """TrendAlerts for features getting worse over recent visits or at the latest one; O(1) in the history."""
+        state = self.store.feature_trends(self.patient_id) if self.store else self.feature_trends
+        if state is None:
+            return []  # No visit with features yet
+        return self.get_trends().alerts(self.trend_thresholds)
+
+    def _worsening(self, feature):
+        return any(alert.feature == feature for alert in self.get_trend_alerts())
+
+    def get_history(self, start=None, end=None):
+        """Returns (date, analysis) records in date order, optionally limited to start <= date <= end (YYYY-MM-DD)."""
+        if self.store:
+            return self.store.history(self.patient_id, start, end)
+        return [record for record in self.teeth_history
+                if (start is None or record[0] >= start) and (end is None or record[0] <= end)]
+    
+    def get_user_info(self):
+        """Returns user details and analysis history."""
+        return {
+            "Name": self.user_name,
+            "Age": self.age,
+            "Teeth Health History": self.get_history()
+        }
+    
+    def get_last_analysis(self):
+        """Gets the latest teeth check-up result: the latest date, and the last record added on it."""
+        last = self.store.last(self.patient_id) if self.store else self.teeth_history[-1] if self.teeth_history else None
+        return last if last else "No analysis history found."
+    
+    def clear_teeth_history(self):
+        """Clears all past analysis records."""
+        if self.store:
+            self.store.clear(self.patient_id)
+        self.teeth_history.clear()
+        self.feature_history.clear()
+        self.feature_trends = None
+        return "Teeth analysis history cleared."
+
+    def _has_verdict(self, field, minimum):
+        """True if any past analysis has the given verdict field at or above minimum."""
+        if self.store:
+            return self.store.has_verdict(self.patient_id, field, minimum)
+        return any(getattr(analysis, field) >= minimum for _, analysis in self.teeth_history)
+    
+    def get_whiteness_suggestion(self):
+        """Provides suggestions for teeth whitening based on past analyses and the whiteness trend."""
+        if self._worsening("whiteness"):
+            return "Teeth are getting less white across recent visits. Consider whitening toothpaste and fewer staining drinks."
+        if self._has_verdict("whiteness_verdict", Verdict.HIGH):
+            return "Consider using whitening toothpaste or home remedies."
+        return "No whitening required. Maintain hygiene."
+    
+    def get_cavity_alert(self):
+        """Checks if past analyses or the cavity trend indicate cavity risk."""
+        if self._worsening("cavities"):
+            return "Cavity count is rising across recent visits. Schedule a dental checkup."
+        if self._has_verdict("cavity_verdict", Verdict.MODERATE):
+            return "You might have cavities. Consider improving oral care."
+        return "No cavity issues detected. Keep up the good work!"
+    
+    def get_all_treatment_suggestions(self):
+        """Summarizes all past suggestions from analysis."""
+        return [str(analysis) for _, analysis in self.get_history()]
+    
+    def search_teeth_history(self, keyword):
+        """Searches history for specific keywords like 'cavities' or 'whitening'."""
+        if self.store:
+            return self.store.search(self.patient_id, keyword)
+        keyword = keyword.lower()
+        return [record for record in self.teeth_history if keyword in record[1].render().lower()]
+    
+    def get_real_time_status(self):
+        """Provides a quick summary of recent teeth health status."""
+        return self.get_last_analysis()
\ No newline at end of file
@@ -0,0 +1,20 @@
+import cv2
+from .instrumentation import timed
+
+REFERENCE_PIXELS = 1_000_000  # Image area the pixel-based thresholds are defined at in working-resolution mode
+
+def pyramid_level(image, working_pixels):
+    """The first cv2.pyrDown level of image with fewer than 2 * working_pixels pixels (image itself if it already has)."""
+    while image.shape[0] * image.shape[1] >= 2 * working_pixels:
+        image = timed("pyr_down", cv2.pyrDown, image)
+    return image
+
+def scale_thresholds(thresholds, powers, pixels):
+    """Copy of thresholds with each name in powers rescaled from REFERENCE_PIXELS to an image of `pixels` pixels.
+
+    powers maps a threshold to the power of the area ratio it grows with: 1 for pixel areas and
+    counts, 0.5 for lengths such as edge pixel counts. The thresholds thereby act as fractions of
+    the image rather than absolute pixel numbers.
+    """
+    ratio = pixels / REFERENCE_PIXELS
+    return {**thresholds, **{name: thresholds[name] * ratio ** power for name, power in powers.items()}}
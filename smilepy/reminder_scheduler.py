@@ -0,0 +1,152 @@
+import heapq
+import itertools
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+
+class ReminderScheduler:
+    """Keeps appointments in a sorted index and pending notifications in a heap, for many patients at once.
+
+    Reminders may be added and queried from any thread while run() fires them on its event loop:
+    the index and the heap only change under one lock, and the notifier is called outside it.
+    """
+    def __init__(self, appointment_lead=timedelta(hours=1)):
+        self.appointment_lead = appointment_lead  # How long before an appointment its reminder fires
+        self._lock = threading.Lock()  # Guards _appointments, _medications and _due
+        self._appointments = []  # Sorted (date, seq, reminder) tuples
+        self._medications = []
+        self._due = []  # Heap of (fire_time, seq, reminder)
+        self._seq = itertools.count()  # Tie-breaker so reminder dicts are never compared
+        self._loop = None
+        self._wakeup = None
+        self._stopped = False
+
+    def __len__(self):
+        with self._lock:
+            return len(self._appointments) + len(self._medications)
+
+    def all_reminders(self):
+        """Returns every appointment (in date order) followed by every medication reminder."""
+        with self._lock:
+            return [entry[2] for entry in self._appointments] + list(self._medications)
+
+    def _push(self, fire_time, reminder):
+        """Queues a notification; the caller holds the lock."""
+        heapq.heappush(self._due, (fire_time, next(self._seq), reminder))
+
+    def _wake(self):
+        """Lets a sleeping run() loop notice an earlier deadline."""
+        loop, wakeup = self._loop, self._wakeup
+        if loop is not None and wakeup is not None:
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def add_appointment(self, date_time, patient=None, now=None):
+        """Registers an appointment; its reminder fires appointment_lead before it unless it is already past."""
+        reminder = {"type": "Appointment", "date": date_time, "patient": patient}
+        with self._lock:
+            insort(self._appointments, (date_time, next(self._seq), reminder))
+            if date_time > (now or datetime.now()):
+                self._push(date_time - self.appointment_lead, reminder)
+        self._wake()
+        return reminder
+
+    def add_appointments(self, appointments, now=None):
+        """Registers many (date_time, patient) appointments with one sort instead of one insort each."""
+        now = now or datetime.now()
+        added = []
+        with self._lock:
+            for date_time, patient in appointments:
+                reminder = {"type": "Appointment", "date": date_time, "patient": patient}
+                self._appointments.append((date_time, next(self._seq), reminder))
+                if date_time > now:
+                    self._due.append((date_time - self.appointment_lead, next(self._seq), reminder))
+                added.append(reminder)
+            self._appointments.sort()
+            heapq.heapify(self._due)
+        self._wake()
+        return added
+
+    def add_medication(self, name, time_of_day, patient=None, now=None):
+        """Registers a daily medication reminder at HH:MM; only its next occurrence is ever queued."""
+        taken_at = datetime.strptime(time_of_day, "%H:%M").time()
+        reminder = {"type": "Medicine", "name": name, "time": time_of_day, "patient": patient}
+        now = now or datetime.now()
+        first = datetime.combine(now.date(), taken_at)
+        with self._lock:
+            self._medications.append(reminder)
+            self._push(first if first >= now else first + timedelta(days=1), reminder)
+        self._wake()
+        return reminder
+
+    def upcoming(self, now=None, limit=None):
+        """Appointments after now, in date order."""
+        with self._lock:
+            start = bisect_right(self._appointments, (now or datetime.now(), float("inf")))
+            end = len(self._appointments) if limit is None else start + limit
+            return [entry[2] for entry in self._appointments[start:end]]
+
+    def missed(self, now=None):
+        """Appointments before now, in date order."""
+        with self._lock:
+            end = bisect_left(self._appointments, (now or datetime.now(),))
+            return [entry[2] for entry in self._appointments[:end]]
+
+    def count_missed(self, now=None):
+        """Number of appointments before now, in O(log n)."""
+        with self._lock:
+            return bisect_left(self._appointments, (now or datetime.now(),))
+
+    def between(self, start, end):
+        """Appointments with start <= date < end."""
+        with self._lock:
+            lo = bisect_left(self._appointments, (start,))
+            hi = bisect_left(self._appointments, (end,))
+            return [entry[2] for entry in self._appointments[lo:hi]]
+
+    def next_due_time(self):
+        """When the earliest pending reminder fires, or None."""
+        with self._lock:
+            return self._due[0][0] if self._due else None
+
+    def pop_due(self, now=None):
+        """Removes and returns (fire_time, reminder) pairs that are due; daily reminders are requeued for tomorrow."""
+        now = now or datetime.now()
+        fired = []
+        with self._lock:
+            while self._due and self._due[0][0] <= now:
+                fire_time, _, reminder = heapq.heappop(self._due)
+                fired.append((fire_time, reminder))
+                if reminder["type"] == "Medicine":  # Next daily dose, skipping any days the loop was not running
+                    self._push(fire_time + timedelta(days=(now - fire_time).days + 1), reminder)
+        return fired
+
+    async def run(self, notifier, clock=datetime.now, max_sleep=60.0):
+        """Fires due reminders through notifier(fire_time, reminder) until stop() is called.
+
+        The notifier may be a plain function or a coroutine function.
+        """
+        import asyncio  # Deferred: scripts that only schedule and query never start a loop
+        import inspect
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopped = False
+        try:
+            while not self._stopped:
+                for fire_time, reminder in self.pop_due(clock()):
+                    outcome = notifier(fire_time, reminder)
+                    if inspect.isawaitable(outcome):
+                        await outcome
+                next_time = self.next_due_time()
+                delay = max_sleep if next_time is None else min(max_sleep, max(0.0, (next_time - clock()).total_seconds()))
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._loop = self._wakeup = None
+
+    def stop(self):
+        """Asks a running run() loop to exit."""
+        self._stopped = True
+        self._wake()
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+def image_digest(image):
+    """Content hash of a decoded image (shape, dtype and pixel bytes)."""
+    digest = hashlib.sha256(f"{image.shape}|{image.dtype}".encode())
+    digest.update(image.data if image.flags.c_contiguous else image.tobytes())
+    return digest.hexdigest()
+
+def make_key(image_hash, detector, params=None):
+    """Cache key for one detector run; changing any threshold in params yields a new key."""
+    payload = json.dumps(params or {}, sort_keys=True)
+    return f"{detector}:{hashlib.sha256(f'{image_hash}|{payload}'.encode()).hexdigest()}"
+
+class ResultCache:
+    """Content-addressed result cache: a bounded in-memory LRU in front of an optional on-disk store."""
+    def __init__(self, max_entries=1024, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()  # Detector threads share one cache
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _disk_path(self, key):
+        """Stores entries as <directory>/<detector>/<hash>.json so a detector can be dropped as a unit."""
+        detector, _, digest = key.partition(":")
+        return os.path.join(self.directory, detector, digest + ".json")
+
+    def _remember(self, key, value):
+        """Inserts into the LRU tier, evicting the least recently used entries beyond max_entries."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key, default=None):
+        """Looks a key up in memory, then on disk; disk hits are promoted to memory."""
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        if self.directory:
+            try:
+                with open(self._disk_path(key), encoding="utf-8") as stored:
+                    value = json.load(stored)["value"]
+            except (OSError, ValueError, KeyError):
+                pass
+            else:
+                self._remember(key, value)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """Stores a JSON-serializable value in memory and, if configured, on disk."""
+        self._remember(key, value)
+        if self.directory:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as stored:
+                json.dump({"value": value}, stored)
+            os.replace(tmp_path, path)  # Atomic, so concurrent readers never see partial files
+
+    def get_or_compute(self, image_hash, detector, params, compute):
+        """Returns the cached result for (image, detector, params), computing and storing it on a miss."""
+        key = make_key(image_hash, detector, params)
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, detector=None):
+        """Drops cached results for one detector, or everything when detector is None."""
+        prefix = f"{detector}:" if detector else ""
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+        if self.directory:
+            target = os.path.join(self.directory, detector) if detector else self.directory
+            shutil.rmtree(target, ignore_errors=True)
+            os.makedirs(self.directory, exist_ok=True)
+
+    def stats(self):
+        """Returns hit/miss/eviction counters and the current in-memory size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+            }
@@ -0,0 +1,97 @@
+import math
+import time
+from collections import deque
+import cv2
+import numpy as np
+from .teethanalyzer import TeethAnalyzer, SCORE_METHODS
+
+DEFAULT_STREAM_DETECTORS = ("plaque", "alignment", "gum_inflammation")
+
+class ScoreSmoother:
+    """Sliding-window mean of each detector score, updated in O(1) per frame.
+
+    Non-finite scores (whiteness is NaN on a frame with no bright pixels) still take their slot
+    in the window but are left out of the mean, which is NaN only while the window holds no finite score.
+    """
+    def __init__(self, window=10):
+        self.window = window
+        self._values = {}
+        self._sums = {}  # Sum of the finite values in each window
+        self._counts = {}  # Number of finite values in each window
+
+    def update(self, scores):
+        """Adds one frame's scores and returns the smoothed scores."""
+        smoothed = {}
+        for name, value in scores.items():
+            values = self._values.setdefault(name, deque())
+            values.append(value)
+            self._add(name, value, 1)
+            if len(values) > self.window:
+                self._add(name, values.popleft(), -1)
+            count = self._counts[name]
+            smoothed[name] = self._sums[name] / count if count else math.nan
+        return smoothed
+
+    def _add(self, name, value, sign):
+        finite = math.isfinite(value)
+        self._sums[name] = self._sums.get(name, 0.0) + (sign * value if finite else 0.0)
+        self._counts[name] = self._counts.get(name, 0) + sign * finite
+
+def _thumbnail(frame, size=(64, 48)):
+    """Small grayscale copy used to compare consecutive frames cheaply."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+def _capture_frames(capture):
+    """Yields (timestamp_seconds, retrieve) pairs; frames are only decoded when retrieve() is called."""
+    start = time.monotonic()
+    while capture.grab():
+        position = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        timestamp = position if position > 0 else time.monotonic() - start  # Live cameras may not report a position
+        yield timestamp, lambda: capture.retrieve()[1]
+
+def _array_frames(frames, source_fps):
+    """Yields (timestamp_seconds, retrieve) pairs for an iterable of already decoded frames."""
+    for index, frame in enumerate(frames):
+        yield index / source_fps, lambda frame=frame: frame
+
+def analyze_stream(source, detectors=DEFAULT_STREAM_DETECTORS, target_fps=5.0, min_frame_change=2.0,
+                   window=10, analyzer=None, source_fps=30.0):
+    """Analyzes a video file, camera index, cv2.VideoCapture or iterable of frames, yielding smoothed scores.
+
+    Frames arriving faster than target_fps are dropped without decoding, and frames whose
+    thumbnail differs from the last analyzed one by less than min_frame_change (mean absolute
+    gray level difference) are skipped.
+    """
+    analyzer = analyzer or TeethAnalyzer()
+    unknown = set(detectors) - set(SCORE_METHODS)
+    if unknown:
+        raise ValueError(f"Unknown detectors: {', '.join(sorted(unknown))}")
+
+    owns_capture = isinstance(source, (str, int))
+    if owns_capture:
+        source = cv2.VideoCapture(source)
+        if not source.isOpened():
+            raise ValueError("Failed to open video source")
+    frames = _capture_frames(source) if isinstance(source, cv2.VideoCapture) else _array_frames(source, source_fps)
+
+    smoother = ScoreSmoother(window)
+    min_interval = 1.0 / target_fps if target_fps else 0.0
+    last_time, last_thumbnail = None, None
+    try:
+        for index, (timestamp, retrieve) in enumerate(frames):
+            if last_time is not None and timestamp - last_time < min_interval:
+                continue
+            last_time = timestamp
+            frame = retrieve()
+            if frame is None:
+                continue
+            thumbnail = _thumbnail(frame)
+            if last_thumbnail is not None and np.mean(np.abs(thumbnail - last_thumbnail)) < min_frame_change:
+                continue
+            last_thumbnail = thumbnail
+            scores = analyzer.measure(frame, detectors)
+            yield {"frame": index, "timestamp": timestamp, "scores": scores, "smoothed": smoother.update(scores)}
+    finally:
+        if owns_capture:
+            source.release()
@@ -0,0 +1,459 @@
+import os
+import threading
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from .analysis_history import AnalysisHistory, ReportCodec
+from .analysis_results import DetectorResult, HealthReport, Verdict
+from .image_io import decode_image
+from .image_stats import GrayHistogram
+from .instrumentation import timed
+from .patient_trends import FEATURES
+from .pyramid import pyramid_level, scale_thresholds
+from .result_cache import image_digest
+from .tiling import (BLUR_ROWS, CLAHE_CLIP_LIMIT, CLAHE_TILES, MIN_OVERLAP, EdgeCounter, ExternalContourCounter, LazyContext,
+                     Strip, TiledContext, apply_clahe, clahe_luts)
+
+class AnalysisContext(LazyContext):
+    """Holds one decoded image and lazily caches the intermediates shared by the detectors."""
+    LAZY = ("_digest", "_blurred", "_gray", "_clahe", "_histogram", "_hsv")
+    cache_params = {}  # Extra result cache key parameters; TiledContext adds its strip geometry
+
+    def __init__(self, image):
+        super().__init__()
+        self.image = image
+
+    @property
+    def digest(self):
+        """Content hash of the decoded image, used as the result cache key."""
+        return self._cached("_digest", lambda: timed("digest", image_digest, self.image))
+
+    @property
+    def blurred(self):
+        """Gaussian-blurred copy of the image."""
+        return self._cached("_blurred", lambda: timed("blur", cv2.GaussianBlur, self.image, (5, 5), 0))  # Reduce noise
+
+    @property
+    def gray(self):
+        """Grayscale version of the blurred image."""
+        return self._cached("_gray", lambda: timed("gray", cv2.cvtColor, self.blurred, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def clahe(self):
+        """Contrast-equalized grayscale image used by most detectors."""
+        clahe = lambda: cv2.createCLAHE(clipLimit=CLAHE_CLIP_LIMIT, tileGridSize=CLAHE_TILES)
+        return self._cached("_clahe", lambda: timed("clahe", clahe().apply, self.gray))
+
+    @property
+    def histogram(self):
+        """GrayHistogram of the CLAHE image; the threshold and statistic detectors all read from it."""
+        return self._cached("_histogram", lambda: timed("histogram", GrayHistogram, self.clahe))
+
+    @property
+    def hsv(self):
+        """HSV version of the original (unblurred) image."""
+        return self._cached("_hsv", lambda: timed("hsv", cv2.cvtColor, self.image, cv2.COLOR_BGR2HSV))
+
+    def clahe_strips(self, margin=0):
+        """The CLAHE image as one strip owning every row (TiledContext yields overlapping strips)."""
+        yield Strip(self.clahe, 0, 0, len(self.clahe), True, True)
+
+    def hsv_strips(self):
+        yield self.hsv
+
+class PyramidContext(AnalysisContext):
+    """AnalysisContext on a cv2.pyrDown level of the image, keeping the full-resolution image for refinement."""
+    LAZY = AnalysisContext.LAZY + ("_luts",)
+
+    def __init__(self, image, working_pixels):
+        super().__init__(pyramid_level(image, working_pixels))
+        self.full_image = image
+        self.scale = self.image.shape[1] / image.shape[1]  # Working-level pixels per full-resolution pixel
+        self.cache_params = {"working_shape": list(self.image.shape[:2])}
+
+    @property
+    def pixels(self):
+        """Pixel count of the working level."""
+        return self.image.shape[0] * self.image.shape[1]
+
+    @property
+    def digest(self):
+        """Content hash of the full-resolution image, which refinement reads."""
+        return self._cached("_digest", lambda: timed("digest", image_digest, self.full_image))
+
+    @property
+    def luts(self):
+        """The working level's CLAHE lookup tables (see tiling.clahe_luts)."""
+        return self._cached("_luts", lambda: timed("clahe_luts", clahe_luts, self.gray))
+
+    def full_resolution_clahe(self, box, margin):
+        """CLAHE of the full-resolution pixels under a working-level (x, y, width, height) box, plus margin pixels.
+
+        The working level's lookup tables are applied in full-resolution coordinates, so the crop
+        is contrast-equalized as if the whole frame had been. Returns the crop and its (x, y) offset.
+        """
+        height, width = self.full_image.shape[:2]
+        x, y, box_width, box_height = box
+        left, top = max(0, int(x / self.scale) - margin), max(0, int(y / self.scale) - margin)
+        right = min(width, int((x + box_width) / self.scale) + margin)
+        bottom = min(height, int((y + box_height) / self.scale) + margin)
+        first, last = max(0, top - BLUR_ROWS), min(height, bottom + BLUR_ROWS)
+        first_col, last_col = max(0, left - BLUR_ROWS), min(width, right + BLUR_ROWS)
+        blurred = cv2.GaussianBlur(self.full_image[first:last, first_col:last_col], (5, 5), 0)
+        gray = cv2.cvtColor(blurred[top - first:bottom - first, left - first_col:right - first_col], cv2.COLOR_BGR2GRAY)
+        luts, tile_height, tile_width = self.luts
+        return apply_clahe(gray, luts, tile_height / self.scale, tile_width / self.scale, top, left), (left, top)
+
+DEFAULT_THRESHOLDS = {
+    "cavity_min_area": 100,
+    "cavity_max_area": 1000,
+    "cavity_urgent_count": 5,
+    "whiteness_mask": 180,
+    "whiteness_excellent": 200,
+    "whiteness_good": 170,
+    "whiteness_average": 140,
+    "plaque_intensity": 100,
+    "plaque_count": 1000,
+    "alignment_canny_low": 50,
+    "alignment_canny_high": 150,
+    "alignment_edge_count": 5000,
+    "inflammation_significant": 0.1,
+    "inflammation_mild": 0.05,
+    "enamel_variance": 500,
+    "sensitivity_std": 50,
+}
+
+# Detector name -> TeethAnalyzer method returning that detector's numeric score
+SCORE_METHODS = {
+    "cavities": "_cavity_count",
+    "whiteness": "_whiteness_average",
+    "plaque": "_plaque_count",
+    "alignment": "_edge_count",
+    "gum_inflammation": "_inflammation_score",
+    "enamel": "_enamel_variance",
+    "sensitivity": "_sensitivity_std",
+}
+
+# Detector name -> thresholds its score and verdict depend on (also the result cache key parameters)
+DETECTOR_THRESHOLDS = {
+    "cavities": ("cavity_min_area", "cavity_max_area", "cavity_urgent_count"),
+    "whiteness": ("whiteness_mask", "whiteness_excellent", "whiteness_good", "whiteness_average"),
+    "plaque": ("plaque_intensity", "plaque_count"),
+    "alignment": ("alignment_canny_low", "alignment_canny_high", "alignment_edge_count"),
+    "gum_inflammation": ("inflammation_significant", "inflammation_mild"),
+    "enamel": ("enamel_variance",),
+    "sensitivity": ("sensitivity_std",),
+}
+
+# Thresholds in pixels -> power of the image area they scale with in working-resolution mode (see pyramid.scale_thresholds)
+AREA_SCALED_THRESHOLDS = {
+    "cavity_min_area": 1,
+    "cavity_max_area": 1,
+    "plaque_count": 1,
+    "alignment_edge_count": 0.5,  # Edges are lines, so their pixel count grows with the side length
+}
+
+REPORT_DETECTORS = ("cavities", "whiteness", "plaque", "alignment", "gum_inflammation", "enamel")
+
+CAVITY_FILTER_ROWS = 7  # Rows of context the median blur (2) and adaptive threshold (5) need on each side
+CANNY_ROWS = 2  # Rows of context Canny's 3x3 Sobel (1) and non-maximum suppression (1) need on each side
+CAVITY_REFINE_BAND = 1.25  # Working-level cavity areas within this factor of a size limit are re-measured at full resolution
+CAVITY_REFINE_LIMIT = 64  # Refining at most this many per image (closest to a limit first) bounds the cost
+
+_opencv_lock = threading.Lock()
+_opencv_pools = 0  # Detector thread pools currently running
+_opencv_threads = None  # cv2.getNumThreads() from before the first of them started
+
+@contextmanager
+def opencv_thread_budget(workers):
+    """Shares the cores between `workers` detector threads and OpenCV's own parallel loops for a block.
+
+    cv2.setNumThreads is process-wide, so overlapping blocks share one budget and the last one
+    out restores the previous setting.
+    """
+    global _opencv_pools, _opencv_threads
+    with _opencv_lock:
+        if _opencv_pools == 0:
+            _opencv_threads = cv2.getNumThreads()
+            cv2.setNumThreads(max(1, (os.cpu_count() or 1) // workers))
+        _opencv_pools += 1
+    try:
+        yield
+    finally:
+        with _opencv_lock:
+            _opencv_pools -= 1
+            if _opencv_pools == 0:
+                cv2.setNumThreads(_opencv_threads)
+
+class TeethAnalyzer:
+    def __init__(self, thresholds=None, cache=None, strip_rows=None, strip_overlap=64, detector_threads=None,
+                 quality=None, working_pixels=None, history_size=1024, history_path=None):
+        # Recent results in memory, older ones spilled to history_path (or dropped without one)
+        self.analysis_history = AnalysisHistory(ReportCodec(SCORE_METHODS), history_size, history_path)
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self.cache = cache  # Optional result_cache.ResultCache
+        self.strip_rows = strip_rows  # Analyze taller images in strips of this many rows (tiling.TiledContext)
+        if strip_overlap < MIN_OVERLAP:
+            raise ValueError(f"strip_overlap must be at least {MIN_OVERLAP} row, got {strip_overlap}")
+        self.strip_overlap = strip_overlap
+        self.detector_threads = detector_threads  # Run one image's detectors concurrently on this many threads
+        self._executor = None
+        self._executor_lock = threading.Lock()  # Threads sharing an analyzer must start one pool between them
+        self.quality = quality  # Optional image_quality.QualityGate; failing images raise ImageQualityError
+        self.working_pixels = working_pixels  # Analyze a pyrDown level of about this many pixels (PyramidContext)
+
+    def _read_image(self, image_input):
+        """Reads an image from a file path or encoded buffer, or accepts an existing image array or SharedFrame."""
+        return decode_image(image_input)
+
+    def _preprocess_image(self, image):
+        """Preprocess image for better analysis."""
+        return AnalysisContext(image).clahe
+
+    def _context(self, image_input):
+        """Returns an AnalysisContext, decoding the input only if it is not one already."""
+        if isinstance(image_input, (AnalysisContext, TiledContext)):
+            return image_input
+        image = self._read_image(image_input)
+        if self.quality is not None:
+            self.quality.check(image)  # Reject unusable images before any detector runs
+        if self.working_pixels:
+            return PyramidContext(image, self.working_pixels)
+        if self.strip_rows and image.shape[0] > self.strip_rows:
+            return TiledContext(image, self.strip_rows, self.strip_overlap)
+        return AnalysisContext(image)
+
+    def _thresholds(self, context):
+        """The thresholds as they apply to context; pixel-based ones are rescaled to a PyramidContext's working level."""
+        if isinstance(context, PyramidContext):
+            return scale_thresholds(self.thresholds, AREA_SCALED_THRESHOLDS, context.pixels)
+        return self.thresholds
+
+    def _cavity_mask(self, clahe):
+        """Binary mask of locally dark pixels, the cavity candidates."""
+        image = timed("median_blur", cv2.medianBlur, clahe, 5)  # Reduce noise before thresholding
+        return timed("adaptive_threshold", cv2.adaptiveThreshold, image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                     cv2.THRESH_BINARY_INV, 11, 2)
+
+    def _cavity_count(self, context):
+        """Number of contours whose area falls in the cavity size range."""
+        t = self._thresholds(context)
+        if isinstance(context, PyramidContext):
+            return self._refined_cavity_count(context, t)
+        counter = ExternalContourCounter(t["cavity_min_area"], t["cavity_max_area"])
+        for strip in context.clahe_strips(CAVITY_FILTER_ROWS):
+            while True:
+                binary = strip.trimmed(self._cavity_mask(strip.rows), CAVITY_FILTER_ROWS)
+                contours, _ = timed("find_contours", cv2.findContours, binary.rows, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+                if counter.add(binary, contours):  # Filter cavities
+                    break
+                strip = context.extended(strip)  # A candidate runs past the window
+        return counter.count
+
+    def _refined_cavity_count(self, context, t):
+        """Cavity count on the working level, re-measuring contours whose area is close to a size limit at full resolution."""
+        contours, _ = timed("find_contours", cv2.findContours, self._cavity_mask(context.clahe), cv2.RETR_EXTERNAL,
+                            cv2.CHAIN_APPROX_SIMPLE)
+        low, high = t["cavity_min_area"], t["cavity_max_area"]
+        count, borderline = 0, []
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if context.scale < 1 and any(limit / CAVITY_REFINE_BAND < area < limit * CAVITY_REFINE_BAND for limit in (low, high)):
+                borderline.append((min(abs(np.log(area / limit)) for limit in (low, high)), area, cv2.boundingRect(contour)))
+            else:
+                count += low < area < high
+        borderline.sort(key=lambda candidate: candidate[0])  # Closest to a limit first
+        count += sum(low < area < high for _, area, _ in borderline[CAVITY_REFINE_LIMIT:])
+        if borderline:
+            full = scale_thresholds(self.thresholds, AREA_SCALED_THRESHOLDS, context.full_image.shape[0] * context.full_image.shape[1])
+            boxes = [box for _, _, box in borderline[:CAVITY_REFINE_LIMIT]]
+            count += timed("cavity_refine", self._full_resolution_cavities, context, boxes, full)
+        return count
+
+    def _full_resolution_cavities(self, context, boxes, t):
+        """Cavities found at full resolution whose top-left pixel lies under one of the working-level boxes."""
+        count = 0
+        margin = CAVITY_FILTER_ROWS + int(np.ceil(1 / context.scale))  # Keeps filter borders away from the box
+        for x, y, width, height in boxes:
+            crop, (left, top) = context.full_resolution_clahe((x, y, width, height), margin)
+            contours, _ = cv2.findContours(self._cavity_mask(crop), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            for contour in contours:
+                cx, cy, cw, ch = cv2.boundingRect(contour)
+                if cx == 0 or cy == 0 or cx + cw == crop.shape[1] or cy + ch == crop.shape[0]:
+                    continue  # Cut off by the crop, so its area is unknown
+                px, py = contour[0][0].tolist()  # Mapped to the working level, within a pixel of the box (pyrDown blurs edges)
+                wx, wy = (left + px) * context.scale, (top + py) * context.scale
+                inside = x - 1 <= wx < x + width + 1 and y - 1 <= wy < y + height + 1
+                count += inside and t["cavity_min_area"] < cv2.contourArea(contour) < t["cavity_max_area"]
+        return count
+
+    def _whiteness_average(self, context):
+        """Mean CLAHE intensity of the pixels bright enough to count as teeth."""
+        return context.histogram.mean_above(self.thresholds["whiteness_mask"])
+
+    def _plaque_count(self, context):
+        """Number of pixels dark enough to count as plaque."""
+        return context.histogram.count_at_most(self.thresholds["plaque_intensity"])  # Count plaque regions
+
+    def _edge_count(self, context):
+        """Number of Canny edge pixels, used as the alignment score."""
+        t = self._thresholds(context)
+        low, high = t["alignment_canny_low"], t["alignment_canny_high"]
+        counter = EdgeCounter()
+        for strip in context.clahe_strips(CANNY_ROWS):
+            if strip.whole:  # cv2.Canny follows the edges itself
+                return int(np.count_nonzero(timed("canny", cv2.Canny, strip.rows, low, high)))
+            candidates = strip.trimmed(timed("canny", cv2.Canny, strip.rows, low, low), CANNY_ROWS)
+            strong = strip.trimmed(timed("canny", cv2.Canny, strip.rows, high, high), CANNY_ROWS)
+            counter.add(candidates, strong)
+        return counter.count
+
+    def _inflammation_score(self, context):
+        """Fraction of pixels in the red hue bands."""
+        red = total = 0
+        for hsv in context.hsv_strips():
+            lower_red, upper_red = np.array([0, 70, 50]), np.array([10, 255, 255])
+            mask1 = timed("in_range", cv2.inRange, hsv, lower_red, upper_red)
+            lower_red, upper_red = np.array([170, 70, 50]), np.array([180, 255, 255])
+            mask2 = timed("in_range", cv2.inRange, hsv, lower_red, upper_red)
+            red_mask = cv2.bitwise_or(mask1, mask2)  # Optimized red detection
+            red += int(np.count_nonzero(red_mask))
+            total += red_mask.size
+        return red / total
+
+    def _enamel_variance(self, context):
+        """Variance of the CLAHE image."""
+        return context.histogram.var()
+
+    def _sensitivity_std(self, context):
+        """Standard deviation of the CLAHE image."""
+        return context.histogram.std()
+
+    def _score(self, detector, context):
+        """Numeric score for one detector, served from the result cache when one is configured."""
+        compute = lambda: timed(detector, getattr(self, SCORE_METHODS[detector]), context, kind="detector")
+        if self.cache is None:
+            return compute()
+        t = self._thresholds(context)
+        params = {name: t[name] for name in DETECTOR_THRESHOLDS[detector]}
+        params.update(context.cache_params)
+        return self.cache.get_or_compute(context.digest, detector, params, compute)
+
+    def _scores(self, detectors, context):
+        """Scores for several detectors on one context, in order; concurrent when detector_threads is set.
+
+        OpenCV releases the GIL inside its calls, so the CLAHE chain, the HSV conversion and the
+        detectors that follow them overlap on separate cores.
+        """
+        if not self.detector_threads or len(detectors) < 2:
+            return [self._score(name, context) for name in detectors]
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.detector_threads, thread_name_prefix="detector")
+            executor = self._executor
+        with opencv_thread_budget(self.detector_threads):
+            futures = [executor.submit(self._score, name, context) for name in detectors]
+            return [future.result() for future in futures]
+
+    def close(self):
+        """Shuts down the detector thread pool, if one was started."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def _verdict(self, detector, score, thresholds=None):
+        """Maps a detector score onto a Verdict using the configured (or the given) thresholds."""
+        t = thresholds or self.thresholds
+        if detector == "cavities":
+            return Verdict.HIGH if score > t["cavity_urgent_count"] else Verdict.MODERATE if score > 0 else Verdict.NORMAL
+        if detector == "whiteness":
+            return Verdict.NORMAL if score > t["whiteness_excellent"] else Verdict.LOW if score > t["whiteness_good"] else Verdict.MODERATE if score > t["whiteness_average"] else Verdict.HIGH
+        if detector == "plaque":
+            return Verdict.HIGH if score > t["plaque_count"] else Verdict.NORMAL
+        if detector == "alignment":
+            return Verdict.HIGH if score > t["alignment_edge_count"] else Verdict.NORMAL
+        if detector == "gum_inflammation":
+            return Verdict.HIGH if score > t["inflammation_significant"] else Verdict.MODERATE if score > t["inflammation_mild"] else Verdict.NORMAL
+        if detector == "enamel":
+            return Verdict.HIGH if score < t["enamel_variance"] else Verdict.NORMAL
+        if detector == "sensitivity":
+            return Verdict.HIGH if score > t["sensitivity_std"] else Verdict.NORMAL
+        raise ValueError(f"Unknown detector: {detector}")
+
+    def _result(self, detector, score, context):
+        """Typed DetectorResult for an already computed score, with the thresholds that applied to context."""
+        t = self._thresholds(context)
+        thresholds = tuple(t[name] for name in DETECTOR_THRESHOLDS[detector])
+        return DetectorResult(detector, score, thresholds, self._verdict(detector, score, t))
+
+    def assess(self, image_input, detector):
+        """Runs one detector and returns its typed DetectorResult."""
+        context = self._context(image_input)
+        return self._result(detector, self._score(detector, context), context)
+
+    def assess_many(self, image_input, detectors):
+        """Runs several detectors on one image and returns their DetectorResults in the same order."""
+        context = self._context(image_input)
+        scores = self._scores(detectors, context)
+        return [self._result(name, score, context) for name, score in zip(detectors, scores)]
+
+    def detect_cavities(self, image_input):
+        """Detects cavities using image processing."""
+        result = self.assess(image_input, "cavities")
+        self.analysis_history.append(datetime.now(), result)
+        return str(result)
+
+    def measure_teeth_whiteness(self, image_input):
+        """Measures teeth whiteness."""
+        return str(self.assess(image_input, "whiteness"))
+
+    def detect_plaque(self, image_input):
+        """Detects plaque levels."""
+        return str(self.assess(image_input, "plaque"))
+
+    def check_teeth_alignment(self, image_input):
+        """Analyzes teeth alignment."""
+        return str(self.assess(image_input, "alignment"))
+
+    def detect_gum_inflammation(self, image_input):
+        """Detects gum inflammation."""
+        return str(self.assess(image_input, "gum_inflammation"))
+
+    def analyze_enamel_strength(self, image_input):
+        """Estimates enamel strength."""
+        return str(self.assess(image_input, "enamel"))
+
+    def detect_tooth_sensitivity(self, image_input):
+        """Detects tooth sensitivity."""
+        return str(self.assess(image_input, "sensitivity"))
+
+    def measure(self, image_input, detectors=None):
+        """Returns the raw numeric score behind each detector's verdict, keyed by detector name."""
+        detectors = list(detectors or SCORE_METHODS)
+        scores = self._scores(detectors, self._context(image_input))
+        return {name: float(score) for name, score in zip(detectors, scores)}
+
+    def features(self, image_input):
+        """Feature vector of one image for patient_trends.FeatureTrends, keyed by patient_trends.FEATURES."""
+        context = self._context(image_input)
+        detectors = [detector for detector, _ in FEATURES.values()]
+        scores = dict(zip(detectors, self._scores(detectors, context)))
+        scores["plaque"] /= context.histogram.total
+        return {feature: float(scores[detector]) for feature, (detector, _) in FEATURES.items()}
+
+    def assess_teeth_health(self, image_input):
+        """Performs a full teeth health analysis and returns the typed HealthReport."""
+        report = HealthReport(self.assess_many(image_input, REPORT_DETECTORS))  # Decode and preprocess once for all detectors
+        self.analysis_history.append(datetime.now(), report)
+        return report
+
+    def analyze_teeth_health(self, image_input):
+        """Performs a full teeth health analysis."""
+        return str(self.assess_teeth_health(image_input))
+
+    def get_analysis_history(self):
+        """Returns the history of analyses performed, an iterable of (timestamp, result) pairs."""
+        return self.analysis_history
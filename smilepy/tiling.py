@@ -0,0 +1,368 @@
+import threading
+import cv2
+import numpy as np
+from .image_stats import GrayHistogram
+from .instrumentation import timed
+from .result_cache import image_digest
+
+CLAHE_CLIP_LIMIT = 2.0
+CLAHE_TILES = (8, 8)  # (columns, rows), as cv2.createCLAHE takes them
+BLUR_ROWS = 2  # Rows of context the 5x5 Gaussian blur needs on each side
+MIN_OVERLAP = 1  # Rows above its own a strip needs to tell contours continuing from the strip above from new ones
+
+class LazyContext:
+    """Base for the analysis contexts: intermediates named in LAZY start as None and are computed once.
+
+    Each intermediate has its own lock, so detectors running on threads that need the same
+    intermediate wait for one computation instead of repeating it, while independent ones
+    (the CLAHE chain and the HSV conversion, say) still compute in parallel.
+    """
+    LAZY = ()
+
+    def __init__(self):
+        self._locks = {name: threading.Lock() for name in self.LAZY}
+        for name in self.LAZY:
+            setattr(self, name, None)
+
+    def _cached(self, attribute, compute):
+        value = getattr(self, attribute)
+        if value is None:
+            with self._locks[attribute]:
+                value = getattr(self, attribute)
+                if value is None:
+                    value = compute()
+                    setattr(self, attribute, value)
+        return value
+
+class Strip:
+    """A window of image rows; rows [top, bottom) of the window are the ones this strip owns.
+
+    Everything outside [top, bottom) is overlap shared with the neighbouring strips, kept so
+    filters and contours see the same neighbourhood they would in the full frame.
+    """
+    __slots__ = ("rows", "first_row", "top", "bottom", "at_top", "at_bottom")
+
+    def __init__(self, rows, first_row, top, bottom, at_top, at_bottom):
+        self.rows = rows
+        self.first_row = first_row  # Image row of rows[0]
+        self.top = top
+        self.bottom = bottom
+        self.at_top = at_top  # Window starts at the first image row
+        self.at_bottom = at_bottom  # Window ends at the last image row
+
+    @property
+    def whole(self):
+        """True when the strip owns every image row, as the single strip of a full-frame AnalysisContext does."""
+        return self.at_top and self.at_bottom and self.top == 0 and self.bottom == len(self.rows)
+
+    def trimmed(self, rows, margin):
+        """Strip over `rows` (computed from self.rows) minus the margin a filter could not compute exactly."""
+        start = 0 if self.at_top else margin
+        stop = len(rows) if self.at_bottom else len(rows) - margin
+        return Strip(rows[start:stop], self.first_row + start, self.top - start, self.bottom - start,
+                     self.at_top, self.at_bottom)
+
+class _LabelUnion:
+    """Union-find over strip-local labels that meet a strip border, shared by the strip counters."""
+    def __init__(self):
+        self._parent = {}
+        self._next_label = 1  # First global label of the next strip
+        self._last_row = None  # Global labels of the previous strip's last owned row
+
+    def _find(self, label):
+        root = label
+        while self._parent.get(root, root) != root:
+            root = self._parent[root]
+        while label != root:
+            self._parent[label], label = root, self._parent.get(label, label)
+        return root
+
+    def _union(self, a, b):
+        a, b = self._find(a), self._find(b)
+        if a != b:
+            self._parent[max(a, b)] = min(a, b)
+
+class ExternalContourCounter(_LabelUnion):
+    """Counts RETR_EXTERNAL contours with min_area < area < max_area in a binary image that arrives as strips.
+
+    A strip reports only contours whose top row it owns, so each contour is counted once; a
+    candidate that runs past the bottom of its window makes add() ask for a taller window.
+    Whether a contour is external in the full frame depends on the background region around it
+    reaching the image border, which may only be decided strips later, so background regions
+    (4-connected, as cv2.findContours sees them) are merged across strip borders with a
+    union-find and the count is resolved at the end.
+    """
+    def __init__(self, min_area, max_area):
+        super().__init__()
+        self.min_area = min_area
+        self.max_area = max_area
+        self._count = 0
+        self._border_labels = set()  # Background labels touching the image border
+        self._candidates = []  # Background label around each owned contour
+
+    def add(self, strip, contours):
+        """Adds the contours found in one (trimmed) binary strip; False means retry with a taller window."""
+        areas = [cv2.contourArea(contour) for contour in contours]
+        if strip.whole:
+            self._count += sum(1 for area in areas if self.min_area < area < self.max_area)
+            return True
+        owned = []
+        for contour, area in zip(contours, areas):
+            _, y, _, height = cv2.boundingRect(contour)
+            if not strip.top <= y < strip.bottom or area >= self.max_area:
+                continue  # Another strip's, or too large even if it is cut off (the full contour only encloses more)
+            if y + height >= len(strip.rows) and not strip.at_bottom:
+                return False
+            if area > self.min_area:
+                owned.append(contour)
+        rows = strip.rows[strip.top:strip.bottom]
+        count, labels = cv2.connectedComponents((rows == 0).view(np.uint8), connectivity=4, ltype=cv2.CV_32S)
+        labels = np.where(labels > 0, labels + (self._next_label - 1), 0)
+        self._next_label += count - 1
+        if self._last_row is not None:  # Join background regions that continue across the strip border
+            above, below = self._last_row, labels[0]
+            joined = (above > 0) & (below > 0)
+            for a, b in set(zip(above[joined].tolist(), below[joined].tolist())):
+                self._union(a, b)
+        edges = [labels[:, 0], labels[:, -1]]
+        if strip.at_top and strip.top == 0:
+            edges.append(labels[0])
+        if strip.at_bottom and strip.bottom == len(strip.rows):
+            edges.append(labels[-1])
+        self._border_labels.update(np.unique(np.concatenate(edges)).tolist())
+        for contour in owned:
+            x, y = contour[0][0]  # Contours start at their top-left pixel
+            row = y - strip.top - 1  # The background pixel just above it, in owned coordinates
+            if row < 0 and self._last_row is None:
+                self._count += 1  # Touches the image top, so it is external
+            else:
+                self._candidates.append(int(labels[row, x] if row >= 0 else self._last_row[x]))
+        self._last_row = labels[-1]
+        return True
+
+    @property
+    def count(self):
+        """Number of external contours added so far; only final once every strip has been added."""
+        border_roots = {self._find(label) for label in self._border_labels if label}
+        return self._count + sum(1 for label in self._candidates if self._find(label) in border_roots)
+
+class EdgeCounter(_LabelUnion):
+    """Counts cv2.Canny edge pixels of an image that arrives as strips.
+
+    Canny keeps the candidate pixels (gradient maxima above the low threshold) whose 8-connected
+    chain of candidates reaches a strong pixel (above the high threshold). Candidates and strong
+    pixels only depend on a few rows around them, so each strip finds them exactly, but a chain
+    can run through any number of strips. Chains inside one strip are settled when it is added;
+    the ones that meet a strip border are merged with a union-find and resolved at the end.
+    """
+    def __init__(self):
+        super().__init__()
+        self._count = 0
+        self._sizes = {}  # Pixels of each chain that meets a strip border
+        self._strong = set()  # Those of them holding a strong pixel
+
+    def add(self, candidates, strong):
+        """Adds one strip as two (trimmed) Canny masks: candidates and strong pixels."""
+        rows = candidates.rows[candidates.top:candidates.bottom]
+        count, labels = cv2.connectedComponents(rows, connectivity=8, ltype=cv2.CV_32S)
+        sizes = np.bincount(labels.ravel(), minlength=count)
+        has_strong = np.zeros(count, dtype=bool)
+        has_strong[labels[strong.rows[strong.top:strong.bottom] > 0]] = True
+        border = np.zeros(count, dtype=bool)
+        border[labels[0]] = border[labels[-1]] = True
+        border[0] = False
+        has_strong[0] = False
+        self._count += int(sizes[has_strong & ~border].sum())
+        offset = self._next_label - 1
+        for label in np.flatnonzero(border).tolist():
+            self._sizes[label + offset] = int(sizes[label])
+            if has_strong[label]:
+                self._strong.add(label + offset)
+        first, last = (np.where(row > 0, row + offset, 0) for row in (labels[0], labels[-1]))
+        self._next_label += count - 1
+        if self._last_row is not None:  # Join chains that continue across the strip border, diagonally too
+            above = self._last_row
+            for a, b in ((above[1:], first[:-1]), (above, first), (above[:-1], first[1:])):
+                joined = (a > 0) & (b > 0)
+                for pair in set(zip(a[joined].tolist(), b[joined].tolist())):
+                    self._union(*pair)
+        self._last_row = last
+
+    @property
+    def count(self):
+        """Number of edge pixels added so far; only final once every strip has been added."""
+        strong_roots = {self._find(label) for label in self._strong}
+        return self._count + sum(size for label, size in self._sizes.items() if self._find(label) in strong_roots)
+
+def _clahe_geometry(height, width):
+    """(pad rows, pad columns, tile height, tile width) exactly as cv2.CLAHE pads the image to whole tiles."""
+    tiles_x, tiles_y = CLAHE_TILES
+    if width % tiles_x == 0 and height % tiles_y == 0:
+        pad_y = pad_x = 0
+    else:  # OpenCV pads both axes, a whole tile's worth on an axis that already divides evenly
+        pad_y, pad_x = tiles_y - height % tiles_y, tiles_x - width % tiles_x
+    return pad_y, pad_x, (height + pad_y) // tiles_y, (width + pad_x) // tiles_x
+
+def _clahe_luts(histograms, tile_area):
+    """Clipped, redistributed and equalized lookup tables from per-tile histograms, as cv2.CLAHE builds them."""
+    clip = max(int(CLAHE_CLIP_LIMIT * tile_area / 256), 1)
+    excess = np.maximum(histograms - clip, 0).sum(axis=1)
+    histograms = np.minimum(histograms, clip) + (excess // 256)[:, None]
+    for tile in np.flatnonzero(excess % 256):
+        residual = int(excess[tile] % 256)
+        histograms[tile, np.arange(0, 256, max(256 // residual, 1))[:residual]] += 1
+    scale = np.float32(255) / np.float32(tile_area)
+    luts = np.rint(np.cumsum(histograms, axis=1).astype(np.float32) * scale)
+    return np.clip(luts, 0, 255).astype(np.uint8)
+
+def _interpolation(positions, tile_size, tiles):
+    """Lower/upper tile index and the two bilinear weights along one axis, in cv2.CLAHE's float32 arithmetic."""
+    scaled = positions.astype(np.float32) * (np.float32(1) / np.float32(tile_size)) - np.float32(0.5)
+    lower = np.floor(scaled)
+    weight = (scaled - lower).astype(np.float32)
+    lower = lower.astype(np.intp)
+    return np.maximum(lower, 0), np.minimum(lower + 1, tiles - 1), np.float32(1) - weight, weight
+
+def _runs(lower, upper, count):
+    """(start, stop) ranges over which a (lower, upper) tile pair stays the same."""
+    edges = np.flatnonzero(np.diff(lower * count + upper)) + 1
+    return zip(np.r_[0, edges], np.r_[edges, len(lower)])
+
+def clahe_luts(gray):
+    """(lookup tables shaped tiles_y x tiles_x x 256, tile height, tile width) of cv2.CLAHE on an in-memory image."""
+    height, width = gray.shape
+    pad_y, pad_x, tile_height, tile_width = _clahe_geometry(height, width)
+    tiles_x, tiles_y = CLAHE_TILES
+    padded = cv2.copyMakeBorder(gray, 0, pad_y, 0, pad_x, cv2.BORDER_REFLECT_101) if pad_y or pad_x else gray
+    tiles = padded.reshape(tiles_y, tile_height, tiles_x, tile_width).transpose(0, 2, 1, 3).reshape(-1, tile_height * tile_width)
+    histograms = np.bincount((tiles + (np.arange(len(tiles)) * 256)[:, None]).ravel(), minlength=len(tiles) * 256)
+    luts = _clahe_luts(histograms.reshape(-1, 256), tile_height * tile_width)
+    return luts.reshape(tiles_y, tiles_x, 256), tile_height, tile_width
+
+def apply_clahe(gray, luts, tile_height, tile_width, first_row=0, first_col=0):
+    """CLAHE output for a block of gray pixels whose top-left pixel sits at (first_row, first_col) of the image.
+
+    Tile sizes may be fractional, which lets tables built on a downsampled image be applied to
+    full-resolution pixels (in full-resolution coordinates).
+    """
+    tiles_y, tiles_x = luts.shape[:2]
+    x1, x2, x_weight1, x_weight2 = _interpolation(np.arange(first_col, first_col + gray.shape[1]), tile_width, tiles_x)
+    y1, y2, y_weight1, y_weight2 = _interpolation(np.arange(first_row, first_row + gray.shape[0]), tile_height, tiles_y)
+    output = np.empty_like(gray)
+    for row_start, row_stop in _runs(y1, y2, tiles_y):
+        band = gray[row_start:row_stop]
+        planes = [np.empty_like(band) for _ in range(4)]
+        for col_start, col_stop in _runs(x1, x2, tiles_x):
+            block = band[:, col_start:col_stop]
+            corners = ((y1[row_start], x1[col_start]), (y1[row_start], x2[col_start]),
+                       (y2[row_start], x1[col_start]), (y2[row_start], x2[col_start]))
+            for plane, (tile_y, tile_x) in zip(planes, corners):
+                plane[:, col_start:col_stop] = cv2.LUT(block, luts[tile_y, tile_x])
+        upper = planes[0] * x_weight1 + planes[1] * x_weight2
+        lower = planes[2] * x_weight1 + planes[3] * x_weight2
+        blended = upper * y_weight1[row_start:row_stop, None] + lower * y_weight2[row_start:row_stop, None]
+        output[row_start:row_stop] = np.clip(np.rint(blended), 0, 255)
+    return output
+
+class TiledContext(LazyContext):
+    """Memory-bounded stand-in for AnalysisContext on very large images.
+
+    The blurred, gray and CLAHE images are never built at full size. Detectors walk overlapping
+    horizontal strips instead, so each temporary is at most (strip_rows + 2 * overlap) rows tall.
+    CLAHE lookup tables come from a first pass over the whole image, which keeps the CLAHE output
+    identical to cv2.CLAHE on the full frame. Detectors add the rows their filters need on top of
+    the overlap, and contours and edges are merged across strip borders, so scores match the full
+    frame for any overlap of at least MIN_OVERLAP rows. A larger overlap only means fewer cavity
+    candidates run past their window and force a taller one.
+    """
+    LAZY = ("_digest", "_luts", "_histogram")
+
+    def __init__(self, image, strip_rows=512, overlap=64):
+        if overlap < MIN_OVERLAP:
+            raise ValueError(f"Strip overlap must be at least {MIN_OVERLAP} row, got {overlap}")
+        super().__init__()
+        self.image = image
+        self.strip_rows = strip_rows
+        self.overlap = overlap
+        self.cache_params = {"strip_rows": strip_rows, "overlap": overlap}
+
+    @property
+    def digest(self):
+        """Content hash of the decoded image, used as the result cache key."""
+        return self._cached("_digest", lambda: timed("digest", image_digest, self.image))
+
+    def _strip_bounds(self):
+        height = self.image.shape[0]
+        for start in range(0, height, self.strip_rows):
+            yield start, min(start + self.strip_rows, height)
+
+    def _gray_rows(self, start, stop):
+        """Rows [start, stop) of the blurred grayscale image, blurring only those rows plus BLUR_ROWS context."""
+        first, last = max(0, start - BLUR_ROWS), min(self.image.shape[0], stop + BLUR_ROWS)
+        blurred = timed("blur", cv2.GaussianBlur, self.image[first:last], (5, 5), 0)
+        return timed("gray", cv2.cvtColor, blurred[start - first:stop - first], cv2.COLOR_BGR2GRAY)
+
+    @property
+    def luts(self):
+        """(lookup tables shaped tiles_y x tiles_x x 256, tile height, tile width) for the full-frame CLAHE."""
+        return self._cached("_luts", lambda: timed("clahe_luts", self._build_luts))
+
+    def _build_luts(self):
+        height, width = self.image.shape[:2]
+        pad_y, pad_x, tile_height, tile_width = _clahe_geometry(height, width)
+        tiles_x, tiles_y = CLAHE_TILES
+        column_tiles = (np.arange(width + pad_x) // tile_width * 256)[None, :]
+        histograms = np.zeros((tiles_y, tiles_x * 256), dtype=np.int64)
+        def add(gray, first_row):
+            if pad_x:
+                gray = cv2.copyMakeBorder(gray, 0, 0, 0, pad_x, cv2.BORDER_REFLECT_101)
+            for tile_row in range(first_row // tile_height, (first_row + len(gray) - 1) // tile_height + 1):
+                lo = max(tile_row * tile_height - first_row, 0)
+                hi = min((tile_row + 1) * tile_height - first_row, len(gray))
+                histograms[tile_row] += np.bincount((column_tiles + gray[lo:hi]).ravel(), minlength=tiles_x * 256)
+        for start, stop in self._strip_bounds():
+            add(self._gray_rows(start, stop), start)
+        if pad_y:  # BORDER_REFLECT_101 below the last row: rows height-2, height-3, ..., bouncing off row 0 on short images
+            period = max(2 * (height - 1), 1)
+            rows = np.arange(height, height + pad_y) % period
+            rows = np.where(rows < height, rows, period - rows)
+            first = int(rows.min())
+            add(self._gray_rows(first, height)[rows - first], height)
+        luts = _clahe_luts(histograms.reshape(-1, 256), tile_height * tile_width)
+        return luts.reshape(tiles_y, tiles_x, 256), tile_height, tile_width
+
+    def _clahe_rows(self, start, stop):
+        """Rows [start, stop) of the CLAHE image, interpolating the full-frame lookup tables."""
+        return apply_clahe(self._gray_rows(start, stop), *self.luts, start)
+
+    def clahe_strips(self, margin=0):
+        """Overlapping CLAHE strips; each window extends overlap + margin rows past the rows it owns."""
+        height = self.image.shape[0]
+        extra = self.overlap + margin
+        for start, stop in self._strip_bounds():
+            first, last = max(0, start - extra), min(height, stop + extra)
+            rows = timed("clahe", self._clahe_rows, first, last)
+            yield Strip(rows, first, start - first, stop - first, first == 0, last == height)
+
+    def extended(self, strip):
+        """The same strip with twice as many rows below the ones it owns."""
+        height = self.image.shape[0]
+        last = min(height, strip.first_row + strip.bottom + 2 * (len(strip.rows) - strip.bottom))
+        rows = timed("clahe", self._clahe_rows, strip.first_row, last)
+        return Strip(rows, strip.first_row, strip.top, strip.bottom, strip.at_top, last == height)
+
+    def hsv_strips(self):
+        """HSV conversion of each strip's own rows (the conversion is per pixel, so no overlap is needed)."""
+        for start, stop in self._strip_bounds():
+            yield timed("hsv", cv2.cvtColor, self.image[start:stop], cv2.COLOR_BGR2HSV)
+
+    @property
+    def histogram(self):
+        """GrayHistogram of the CLAHE image, summed strip by strip."""
+        return self._cached("_histogram", self._build_histogram)
+
+    def _build_histogram(self):
+        counts = np.zeros(256, dtype=np.int64)
+        for start, stop in self._strip_bounds():
+            counts += GrayHistogram(timed("clahe", self._clahe_rows, start, stop)).counts
+        return GrayHistogram.from_counts(counts)
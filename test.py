@@ -1,13 +1,13 @@
-import cv2
-from teethanalyzer import TeethAnalyzer
-from patientrecord import PatientRecord
-from oral_healthcheck import OralHealthCheck
-from diet_teethcare import DietTeethCare
-from checkup_medicine import CheckupMedicineReminder
+from smilepy.patientrecord import PatientRecord
+from smilepy.oral_healthcheck import OralHealthCheck
+from smilepy.diet_teethcare import DietTeethCare
+from smilepy.checkup_medicine import CheckupMedicineReminder
 from datetime import datetime
 
 def run_analysis(image_path):
-    
+    import cv2
+    from smilepy.teethanalyzer import TeethAnalyzer
+
     try:
         img = cv2.imread(image_path)
         if img is None:
@@ -147,12 +147,994 @@ def test_checkup_medicine_reminder():
     except Exception as e:
         print(f"\nError during checkup & medicine reminder test: {str(e)}")
 
+def _post_image(port, data):
+    """Raw HTTP response to POSTing data to a local AnalysisService, read until the server closes the connection."""
+    import socket
+
+    with socket.create_connection(("127.0.0.1", port), timeout=60) as client:
+        client.sendall(b"POST /analyze?detectors=plaque HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(data) + data)
+        response = b""
+        while True:
+            chunk = client.recv(65536)  # Times out instead of returning b"" if the connection stays open
+            if not chunk:
+                return response
+            response += chunk
+
+def _serve(service):
+    """Starts service on a free port with its event loop on a thread; returns (port, stop)."""
+    import asyncio
+    import threading
+
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(service.start("127.0.0.1", 0))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    def stop():
+        asyncio.run_coroutine_threadsafe(service.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+    return server.sockets[0].getsockname()[1], stop
+
+def _download_bytes():
+    import os
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "download.jpg"), "rb") as image:
+        return image.read()
+
+def test_service_closes_connection():
+    """Every client, including the one whose request starts the worker pool, reads EOF after its response."""
+    from smilepy.analysis_service import AnalysisService
+
+    port, stop = _serve(AnalysisService(workers=1))
+    try:
+        for _ in range(2):
+            assert _post_image(port, _download_bytes()).startswith(b"HTTP/1.1 200 OK")
+    finally:
+        stop()
+
+def test_service_recovers_from_dead_worker():
+    """A killed worker costs the request it broke a 503; the pool is rebuilt and nothing stays pending."""
+    import os
+    import signal
+    from smilepy.analysis_service import AnalysisService
+
+    service = AnalysisService(workers=1, max_pending=1)
+    port, stop = _serve(service)
+    data = _download_bytes()
+    try:
+        assert _post_image(port, data).startswith(b"HTTP/1.1 200 OK")
+        for pid in list(service._executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        assert _post_image(port, data).startswith(b"HTTP/1.1 503 Service Unavailable")
+        for _ in range(3):  # More requests than max_pending, so a leaked pending slot would show up as 429
+            assert _post_image(port, data).startswith(b"HTTP/1.1 200 OK")
+        assert service.pending == 0
+    finally:
+        stop()
+
+def test_score_smoother_window():
+    """The smoother averages the last `window` scores per detector and skips NaN scores instead of turning NaN for good."""
+    import math
+    from smilepy.stream_analysis import ScoreSmoother
+
+    smoother = ScoreSmoother(window=3)
+    assert smoother.update({"plaque": 3.0, "whiteness": 200.0}) == {"plaque": 3.0, "whiteness": 200.0}
+    assert smoother.update({"plaque": 6.0, "whiteness": math.nan}) == {"plaque": 4.5, "whiteness": 200.0}
+    assert smoother.update({"plaque": 9.0, "whiteness": 190.0}) == {"plaque": 6.0, "whiteness": 195.0}
+    assert smoother.update({"plaque": 12.0, "whiteness": 180.0}) == {"plaque": 9.0, "whiteness": 185.0}
+    assert smoother.update({"plaque": 0.0, "whiteness": 170.0})["whiteness"] == 180.0  # The NaN has left the window
+    for _ in range(3):
+        smoothed = smoother.update({"whiteness": math.nan})
+    assert math.isnan(smoothed["whiteness"])
+    assert smoother.update({"whiteness": 160.0})["whiteness"] == 160.0
+
+def test_bulk_import_rejects_bad_records():
+    """Malformed lines and badly typed fields become per-record errors, and nothing ever prompts."""
+    import builtins
+    import os
+    import tempfile
+    from smilepy.bulk_import import BulkImporter, iter_records
+
+    lines = [
+        '{"kind": "appointment", "date": "2030-01-01 10:00"}',
+        '{"kind": "appointment", "date": 20240101',  # Truncated JSON
+        "",
+        '{"kind": "appointment", "date": 20240101}',
+        '{"kind": "medication", "medicine": null, "time": "08:00"}',
+        '{"kind": "questionnaire", "sensitivity": true}',
+        '{"kind": "questionnaire", "bad_breath": null}',
+        '{"kind": "questionnaire", "missed_doses": null}',
+        '{"kind": "questionnaire", "missed_doses": Infinity}',
+        '[1, 2]',
+        '{"kind": ["appointment"]}',
+        '{"kind": "questionnaire", "bad_breath": "YES", "sensitivity": " cold ", "missed_doses": 4.5}',
+    ]
+    path = os.path.join(tempfile.mkdtemp(), "intake.jsonl")
+    with open(path, "w", encoding="utf-8") as intake:
+        intake.write("\n".join(lines) + "\n")
+
+    def no_prompt(prompt=""):
+        raise AssertionError(f"Bulk import prompted: {prompt}")
+    original, builtins.input = builtins.input, no_prompt
+    try:
+        results = list(BulkImporter().evaluate(iter_records(path)))
+    finally:
+        builtins.input = original
+    errors = {result["line"] for result in results if "error" in result}
+    assert [result["line"] for result in results] == [1, 2, 4, 5, 6, 7, 8, 9, 10, 11, 12]
+    assert errors == {2, 4, 5, 6, 7, 8, 9, 10, 11}
+    assert results[1]["error"].startswith("Malformed JSON")
+    assert results[-1]["results"] == {"bad_breath": "Possible bad breath due to dry mouth.",
+                                      "sensitivity": "Teeth sensitivity detected for cold.",
+                                      "missed_doses": "⚠ Warning! Your medication adherence is poor."}
+
+def test_cohort_yes_no_object_column():
+    """Object-dtype answers are read like string columns: "no" is no, and None counts as not answered."""
+    import numpy as np
+    from smilepy.cohort_scoring import decode, score_cohort
+
+    answers = ["yes", "no", " Yes ", "NO", True, False, None]
+    column = np.array(answers, dtype=object)
+    codes = score_cohort(bad_breath=column)["bad_breath"]
+    assert codes.tolist() == [1, 0, 1, 0, 1, 0, 0]
+    checker = OralHealthCheck()
+    assert decode("bad_breath", codes[:-1]).tolist() == [checker.detect_bad_breath(answer) for answer in answers[:-1]]
+
+def test_cohort_missed_doses_match_scalar():
+    """Fractional missed-dose counts are truncated like the scalar check, code for code."""
+    from smilepy.cohort_scoring import decode, score_cohort
+
+    doses = [0, 2.5, 3, 3.5, 3.99, 4, 4.5, 10.2]
+    codes = score_cohort(missed_doses=doses)["missed_doses"]
+    reminders = CheckupMedicineReminder()
+    assert decode("missed_doses", codes).tolist() == [reminders.detect_irregular_medication_usage(dose) for dose in doses]
+
+def test_strips_match_full_frame():
+    """Cavity and alignment scores of thin strips match the full frame down to a 1-row overlap, and 0 is refused."""
+    import os
+    import cv2
+    from smilepy.teethanalyzer import TeethAnalyzer
+
+    image = cv2.imread(os.path.join(os.path.dirname(os.path.abspath(__file__)), "download.jpg"))
+    full = TeethAnalyzer().measure(image)
+    for strip_rows, overlap in ((16, 1), (16, 3), (37, 64)):
+        assert TeethAnalyzer(strip_rows=strip_rows, strip_overlap=overlap).measure(image) == full
+    try:
+        TeethAnalyzer(strip_rows=16, strip_overlap=0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("strip_overlap=0 was accepted")
+
+def test_batch_reuses_analyzer():
+    """Batch analysis builds one TeethAnalyzer per setting and process, with the same results as a fresh one per image."""
+    import os
+    from smilepy import batch_analysis
+    from smilepy.teethanalyzer import REPORT_DETECTORS, TeethAnalyzer
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "download.jpg")
+    records = list(batch_analysis.run_batch([path, path], workers=1))
+    analyzer = batch_analysis._analyzers[(False, None)]
+    expected = {name: TeethAnalyzer().assess(path, name).to_dict() for name in REPORT_DETECTORS}
+    assert [record["results"] for record in records] == [expected, expected]
+    assert batch_analysis.analyze_image(path)["results"] == expected
+    assert batch_analysis._analyzers[(False, None)] is analyzer
+
+def test_store_search_matches_memory():
+    """PatientStore search returns exactly what the in-memory search does, with FTS5 and with the LIKE fallback."""
+    import os
+    import tempfile
+    from smilepy.analysis_results import TeethAnalysis, Verdict
+    from smilepy.patient_store import PatientStore
+
+    records = [(f"2024-0{month}-01", TeethAnalysis(cavities, brightness, Verdict(month % 4), Verdict(3 - month % 4)))
+               for month, (cavities, brightness) in enumerate([(0, 190.0), (3, 150.5), (9, 90.25), (1, 120.0)], 1)]
+    in_memory = PatientRecord("Alice", 30)
+    in_memory.add_analyses(records)
+    keywords = ["", "-", "_", "%", "Cavit", "avities", "ISH", "no major", "condition keep", "condition. keep",
+                "great condition!", "detected 9", " teeth", "\n- teeth", "whitening", "caf\u00e9"]
+    with tempfile.TemporaryDirectory() as directory:
+        store = PatientStore(os.path.join(directory, "patients.db"))
+        stored = PatientRecord("Alice", 30, store)
+        stored.add_analyses(records)
+        for has_fts in {store.has_fts, False}:
+            store.has_fts = has_fts
+            for keyword in keywords:
+                expected = [(date, a.render()) for date, a in in_memory.search_teeth_history(keyword)]
+                assert [(date, a.render()) for date, a in stored.search_teeth_history(keyword)] == expected, keyword
+        store.close()
+
+def test_store_keeps_same_name_patients_apart():
+    """Patients with the same name but different keys have separate histories; an unkeyed age clash is refused."""
+    import os
+    import tempfile
+    from smilepy.analysis_results import TeethAnalysis, Verdict
+    from smilepy.patient_store import PatientStore
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = PatientStore(os.path.join(directory, "patients.db"))
+        first = PatientRecord("John Doe", 30, store, patient_key="MRN-1")
+        second = PatientRecord("John Doe", 52, store, patient_key="MRN-2")
+        assert first.patient_id != second.patient_id
+        first.add_analyses([("2024-01-01", TeethAnalysis(1, 150.0, Verdict.NORMAL, Verdict.NORMAL))])
+        assert second.get_history() == [] and len(first.get_history()) == 1
+        assert PatientRecord("John Doe", 31, store, patient_key="MRN-1").patient_id == first.patient_id
+
+        unkeyed = PatientRecord("Jane Roe", 40, store)
+        assert PatientRecord("Jane Roe", None, store).patient_id == unkeyed.patient_id
+        try:
+            PatientRecord("Jane Roe", 25, store)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("a second Jane Roe with another age was merged into the first")
+        store.set_age(unkeyed.patient_id, 41)
+        assert PatientRecord("Jane Roe", 41, store).patient_id == unkeyed.patient_id
+        assert sorted((name, age) for name, age, _ in store.histories()) == [("Jane Roe", 41), ("John Doe", 31), ("John Doe", 52)]
+        store.close()
+
+def test_store_and_memory_order_history_alike():
+    """Back-dated records come back in date order, same-date ones in the order added, from either backend."""
+    import os
+    import tempfile
+    from smilepy.analysis_results import TeethAnalysis, Verdict
+    from smilepy.patient_store import PatientStore
+
+    visits = [("2024-03-01", 1), ("2024-01-15", 2), ("2024-03-01", 3), ("2024-02-01", 4)]
+    records = [(date, TeethAnalysis(cavities, 150.0, Verdict.NORMAL, Verdict.MODERATE)) for date, cavities in visits]
+    with tempfile.TemporaryDirectory() as directory:
+        store = PatientStore(os.path.join(directory, "patients.db"))
+        for patient in (PatientRecord("Alice", 30), PatientRecord("Alice", 30, store)):
+            patient.add_analyses(records[:2])
+            for record in records[2:]:
+                patient.add_analyses([record])
+            history = [(date, analysis.cavity_count) for date, analysis in patient.get_history()]
+            assert history == [("2024-01-15", 2), ("2024-02-01", 4), ("2024-03-01", 1), ("2024-03-01", 3)]
+            assert patient.get_last_analysis()[1].cavity_count == 3
+            assert [analysis.cavity_count for _, analysis in patient.get_history(start="2024-02-01")] == [4, 1, 3]
+        store.close()
+
+def test_reminder_scheduler_queries():
+    """Appointments are indexed by date, and due reminders pop in time order with daily doses requeued."""
+    from datetime import datetime, timedelta
+    from smilepy.reminder_scheduler import ReminderScheduler
+
+    now = datetime(2024, 5, 1, 12, 0)
+    scheduler = ReminderScheduler(appointment_lead=timedelta(hours=1))
+    scheduler.add_appointments([(now + timedelta(days=2), "Bob"), (now - timedelta(days=1), "Ann")], now=now)
+    scheduler.add_appointment(now + timedelta(minutes=30), "Cid", now=now)
+    scheduler.add_medication("Fluoride", "08:00", "Ann", now=now)
+    assert len(scheduler) == 4
+    assert [r["patient"] for r in scheduler.upcoming(now)] == ["Cid", "Bob"]
+    assert [r["patient"] for r in scheduler.missed(now)] == ["Ann"] and scheduler.count_missed(now) == 1
+    assert [r["patient"] for r in scheduler.between(now, now + timedelta(days=1))] == ["Cid"]
+    assert scheduler.next_due_time() == now - timedelta(minutes=30)
+
+    fired = scheduler.pop_due(now + timedelta(days=3))
+    assert [(time, r.get("patient")) for time, r in fired] == [
+        (now - timedelta(minutes=30), "Cid"), (datetime(2024, 5, 2, 8, 0), "Ann"), (now + timedelta(days=2, hours=-1), "Bob")]
+    assert scheduler.next_due_time() == datetime(2024, 5, 5, 8, 0)  # Tomorrow's dose after the last one that fired
+    assert scheduler.pop_due(now + timedelta(days=3)) == []
+
+def test_reminder_scheduler_threaded_adds():
+    """Reminders added from several threads while run() pops them all fire exactly once, and none early."""
+    import asyncio
+    import sys
+    import threading
+    import time
+    from datetime import datetime, timedelta
+    from smilepy.reminder_scheduler import ReminderScheduler
+
+    scheduler = ReminderScheduler(appointment_lead=timedelta(hours=1))
+    fired = []
+    loop = asyncio.new_event_loop()
+    runner = threading.Thread(target=loop.run_until_complete,
+                              args=(scheduler.run(lambda time, reminder: fired.append(reminder["patient"]), max_sleep=0.001),))
+
+    def add(thread):
+        for i in range(100):
+            soon = datetime.now() + timedelta(minutes=59, seconds=59)  # Due within a second of being added
+            later = datetime.now() + timedelta(days=1)  # Never due during the test
+            if i % 2:
+                scheduler.add_appointment(soon, (thread, i))
+            else:
+                scheduler.add_appointments([(later, None)] * 50 + [(soon, (thread, i))] + [(later, None)] * 50)
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Switch threads often, so adds interleave with the loop's pops
+    try:
+        runner.start()
+        adders = [threading.Thread(target=add, args=(thread,)) for thread in range(4)]
+        for adder in adders:
+            adder.start()
+        for adder in adders:
+            adder.join()
+        deadline = time.monotonic() + 5
+        while len(fired) < 400 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        sys.setswitchinterval(switch_interval)
+        scheduler.stop()
+        runner.join()
+        loop.close()
+    assert sorted(fired) == [(thread, i) for thread in range(4) for i in range(100)]
+    due = scheduler._due
+    assert len(due) == 4 * 50 * 100 and all(due[(i - 1) // 2] <= due[i] for i in range(1, len(due)))
+
+def test_working_resolution_cavity_parity():
+    """Cavity-sized spots are counted the same at the working level as at full resolution with scaled thresholds.
+
+    This is the documented tolerance: only regions whose area grows with the image carry over (see README).
+    The spots sit on both sides of both size limits, so the counts also depend on the full-resolution refinement.
+    """
+    import cv2
+    import numpy as np
+    from smilepy.pyramid import scale_thresholds
+    from smilepy.teethanalyzer import AREA_SCALED_THRESHOLDS, DEFAULT_THRESHOLDS, TeethAnalyzer
+
+    areas = [85, 95, 105, 115, 300, 880, 940, 1060]  # At 1 MP, scaled with the image area
+    for (width, height), seed in (((2592, 1944), 1), ((4000, 3000), 0)):
+        rng = np.random.default_rng(seed)
+        image = np.full((height, width, 3), (190, 200, 200), np.uint8)
+        for i, area in enumerate(areas):
+            radius = int(round(np.sqrt(area * width * height / 1e6 / np.pi)))
+            cv2.circle(image, ((i + 1) * width // 9, int(rng.uniform(0.2, 0.8) * height)), radius, (60, 60, 70), -1)
+        image = np.clip(image + rng.normal(0, 8, image.shape), 0, 255).astype(np.uint8)
+        full = TeethAnalyzer(thresholds=scale_thresholds(DEFAULT_THRESHOLDS, AREA_SCALED_THRESHOLDS, width * height))
+        working = TeethAnalyzer(working_pixels=1_000_000)
+        assert working._context(image).scale < 1
+        expected, result = full.assess(image, "cavities"), working.assess(image, "cavities")
+        assert (result.score, result.verdict) == (expected.score, expected.verdict)
+
+def test_analysis_history_ring_spill_and_export():
+    """The ring buffer keeps the newest entries, spills the oldest quarter when full, and exports everything in order."""
+    import os
+    import tempfile
+    from datetime import datetime, timedelta
+    from smilepy.analysis_history import AnalysisHistory, ReportCodec, TeethAnalysisCodec
+    from smilepy.analysis_results import DetectorResult, HealthReport, TeethAnalysis, Verdict
+
+    start = datetime(2024, 1, 1)
+    entries = [(start + timedelta(minutes=i), TeethAnalysis(i, 100.0 + i / 4, Verdict(i % 4), Verdict(3 - i % 4)))
+               for i in range(20)]
+    def fields(history_entries):
+        return [(time, a.cavity_count, a.avg_brightness, a.cavity_verdict, a.whiteness_verdict) for time, a in history_entries]
+    with tempfile.TemporaryDirectory() as directory:
+        history = AnalysisHistory(TeethAnalysisCodec(), capacity=8, spill_path=os.path.join(directory, "spill.bin"))
+        for time, analysis in entries:
+            history.append(time, analysis)
+        assert len(history) == 20 and history.spilled == 12 and history.dropped == 0  # 6 evictions of 8 // 4 rows
+        assert fields(history) == fields(entries)
+        assert fields(history.recent(3)) == fields(entries[-3:])
+
+        export = os.path.join(directory, "export.bin")
+        history.export(export)
+        rows = history.read_rows(export, start + timedelta(minutes=5), start + timedelta(minutes=9))
+        assert fields(history.entries(rows)) == fields(entries[5:9])
+        history.clear()
+        assert len(history) == 0 and list(history) == []
+
+    bounded = AnalysisHistory(TeethAnalysisCodec(), capacity=4)
+    for time, analysis in entries:
+        bounded.append(time, analysis)
+    assert bounded.dropped == 16 and fields(bounded) == fields(entries[-4:])
+
+    codec = ReportCodec(["cavities", "whiteness"])
+    report = HealthReport([DetectorResult("cavities", 3, (100, 1000, 5), Verdict.MODERATE),
+                           DetectorResult("whiteness", 171.5, (180, 120), Verdict.MODERATE)])
+    reports = AnalysisHistory(codec, capacity=2)
+    reports.append(start, report)
+    result = DetectorResult("whiteness", 99.25, (180, 120), Verdict.HIGH)
+    reports.append(start, result)
+    (_, decoded_report), (_, decoded_result) = reports
+    assert decoded_report.to_dict() == report.to_dict() and decoded_result.to_dict() == result.to_dict()
+
+def test_history_archive_roundtrip():
+    """Archived histories slice by patient and date like PatientRecord.get_history, and import back into records."""
+    import os
+    import tempfile
+    from smilepy.analysis_results import TeethAnalysis, Verdict
+    from smilepy.history_archive import HistoryArchive, import_archive, write_archive
+
+    def analysis(i):
+        return TeethAnalysis(i, 100.0 + i / 8, Verdict(i % 4), Verdict(3 - i % 4))
+    bob = PatientRecord("Bob", None)
+    bob.add_analyses([("2024-03-01", analysis(1)), ("2024-01-10", analysis(2)), ("2024-02-05", analysis(3))])
+    patients = [("Zoe", 41, [("2023-12-31", analysis(4)), ("2024-01-01", analysis(5))]), bob, ("Al", 9, [])]
+    def fields(records):
+        return [(date, a.cavity_count, a.avg_brightness, a.cavity_verdict, a.whiteness_verdict) for date, a in records]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "histories.bin")
+        assert write_archive(path, patients) == 5
+        archive = HistoryArchive(path)
+        assert len(archive) == 5 and archive.names() == ["Zoe", "Bob", "Al"]
+        assert archive.patient(archive.find("Bob")) == ("Bob", None) and archive.patient(0) == ("Zoe", 41)
+        assert fields(archive.history("Bob")) == fields(bob.get_history())
+        assert fields(archive.history("Bob", start="2024-01-11", end="2024-03-01")) == fields(bob.get_history("2024-01-11", "2024-03-01"))
+        assert archive.history("Al") == []
+        assert sorted(archive.select(start="2024-01-01", end="2024-02-05")["cavity_count"].tolist()) == [2, 3, 5]
+        try:
+            archive.find("Eve")
+        except KeyError:
+            pass
+        else:
+            raise AssertionError("an unknown name was found")
+
+        restored = import_archive(path)
+        assert [(record.user_name, record.age) for record in restored] == [("Zoe", 41), ("Bob", None), ("Al", 9)]
+        assert fields(restored[1].get_history()) == fields(bob.get_history())
+        del archive  # Releases the memory map before the directory is removed
+
+        try:
+            HistoryArchive(os.path.join(os.path.dirname(os.path.abspath(__file__)), "download.jpg"))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("a JPEG was opened as an archive")
+
+def test_feature_trends_statistics_and_alerts():
+    """Running statistics equal a direct weighted fit, and rising or spiking features raise the right alerts."""
+    import math
+    import numpy as np
+    from smilepy.patient_trends import DEFAULT_TREND_THRESHOLDS, FeatureTrends
+
+    days = [0, 20, 45, 60, 90, 130]
+    whiteness = [190.0, 188.0, 181.0, 184.0, 170.0, 166.0]
+    trends = FeatureTrends()
+    for day, value in zip(days, whiteness):
+        trends.update(738000 + day, {"whiteness": value, "cavities": None})
+    alpha, decay = DEFAULT_TREND_THRESHOLDS["alpha"], DEFAULT_TREND_THRESHOLDS["decay"]
+    ewma = whiteness[0]
+    for value in whiteness[1:]:
+        ewma += alpha * (value - ewma)
+    weights = decay ** np.arange(len(days) - 1, -1, -1.0)
+    x, y = np.array(days, float), np.array(whiteness)
+    x_mean, y_mean = np.average(x, weights=weights), np.average(y, weights=weights)
+    slope = np.sum(weights * (x - x_mean) * (y - y_mean)) / np.sum(weights * (x - x_mean) ** 2)
+    summary = trends.summary()
+    assert summary["whiteness"]["visits"] == 6 and math.isclose(summary["whiteness"]["ewma"], ewma)
+    assert math.isclose(summary["whiteness"]["slope_per_day"], slope)
+    assert summary["cavities"]["visits"] == 0 and math.isnan(summary["cavities"]["slope_per_day"])
+
+    alerts = trends.alerts()
+    assert [(alert.feature, alert.kind) for alert in alerts] == [("whiteness", "trend")]
+    assert math.isclose(alerts[0].change, slope * 90) and "getting worse" in alerts[0].render()
+    assert trends.alerts({"whiteness": 100}) == []  # A larger threshold silences it
+
+    restored = FeatureTrends(trends.to_bytes())
+    assert restored.to_bytes() == trends.to_bytes()
+    assert [alert.to_dict() for alert in restored.alerts()] == [alert.to_dict() for alert in alerts]
+
+    steady = FeatureTrends()
+    for day, cavities in enumerate([2, 2, 3, 2, 2, 9]):
+        steady.update(738000 + day * 30, {"cavities": cavities})
+        if day == 1:
+            assert steady.alerts() == []  # Below min_visits
+    kinds = {(alert.feature, alert.kind) for alert in steady.alerts()}
+    assert ("cavities", "regression") in kinds
+    regression = next(alert for alert in steady.alerts() if alert.kind == "regression")
+    assert regression.change > 6 and regression.to_dict()["feature"] == "cavities"
+
+def test_patient_registry_striping_and_order():
+    """Patients in other shards never wait on a busy one, and a patient's calls take effect in the order they were made."""
+    import threading
+    import time
+    import numpy as np
+    from smilepy.patient_registry import PatientRegistry
+
+    registry = PatientRegistry(shards=4)
+    names = [f"patient-{i}" for i in range(32)]
+    busy = names[0]
+    same = next(name for name in names[1:] if registry._shard(name) is registry._shard(busy))
+    other = next(name for name in names[1:] if registry._shard(name) is not registry._shard(busy))
+    for name in (busy, same, other):
+        registry.register(name, 40)
+
+    finished = {}
+    def log(name):
+        registry.log_meal(name, "apple", "2024-01-01")
+        finished[name] = time.monotonic()
+    with registry.patient(busy):
+        threads = [threading.Thread(target=log, args=(name,)) for name in (other, same)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        released = time.monotonic()
+    for thread in threads:
+        thread.join()
+    assert finished[other] < released <= finished[same]  # Only the busy patient's shard was held
+
+    slow = np.random.default_rng(0).integers(0, 256, (3000, 4000), dtype=np.uint8)  # Analyzes for longer
+    fast = np.full((60, 80), 200, dtype=np.uint8)
+    first = threading.Thread(target=registry.analyze, args=(busy, slow))
+    first.start()
+    patient = registry._shard(busy).patients[busy]
+    while patient.issued == patient.done:  # Wait until the slow call holds its ticket
+        time.sleep(0.001)
+    registry.analyze(busy, fast)  # Finishes its analysis first, but commits second
+    first.join()
+    history = registry.history(busy)
+    (_, slow_analysis), (_, fast_analysis) = history
+    assert slow_analysis.cavity_count > 0 and fast_analysis.cavity_count == 0
+
+    threads = [threading.Thread(target=lambda name=name: [registry.log_meal(name, "apple") for _ in range(20)])
+               for name in names]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(registry) == 32 and sorted(registry.names()) == sorted(names)
+
+def test_result_cache_tiers_and_keys():
+    """The LRU tier evicts oldest-first, disk hits are promoted, keys follow params, and counters survive threads."""
+    import tempfile
+    import threading
+    import numpy as np
+    from smilepy.result_cache import ResultCache, image_digest, make_key
+
+    image = np.zeros((4, 5, 3), np.uint8)
+    digest = image_digest(image)
+    assert digest == image_digest(np.asfortranarray(image))
+    assert digest != image_digest(image.reshape(5, 4, 3)) and digest != image_digest(image.astype(np.uint16))
+    assert make_key(digest, "cavity", {"a": 1, "b": 2}) == make_key(digest, "cavity", {"b": 2, "a": 1})
+    assert make_key(digest, "cavity", {"a": 1}) != make_key(digest, "cavity", {"a": 2})
+
+    cache = ResultCache(max_entries=2)
+    for key in "abc":
+        cache.put(key, key.upper())
+    assert cache.get("a") is None and cache.get("b") == "B" and cache.get("c") == "C"
+    assert cache.stats() == {"hits": 2, "misses": 1, "disk_hits": 0, "evictions": 1, "entries": 2}
+
+    with tempfile.TemporaryDirectory() as directory:
+        stored = ResultCache(max_entries=1, directory=directory)
+        calls = []
+        compute = lambda: calls.append(1) or {"score": 0.5}
+        assert stored.get_or_compute(digest, "cavity", {"t": 1}, compute) == {"score": 0.5}
+        assert stored.get_or_compute(digest, "gum", {"t": 1}, compute) == {"score": 0.5}  # Evicts cavity from memory
+        assert stored.get_or_compute(digest, "cavity", {"t": 1}, compute) == {"score": 0.5}
+        assert len(calls) == 2 and stored.disk_hits == 1
+        fresh = ResultCache(directory=directory)
+        assert fresh.get(make_key(digest, "gum", {"t": 1})) == {"score": 0.5} and fresh.disk_hits == 1
+        fresh.invalidate("gum")
+        assert fresh.get(make_key(digest, "gum", {"t": 1})) is None
+        assert fresh.get(make_key(digest, "cavity", {"t": 1})) == {"score": 0.5}
+
+    shared = ResultCache()
+    shared.put("hit", 1)
+    barrier = threading.Barrier(8)
+
+    def lookups():
+        barrier.wait()
+        for _ in range(2000):
+            shared.get("hit")
+            shared.get("miss")
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert shared.hits == shared.misses == 16000
+
+def test_gray_histogram_matches_numpy():
+    """Threshold counts, masked means and moments of GrayHistogram equal numpy's, also when banded and from counts."""
+    import math
+    import numpy as np
+    from smilepy import image_stats
+    from smilepy.image_stats import GrayHistogram
+
+    rng = np.random.default_rng(5)
+    image = rng.integers(0, 256, (97, 131), dtype=np.uint8)
+    image[:10] = 255
+    histogram = GrayHistogram(image)
+    assert histogram.total == image.size
+    for threshold in (-1, 0, 100, 150, 254, 255, 300):
+        assert histogram.count_at_most(threshold) == int(np.count_nonzero(image <= threshold))
+        assert histogram.count_above(threshold) == int(np.count_nonzero(image > threshold))
+        above = image[image > threshold]
+        if above.size:
+            assert math.isclose(histogram.mean_above(threshold), float(above.mean()), rel_tol=1e-12)
+        else:
+            assert math.isnan(histogram.mean_above(threshold))
+    assert math.isclose(histogram.mean(), float(image.mean()), rel_tol=1e-12)
+    assert math.isclose(histogram.var(), float(image.var()), rel_tol=1e-12)
+    assert math.isclose(histogram.std(), float(image.std()), rel_tol=1e-12)
+
+    exact = image_stats._FLOAT32_EXACT
+    image_stats._FLOAT32_EXACT = 1000  # Forces several bands of 7 rows
+    try:
+        assert np.array_equal(GrayHistogram(image).counts, histogram.counts)
+    finally:
+        image_stats._FLOAT32_EXACT = exact
+    halves = GrayHistogram(image[:40]).counts + GrayHistogram(image[40:]).counts
+    assert np.array_equal(GrayHistogram.from_counts(halves).counts, histogram.counts)
+    assert GrayHistogram.from_counts(halves).var() == histogram.var()
+
+def test_diet_log_windows():
+    """Back-dated meals keep the log sorted, and window counts and reports match a direct count over the meals."""
+    import random
+    from datetime import date, datetime
+    from smilepy.diet_log import UserDietLog, to_day
+
+    assert to_day("2024-03-01") == to_day(date(2024, 3, 1)) == to_day(datetime(2024, 3, 1, 18, 30))
+    rng = random.Random(11)
+    log = UserDietLog()
+    meals = []
+    for i in range(300):
+        day = to_day("2024-01-01") + (i // 3 if rng.random() < 0.8 else rng.randrange(100))
+        unhealthy = rng.random() < 0.3
+        log.add(day, f"meal {i}", 1 if unhealthy else 2, unhealthy)
+        meals.append((day, f"meal {i}", unhealthy))
+    meals.sort(key=lambda meal: meal[0])  # Stable, so same-day meals keep logging order
+    assert list(log.days) == [day for day, _, _ in meals] and log.meals == [meal for _, meal, _ in meals]
+    for _ in range(200):
+        first = to_day("2024-01-01") + rng.randrange(-5, 110)
+        last = first + rng.randrange(-2, 30)
+        window = [unhealthy for day, _, unhealthy in meals if first <= day <= last]
+        assert log.counts(first, last) == (len(window), sum(window))
+    assert log.entries(to_day("2024-01-02"), to_day("2024-01-02")) == [
+        {"date": "2024-01-02", "meal": meal} for day, meal, _ in meals if day == to_day("2024-01-02")]
+    assert len(log.entries()) == len(log) == 300
+
+    diet_care = DietTeethCare()
+    assert diet_care.get_diet_history("nobody") == "No records found."
+    assert diet_care.generate_weekly_diet_report("nobody", as_of="2024-05-07") == "No data available."
+    for day in range(1, 8):
+        diet_care.log_user_meal("ann", "cola and cookies" if day % 2 else "cheese with apple", f"2024-05-0{day}")
+    diet_care.log_user_meal("ann", "soda", "2024-04-30")  # Outside the week ending 2024-05-07
+    assert diet_care.generate_weekly_diet_report("ann", as_of="2024-05-07").startswith("Weekly Diet Score: 42.86%")
+    assert diet_care.get_diet_history("ann")[0] == {"date": "2024-04-30", "meal": "soda"}
+    assert diet_care.predict_teeth_health_trend("ann", as_of="2024-05-07") == "Your diet supports good dental health!"
+    for _ in range(2):
+        diet_care.log_user_meal("ann", "candy", "2024-05-06")
+    assert diet_care.predict_teeth_health_trend("ann", as_of="2024-05-07") == "Warning! Your diet may lead to cavities soon."
+
+def test_food_classifier_matches_naive_scan():
+    """The Aho-Corasick matcher finds exactly the whole-word foods a naive substring scan finds, overlaps included."""
+    import random
+    from collections import Counter
+    from smilepy.food_classifier import AhoCorasick, FoodClassifier, normalize
+
+    patterns = ["he", "she", "his", "hers", "s"]
+    matcher = AhoCorasick((pattern, pattern) for pattern in patterns)
+    rng = random.Random(12)
+    for _ in range(200):
+        text = "".join(rng.choice("hers i") for _ in range(rng.randrange(30)))
+        naive = Counter(p for p in patterns for i in range(len(text)) if text.startswith(p, i))
+        assert Counter(matcher.find(text)) == naive
+
+    diet_care = DietTeethCare()
+    classifier = diet_care.food_classifier
+    assert "strong_teeth" not in classifier.categories and "avoid" in classifier.categories
+    assert classifier.categories_of("Grilled salmon, cheddar and an apple") == {"vitamin_d", "calcium", "crunchy_fruits_veggies"}
+    assert classifier.categories_of("Pineapple juice with carrotcake") == set()  # Whole words only
+    assert classifier.categories_of("Ice-cream; then COLA!") == {"avoid"}
+    assert classifier.classify("candy, toffee and cola") == Counter({"avoid": 3})
+    assert classifier.categories_of("a cup of green tea and water") == {"green_tea", "water"}
+    meals = ["milk", "cheese and milk", "cola", "plain rice"]
+    assert classifier.classify_batch(meals) == Counter({"calcium": 2, "avoid": 1})
+    assert classifier.category_mask("cheese and cola") == (
+        1 << classifier.categories.index("calcium") | 1 << classifier.categories.index("avoid"))
+    assert diet_care.detect_unhealthy_diet_patterns(["apples", "Soda pop"]) == "Warning! Reduce: Soda pop."
+    custom = FoodClassifier({"calcium": ["Milk"]}, synonyms={})
+    assert custom.categories_of("milkshake") == set() and normalize(" Milk,Shake ") == " milk shake "
+
+def test_benchmark_images_and_regression_check():
+    """Synthetic images are reproducible per seed, and the CLI flags medians beyond the tolerance against a baseline."""
+    import json
+    import os
+    import tempfile
+    import numpy as np
+    from smilepy import benchmark
+
+    image = benchmark.synthetic_dental_image(320, 240, seed=3)
+    assert image.shape == (240, 320, 3) and image.dtype == np.uint8
+    assert np.array_equal(image, benchmark.synthetic_dental_image(320, 240, seed=3))
+    assert not np.array_equal(image, benchmark.synthetic_dental_image(320, 240, seed=4))
+    calls = []
+    stats = benchmark.time_call(lambda: calls.append(1), repeat=3, warmup=2)
+    assert len(calls) == 5 and stats["repeat"] == 3 and stats["min"] <= stats["median"]
+
+    current = {"results": {"a": {"median": 1.15}, "b": {"median": 1.05}, "new": {"median": 9.0}}}
+    baseline = {"results": {"a": {"median": 1.0}, "b": {"median": 1.0}}}
+    regressions = benchmark.compare(current, baseline, 0.10)
+    assert [regression["benchmark"] for regression in regressions] == ["a"]
+    assert abs(regressions[0]["change"] - 0.15) < 1e-9
+
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "results.json")
+        argv = ["-o", output, "--sizes", "vga", "--repeat", "1", "--batch-images", "0"]
+        assert benchmark.main(argv) == 0
+        with open(output, encoding="utf-8") as results_file:
+            report = json.load(results_file)
+        assert "vga/teeth/analyze_teeth_health" in report["results"] and report["environment"]["numpy"] == np.__version__
+        fast = {"results": {key: {"median": 1e-9} for key in report["results"]}}
+        slow = {"results": {key: {"median": 1e3} for key in report["results"]}}
+        for name, baseline_report, status in (("fast.json", fast, 1), ("slow.json", slow, 0)):
+            path = os.path.join(directory, name)
+            with open(path, "w", encoding="utf-8") as baseline_file:
+                json.dump(baseline_report, baseline_file)
+            assert benchmark.main(argv + ["--compare", path]) == status
+
+def test_instrumentation_timing_and_export():
+    """timed() is a pass-through when disabled, charges nested stage bytes to the outer one, and exports Prometheus text."""
+    import numpy as np
+    from smilepy import instrumentation
+    from smilepy.instrumentation import Histogram, instrumented, timed
+    from smilepy.teethanalyzer import TeethAnalyzer
+
+    histogram = Histogram((1, 2))
+    for value in (0.5, 1, 1.5, 3):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1] and histogram.sum == 6.0
+    assert histogram.prometheus_lines("m", 'stage="x"') == [
+        'm_bucket{stage="x",le="1"} 2', 'm_bucket{stage="x",le="2"} 3', 'm_bucket{stage="x",le="+Inf"} 4',
+        'm_sum{stage="x"} 6.0', 'm_count{stage="x"} 4']
+
+    registry = instrumentation.REGISTRY
+    registry.reset()
+    assert not instrumentation.is_enabled()
+    assert timed("unused", np.zeros, 8).shape == (8,) and registry.summary() == {}
+    observed = []
+    with instrumented(lambda *observation: observed.append(observation)):
+        inner = lambda: (timed("inner", np.zeros, 100), np.zeros(10))[1]
+        timed("outer", inner)
+        try:
+            timed("failing", lambda: 1 / 0)
+        except ZeroDivisionError:
+            pass
+    assert not instrumentation.is_enabled() and not registry.callbacks
+    summary = registry.summary()
+    assert summary["stage:inner"]["bytes"] == 800 and summary["stage:outer"]["bytes"] == 880
+    assert "stage:failing" not in summary  # Failed stages are not recorded
+    assert [(kind, name, nbytes) for kind, name, _, nbytes in observed] == [("stage", "inner", 800), ("stage", "outer", 880)]
+
+    registry.reset()
+    with instrumented():
+        TeethAnalyzer().measure(np.full((64, 64, 3), 200, np.uint8))
+    summary = registry.summary()
+    assert summary["detector:cavities"]["count"] == 1 and summary["stage:gray"]["count"] == 1
+    text = registry.export_prometheus()
+    assert "# TYPE smilepy_detector_seconds histogram" in text and "# TYPE smilepy_stage_bytes histogram" in text
+    assert 'smilepy_detector_seconds_count{detector="cavities"} 1' in text and text.endswith("\n")
+    registry.reset()
+
+def test_decode_buffers_and_shared_frames():
+    """Paths, every encoded buffer type and SharedFrame handles decode to the same pixels and analyzer results."""
+    import mmap
+    import os
+    import pickle
+    import numpy as np
+    from smilepy.image_io import SharedFrame, decode_image
+    from smilepy.teethanalyzer import TeethAnalyzer
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "download.jpg")
+    data = _download_bytes()
+    image = decode_image(path)
+    with open(path, "rb") as jpeg:
+        mapped = mmap.mmap(jpeg.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for source in (data, bytearray(data), memoryview(data), mapped):
+                assert np.array_equal(decode_image(source), image)
+        finally:
+            mapped.close()
+    assert decode_image(image) is image
+    for bad, error in ((b"not a jpeg", ValueError), (12, TypeError)):
+        try:
+            decode_image(bad)
+        except error:
+            pass
+        else:
+            raise AssertionError(f"{bad!r} was decoded")
+
+    expected = TeethAnalyzer().measure(path)
+    assert TeethAnalyzer().measure(data) == expected
+    with SharedFrame.create(image) as frame:
+        payload = pickle.dumps(frame)
+        assert len(payload) < 200  # Only the name, shape and dtype travel
+        attached = pickle.loads(payload)
+        assert np.array_equal(attached.array, image) and decode_image(attached).shape == image.shape
+        assert TeethAnalyzer().measure(attached) == expected
+        frame.array[0, 0] = 0
+        assert (attached.array[0, 0] == 0).all()  # Same memory, not a copy
+        attached.close()
+    try:
+        SharedFrame(frame.name, frame.shape, frame.dtype).array
+    except FileNotFoundError:
+        pass
+    else:
+        raise AssertionError("the shared memory block outlived its creator's context")
+
+def test_detector_threads_match_sequential():
+    """Threaded detectors give the sequential scores, racing first calls start one pool, and close() stops it."""
+    import contextlib
+    import io
+    import os
+    import threading
+    import cv2
+    from concurrent.futures import ThreadPoolExecutor
+    from smilepy import cli, teethanalyzer
+    from smilepy.teethanalyzer import REPORT_DETECTORS, TeethAnalyzer
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "download.jpg")
+    image = cv2.imread(path)
+    expected = TeethAnalyzer().measure(image)
+    opencv_threads = cv2.getNumThreads()
+    pools = []
+
+    class CountingExecutor(ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(self)
+            super().__init__(*args, **kwargs)
+
+    teethanalyzer.ThreadPoolExecutor = CountingExecutor
+    try:
+        analyzer = TeethAnalyzer(detector_threads=3)
+        barrier = threading.Barrier(8)
+        scores = []
+
+        def measure():
+            barrier.wait()
+            scores.append(analyzer.measure(image))
+
+        threads = [threading.Thread(target=measure) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert scores == [expected] * 8 and len(pools) == 1
+        assert [result.to_dict() for result in analyzer.assess_many(image, REPORT_DETECTORS)] == [
+            result.to_dict() for result in TeethAnalyzer().assess_many(image, REPORT_DETECTORS)]
+        analyzer.close()
+        assert pools[0]._shutdown and analyzer.measure(image) == expected and len(pools) == 2
+        analyzer.close()
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert cli.main(["analyze", path, "--threads", "2", "--json"]) == 0
+        assert len(pools) == 3 and pools[2]._shutdown
+    finally:
+        teethanalyzer.ThreadPoolExecutor = ThreadPoolExecutor
+    assert cv2.getNumThreads() == opencv_threads
+
+def test_quality_gate_reasons():
+    """Each failed check gives its reason code, rejected images never reach the detectors, and reasons survive pickling."""
+    import os
+    import pickle
+    import cv2
+    import numpy as np
+    from smilepy import batch_analysis
+    from smilepy.benchmark import synthetic_dental_image
+    from smilepy.image_quality import ImageQualityError, QualityGate
+    from smilepy.teethanalyzer import TeethAnalyzer
+
+    gate = QualityGate()
+    sharp = synthetic_dental_image(1024, 768)
+    assert gate.reasons(gate.measure(sharp)) == [] and gate.check(sharp)["width"] == 1024
+    dark, bright = sharp.copy(), sharp.copy()
+    dark[:, :640] = 10  # Clipped on 62% of the image, the rest stays sharp
+    bright[:, :640] = 250
+    cases = {"too_small": sharp[:200, :300], "blurry": cv2.GaussianBlur(sharp, (0, 0), 6), "underexposed": dark,
+             "overexposed": bright}
+    for reason, image in cases.items():
+        assert gate.reasons(gate.measure(image)) == [reason], reason
+    gray = cv2.cvtColor(sharp, cv2.COLOR_BGR2GRAY)
+    assert gate.measure(gray)["sharpness"] == gate.measure(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))["sharpness"]
+    assert QualityGate({"min_sharpness": 1e9}).reasons(gate.measure(sharp)) == ["blurry"]
+    assert QualityGate({"min_width": 10, "min_height": 10}).reasons(gate.measure(cases["too_small"])) == []
+
+    flat = np.zeros((100, 100, 3), np.uint8)
+    try:
+        TeethAnalyzer(quality=gate).measure(flat)
+    except ImageQualityError as e:
+        error = e
+    else:
+        raise AssertionError("a tiny black image passed the quality gate")
+    assert error.reasons == ("too_small", "blurry", "underexposed") and error.measurements["dark_fraction"] == 1.0
+    assert str(error).startswith("Image rejected: Image resolution is below")
+    copy = pickle.loads(pickle.dumps(error))
+    assert copy.reasons == error.reasons and str(copy) == str(error)
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "download.jpg")  # 296x170, below min_width
+    record = batch_analysis.analyze_image(path, quality_gate=True)
+    assert record["rejected"] == ["too_small"] and "results" not in record
+    assert "results" in batch_analysis.analyze_image(path)
+
+def test_feature_visits_decode_like_plain_visits():
+    """With or without a feature analyzer, a visit sees the same gray image, and history-only use never loads NumPy."""
+    import os
+    import subprocess
+    import sys
+    from smilepy.patient_registry import PatientRegistry
+    from smilepy.teethanalyzer import TeethAnalyzer
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "download.jpg")
+    plain, tracked = PatientRecord("Plain", 30), PatientRecord("Tracked", 30, feature_analyzer=TeethAnalyzer())
+    for source in (path, _download_bytes()):
+        assert tracked.analyze_teeth_now(source) == plain.analyze_teeth_now(source)
+    assert [repr(analysis) for _, analysis in tracked.get_history()] == [repr(analysis) for _, analysis in plain.get_history()]
+    assert len(tracked.get_feature_history()) == 2
+    registry = PatientRegistry(feature_analyzer=TeethAnalyzer())
+    assert repr(registry.analyze("Tracked", path)) == repr(plain.get_history()[0][1])  # repr shows every field exactly
+
+    script = ("import sys\n"
+              "from smilepy.patient_registry import PatientRegistry\n"
+              "from smilepy.patient_store import PatientStore\n"
+              "from smilepy.patientrecord import PatientRecord\n"
+              "record = PatientRecord('Ann', 30, PatientStore(':memory:'))\n"
+              "record.get_history(), record.get_cavity_alert(), record.get_whiteness_suggestion()\n"
+              "PatientRecord('Bob', 40).clear_teeth_history()\n"
+              "PatientRegistry().history('Cy')\n"
+              "print('numpy' in sys.modules, 'cv2' in sys.modules)\n")
+    root = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["False", "False"]
+
+def test_strips_match_full_frame_on_short_images():
+    """Images only a few rows taller than a strip, whose CLAHE padding reflects off both ends, still match the full frame."""
+    import numpy as np
+    from smilepy.teethanalyzer import AnalysisContext, TeethAnalyzer
+    from smilepy.tiling import TiledContext
+
+    rng = np.random.default_rng(18)
+    for height in (2, 3, 4, 5, 8, 9):
+        for width in (3, 40):
+            image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+            assert np.array_equal(TiledContext(image, 1, 1)._clahe_rows(0, height), AnalysisContext(image).clahe)
+            assert TeethAnalyzer(strip_rows=1, strip_overlap=1).measure(image) == TeethAnalyzer().measure(image)
+
+class _KillsWorker:
+    """Batch input whose unpickling ends the worker process that receives it."""
+    def __reduce__(self):
+        import os
+        return os._exit, (1,)
+
+def test_batch_manifest_errors_and_dead_worker():
+    """Bad manifest lines fail only their own entries, headers are found however they are written, and a dead worker is survived."""
+    import contextlib
+    import io
+    import os
+    import tempfile
+    from smilepy import batch_analysis
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "download.jpg")
+    with tempfile.TemporaryDirectory() as directory:
+        def manifest(name, text):
+            manifest_path = os.path.join(directory, name)
+            with open(manifest_path, "w", encoding="utf-8", newline="") as manifest_file:
+                manifest_file.write(text)
+            return manifest_path
+
+        image = os.path.join(directory, "a.jpg")
+        jsonl = manifest("m.jsonl", '{"path": "a.jpg"}\n{"path": \n\n["a.jpg"]\n{"path": "b.jpg", "label": 1}\n')
+        entries = batch_analysis.collect_images(jsonl)
+        assert [entry if isinstance(entry, str) else entry.location for entry in entries] == [
+            image, f"{jsonl}:2", f"{jsonl}:4", os.path.join(directory, "b.jpg")]
+        assert entries[1].message.startswith("Invalid JSON") and "path" in entries[2].message
+        assert batch_analysis.analyze_image(entries[1]) == {"path": f"{jsonl}:2", "error": entries[1].message}
+
+        for text in ("\ufeffPath,label\na.jpg,1\n", "label, PATH \n1,a.jpg\n", "a.jpg,1\n", "file\na.jpg\n", "\n\na.jpg\n"):
+            assert batch_analysis.collect_images(manifest("m.csv", text)) == [image], text
+        csv_path = manifest("m.csv", 'path,label\na.jpg,1\n,2\n"multi\nline",3\nb.jpg\n')
+        entries = batch_analysis.collect_images(csv_path)
+        assert entries[0] == image and entries[1].location == f"{csv_path}:3" and entries[2] == os.path.join(directory, "multi\nline")
+        assert len(entries) == 4
+
+        with open(image, "wb") as copy, open(path, "rb") as original:
+            copy.write(original.read())
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            status = batch_analysis.main([jsonl, "-w", "1", "-o", os.path.join(directory, "out.jsonl")])
+        assert status == 1 and "Analyzed 4 images (3 failed" in stderr.getvalue()
+
+    for ordered in (True, False):
+        records = list(batch_analysis.run_batch([path, _KillsWorker()] + [path] * 12, workers=2, ordered=ordered))
+        assert len(records) == 14 and all("results" in record or "Worker process died" in record["error"] for record in records)
+        assert not any("results" in record for record in records if "_KillsWorker" in record["path"])
+        assert all("results" in record for record in records[-6:])  # Submitted to the fresh pool
+
 if __name__ == "__main__":
     image_path = r'C:\Users\gajer\OneDrive\Desktop\sem-4\pyhton\smilepy\download.jpg'
 
     print("\n=== Running SmilePy System ===\n")
     
     # Check if image exists before running analysis
+    import cv2
     img = cv2.imread(image_path)
     if img is not None:
         run_analysis(image_path)